@@ -10,15 +10,17 @@ import streamlit as st
 import json
 import time
 from datetime import datetime
+from typing import Optional
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-from src.quiz_engine import QuizEngine
-from src.question_generator import QuestionGenerator
-from src.analytics import QuizAnalytics
+from src.quiz_engine import AnswerRecord
+from src.session import AppResources, QuizSession, get_resources
 from src.utils import extract_text_from_file, fetch_article_content
+from src.assets import STATIC_DIR, Stylesheet, load_stylesheet, style_injector
+from src.logger import set_log_context
 
 # Page configuration
 st.set_page_config(
@@ -30,721 +32,114 @@ st.set_page_config(
 
 # (debug removed)
 
-# Custom CSS
-st.markdown("""
-<style>
-    /* Import Google Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800&display=swap');
-    
-    /* Global Styles */
-    .stApp {
-        font-family: 'Inter', sans-serif;
-        background: linear-gradient(135deg, #f5f7fa 0%, #e4e8ec 100%);
-    }
-    
-    /* Main Container - Bigger layout */
-    .main .block-container {
-        padding: 3rem 4rem;
-        max-width: 1400px;
-    }
-    
-    /* Main Header - HUGE with brain symbol */
-    .main-header {
-        font-size: 5.5rem;
-        font-weight: 800;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 50%, #f093fb 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        text-align: center;
-        margin-bottom: 1.5rem;
-        letter-spacing: -0.02em;
-        animation: fadeInDown 0.8s ease-out;
-        text-shadow: 0 2px 10px rgba(102, 126, 234, 0.2);
-        line-height: 1.2;
-    }
-    
-    .sub-header {
-        text-align: center;
-        color: #0f172a;
-        font-size: 1.8rem;
-        margin-bottom: 3.5rem;
-        font-weight: 700;
-        animation: fadeInUp 0.8s ease-out 0.2s both;
-        line-height: 1.6;
-    }
-    
-    /* Hero section styling */
-    .hero-section {
-        text-align: center;
-        padding: 3rem 0;
-        margin-bottom: 2rem;
-    }
-    
-    .brain-icon {
-        font-size: 8rem;
-        display: block;
-        margin-bottom: 1.5rem;
-        animation: pulse 2s infinite;
-    }
-    
-    /* Animations */
-    @keyframes fadeInDown {
-        from { opacity: 0; transform: translateY(-20px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    
-    @keyframes fadeInUp {
-        from { opacity: 0; transform: translateY(20px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    
-    @keyframes pulse {
-        0%, 100% { transform: scale(1); }
-        50% { transform: scale(1.05); }
-    }
-    
-    @keyframes shimmer {
-        0% { background-position: -200% 0; }
-        100% { background-position: 200% 0; }
-    }
-    
-    /* Cards - Bigger with more padding */
-    .glass-card {
-        background: #ffffff;
-        backdrop-filter: blur(20px);
-        -webkit-backdrop-filter: blur(20px);
-        border-radius: 1.5rem;
-        border: 2px solid #e2e8f0;
-        box-shadow: 0 12px 45px rgba(0, 0, 0, 0.12), 0 6px 15px rgba(0, 0, 0, 0.06);
-        padding: 2.5rem;
-        margin: 1.5rem 0;
-        transition: all 0.3s ease;
-    }
-    
-    .glass-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 25px 60px rgba(0, 0, 0, 0.18), 0 10px 25px rgba(0, 0, 0, 0.1);
-    }
-    
-    .question-card {
-        background: #ffffff;
-        padding: 3rem;
-        border-radius: 1.75rem;
-        border: 3px solid #e2e8f0;
-        margin: 2rem 0;
-        box-shadow: 0 20px 60px rgba(0, 0, 0, 0.12);
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .question-card::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: 5px;
-        background: linear-gradient(90deg, #667eea, #764ba2, #f093fb);
-    }
-    
-    /* Metric Cards - Bigger */
-    .metric-card {
-        background: #ffffff;
-        padding: 2.5rem;
-        border-radius: 1.5rem;
-        box-shadow: 0 12px 45px rgba(0, 0, 0, 0.12);
-        text-align: center;
-        border: 3px solid #e2e8f0;
-        transition: all 0.3s ease;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .metric-card::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: 6px;
-        background: linear-gradient(90deg, #667eea, #764ba2);
-    }
-    
-    .metric-card:hover {
-        transform: translateY(-8px);
-        box-shadow: 0 25px 70px rgba(102, 126, 234, 0.25);
-    }
-    
-    .metric-card h3 {
-        color: #0f172a;
-        font-size: 1.25rem;
-        font-weight: 800;
-        text-transform: uppercase;
-        letter-spacing: 0.05em;
-        margin-bottom: 1rem;
-    }
-    
-    .score-display {
-        font-size: 3.5rem;
-        font-weight: 800;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        line-height: 1.2;
-    }
-    
-    /* Difficulty Badges - Bold and visible */
-    .difficulty-badge {
-        display: inline-flex;
-        align-items: center;
-        gap: 0.5rem;
-        padding: 0.6rem 1.2rem;
-        border-radius: 2rem;
-        font-weight: 700;
-        font-size: 0.95rem;
-        letter-spacing: 0.02em;
-        border: 2px solid;
-    }
-    
-    .difficulty-easy { 
-        background: #d1fae5;
-        color: #065f46;
-        border-color: #10b981;
-    }
-    .difficulty-medium { 
-        background: #fef3c7;
-        color: #92400e;
-        border-color: #f59e0b;
-    }
-    .difficulty-hard { 
-        background: #fee2e2;
-        color: #991b1b;
-        border-color: #ef4444;
-    }
-    
-    /* Progress Bar Enhancement */
-    .stProgress > div > div > div {
-        background: linear-gradient(90deg, #667eea, #764ba2, #f093fb);
-        border-radius: 1rem;
-        height: 12px !important;
-    }
-    
-    .stProgress > div > div {
-        background: #d1d5db;
-    }
-    
-    /* Back to Home Button - Blue gradient */
-    .back-home-btn button {
-        background: linear-gradient(135deg, #3b82f6 0%, #1d4ed8 100%) !important;
-        color: white !important;
-        border: none !important;
-        font-weight: 700 !important;
-        font-size: 1.1rem !important;
-        padding: 0.75rem 1.5rem !important;
-        border-radius: 0.75rem !important;
-        box-shadow: 0 4px 15px rgba(59, 130, 246, 0.4) !important;
-        transition: all 0.3s ease !important;
-    }
-    
-    .back-home-btn button:hover {
-        background: linear-gradient(135deg, #2563eb 0%, #1e40af 100%) !important;
-        transform: translateY(-2px) !important;
-        box-shadow: 0 6px 20px rgba(59, 130, 246, 0.5) !important;
-    }
-    
-    /* Clear History Button - Red gradient */
-    .clear-history-btn button {
-        background: linear-gradient(135deg, #ef4444 0%, #dc2626 100%) !important;
-        color: white !important;
-        border: none !important;
-        font-weight: 700 !important;
-        font-size: 1.1rem !important;
-        padding: 0.75rem 1.5rem !important;
-        border-radius: 0.75rem !important;
-        box-shadow: 0 4px 15px rgba(239, 68, 68, 0.4) !important;
-        transition: all 0.3s ease !important;
-    }
-    
-    .clear-history-btn button:hover {
-        background: linear-gradient(135deg, #dc2626 0%, #b91c1c 100%) !important;
-        transform: translateY(-2px) !important;
-        box-shadow: 0 6px 20px rgba(239, 68, 68, 0.5) !important;
-    }
-    
-    /* URL and Content Input Styling - Complete boxes */
-    [data-testid="column"]:first-child [data-testid="stTextInput"] input {
-        background: #f8fafc !important;
-        border: 2px solid #667eea !important;
-        border-radius: 0.75rem !important;
-        padding: 0.875rem 1rem !important;
-        font-size: 1rem !important;
-        color: #0f172a !important;
-        font-weight: 500 !important;
-        margin-top: -0.5rem !important;
-    }
-    
-    [data-testid="column"]:first-child [data-testid="stTextInput"] input:focus {
-        border-color: #4f46e5 !important;
-        box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.25) !important;
-    }
-    
-    [data-testid="column"]:last-child [data-testid="stTextArea"] textarea {
-        background: #f8fafc !important;
-        border: 2px solid #10b981 !important;
-        border-radius: 0.75rem !important;
-        padding: 0.875rem 1rem !important;
-        font-size: 1rem !important;
-        color: #0f172a !important;
-        font-weight: 500 !important;
-        margin-top: -0.5rem !important;
-    }
-    
-    [data-testid="column"]:last-child [data-testid="stTextArea"] textarea:focus {
-        border-color: #059669 !important;
-        box-shadow: 0 0 0 3px rgba(16, 185, 129, 0.25) !important;
-    }
+@st.cache_resource(show_spinner=False)
+def load_resources() -> AppResources:
+    """Database, generator, engine and analytics shared by every session."""
+    return get_resources()
 
-    /* Button Enhancements - Much bigger */
-    .stButton > button {
-        border-radius: 1rem !important;
-        font-weight: 800 !important;
-        font-size: 1.15rem !important;
-        padding: 1.1rem 2.25rem !important;
-        transition: all 0.3s ease !important;
-        border: none !important;
-        min-height: 60px !important;
-    }
-    
-    .stButton > button[kind="primary"] {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%) !important;
-        color: white !important;
-        box-shadow: 0 8px 25px rgba(102, 126, 234, 0.5) !important;
-    }
-    
-    .stButton > button[kind="primary"]:hover {
-        transform: translateY(-4px) !important;
-        box-shadow: 0 12px 35px rgba(102, 126, 234, 0.65) !important;
-    }
-    
-    .stButton > button[kind="secondary"] {
-        background: white !important;
-        color: #667eea !important;
-        border: 3px solid #667eea !important;
-        font-weight: 800 !important;
-    }
-    
-    /* File Uploader - Much bigger */
-    .stFileUploader > div {
-        border-radius: 1.25rem !important;
-        border: 4px dashed #64748b !important;
-        padding: 3.5rem !important;
-        background: #ffffff !important;
-        transition: all 0.3s ease !important;
-        min-height: 180px !important;
-    }
-    
-    .stFileUploader > div:hover {
-        border-color: #667eea !important;
-        background: #f5f3ff !important;
-    }
-    
-    /* Text Input & Text Area - Much bigger */
-    .stTextInput > div > div > input,
-    .stTextArea > div > div > textarea {
-        border-radius: 1rem !important;
-        border: 3px solid #94a3b8 !important;
-        padding: 1.25rem !important;
-        font-size: 1.15rem !important;
-        background: #ffffff !important;
-        color: #000000 !important;
-        transition: all 0.3s ease !important;
-        min-height: 55px !important;
-    }
-    
-    .stTextInput > div > div > input:focus,
-    .stTextArea > div > div > textarea:focus {
-        border-color: #667eea !important;
-        box-shadow: 0 0 0 5px rgba(102, 126, 234, 0.25) !important;
-    }
-    
-    /* Radio Buttons - HUGE and DARK */
-    .stRadio > div {
-        gap: 1.75rem !important;
-    }
-    
-    .stRadio > div > label {
-        background: #ffffff !important;
-        padding: 2rem 2.5rem !important;
-        border-radius: 1.25rem !important;
-        border: 3px solid #1e293b !important;
-        transition: all 0.3s ease !important;
-        cursor: pointer !important;
-        font-size: 2rem !important;
-        color: #000000 !important;
-        font-weight: 800 !important;
-        min-height: 90px !important;
-    }
-    
-    .stRadio > div > label span,
-    .stRadio > div > label p,
-    .stRadio > div > label div {
-        font-size: 1.6rem !important;
-        color: #000000 !important;
-        font-weight: 700 !important;
-        line-height: 1.5 !important;
-    }
-    
-    .stRadio > div > label:hover {
-        border-color: #667eea !important;
-        background: #f5f3ff !important;
-        transform: translateX(8px) !important;
-    }
-    
-    .stRadio > div > label[data-checked="true"] {
-        border-color: #667eea !important;
-        background: #ede9fe !important;
-        box-shadow: 0 6px 20px rgba(102, 126, 234, 0.3) !important;
-    }
-    
-    .stRadio > div > label:hover {
-        border-color: #667eea !important;
-        background: #f5f3ff !important;
-    }
-    
-    .stRadio > div > label[data-checked="true"] {
-        border-color: #667eea !important;
-        background: #ede9fe !important;
-        box-shadow: 0 4px 12px rgba(102, 126, 234, 0.2) !important;
-    }
-    
-    /* Radio option text specifically */
-    .stRadio [data-testid="stMarkdownContainer"] p {
-        font-size: 1.6rem !important;
-        color: #000000 !important;
-        font-weight: 700 !important;
-    }
-    
-    /* Sidebar Styling - Clear and visible */
-    [data-testid="stSidebar"] {
-        background: linear-gradient(180deg, #0f172a 0%, #1e1b4b 100%) !important;
-    }
-    
-    [data-testid="stSidebar"] .stMarkdown {
-        color: #ffffff !important;
-    }
-    
-    [data-testid="stSidebar"] h2, 
-    [data-testid="stSidebar"] h3 {
-        color: #ffffff !important;
-        font-size: 1.5rem !important;
-        font-weight: 800 !important;
-    }
-    
-    [data-testid="stSidebar"] p {
-        color: #ffffff !important;
-        font-size: 1.1rem !important;
-        font-weight: 500 !important;
-    }
-    
-    [data-testid="stSidebar"] label {
-        color: #ffffff !important;
-        font-weight: 700 !important;
-        font-size: 1.05rem !important;
-    }
-    
-    [data-testid="stSidebar"] hr {
-        border-color: rgba(255, 255, 255, 0.3) !important;
-    }
-    
-    /* Expander - More visible */
-    .streamlit-expanderHeader {
-        border-radius: 0.75rem !important;
-        background: #ffffff !important;
-        font-weight: 700 !important;
-        font-size: 1.1rem !important;
-        border: 2px solid #e2e8f0 !important;
-    }
-    
-    /* Slider */
-    .stSlider > div > div > div > div {
-        background: linear-gradient(90deg, #667eea, #764ba2) !important;
-    }
-    
-    /* Success/Error/Warning Messages - Larger text */
-    .stSuccess {
-        background: #d1fae5 !important;
-        border: 2px solid #10b981 !important;
-        border-radius: 0.75rem !important;
-        padding: 1.25rem 1.5rem !important;
-        font-size: 1.05rem !important;
-    }
-    
-    .stError {
-        background: #fee2e2 !important;
-        border: 2px solid #ef4444 !important;
-        border-radius: 0.75rem !important;
-        padding: 1.25rem 1.5rem !important;
-        font-size: 1.05rem !important;
-    }
-    
-    .stWarning {
-        background: #fef3c7 !important;
-        border: 2px solid #f59e0b !important;
-        border-radius: 0.75rem !important;
-        padding: 1.25rem 1.5rem !important;
-        font-size: 1.05rem !important;
-    }
-    
-    /* Multiselect - Clearer */
-    .stMultiSelect > div > div {
-        border-radius: 0.75rem !important;
-        border: 2px solid #cbd5e1 !important;
-        background: #ffffff !important;
-    }
-    
-    /* Section Headers - Larger and bolder */
-    .section-header {
-        display: flex;
-        align-items: center;
-        gap: 0.75rem;
-        font-size: 1.4rem;
-        font-weight: 800;
-        color: #0f172a;
-        margin: 1.5rem 0 1rem 0;
-    }
-    
-    .section-header-icon {
-        font-size: 1.6rem;
-    }
-    
-    /* Dividers */
-    hr {
-        border: none !important;
-        height: 2px !important;
-        background: linear-gradient(90deg, transparent, #cbd5e1, transparent) !important;
-        margin: 2rem 0 !important;
-    }
-    
-    /* Hide Streamlit Default Elements */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    
-    /* Timer Styles - Much bigger */
-    .timer-container {
-        display: flex;
-        justify-content: center;
-        align-items: center;
-        margin: 2rem 0;
-    }
-    
-    .timer-display {
-        font-size: 4rem;
-        font-weight: 800;
-        font-family: 'Courier New', monospace;
-        padding: 1.25rem 2.5rem;
-        border-radius: 1.25rem;
-        background: #0f172a;
-        color: #10b981;
-        box-shadow: 0 10px 30px rgba(0, 0, 0, 0.35);
-        border: 4px solid #10b981;
-        letter-spacing: 0.08em;
-    }
-    
-    .timer-warning {
-        color: #f59e0b !important;
-        border-color: #f59e0b !important;
-    }
-    
-    .timer-danger {
-        color: #ef4444 !important;
-        border-color: #ef4444 !important;
-        animation: pulse 0.5s infinite;
-    }
-    
-    /* Key Concepts Card - Bigger */
-    .concepts-card {
-        background: #ffffff;
-        border: 3px solid #667eea;
-        border-radius: 1.5rem;
-        padding: 2.5rem;
-        margin: 2rem 0;
-        box-shadow: 0 12px 45px rgba(102, 126, 234, 0.18);
-    }
-    
-    .concept-tag {
-        display: inline-block;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        padding: 0.85rem 1.5rem;
-        border-radius: 2.5rem;
-        margin: 0.5rem;
-        font-size: 1.1rem;
-        font-weight: 700;
-        box-shadow: 0 5px 15px rgba(102, 126, 234, 0.35);
-    }
-    
-    /* History Card - Bigger */
-    .history-card {
-        background: #ffffff;
-        border: 3px solid #e2e8f0;
-        border-radius: 1.5rem;
-        padding: 2rem;
-        margin-bottom: 1.75rem;
-        transition: all 0.3s ease;
-        box-shadow: 0 8px 25px rgba(0, 0, 0, 0.1);
-    }
-    
-    .history-card:hover {
-        transform: translateY(-4px);
-        box-shadow: 0 15px 40px rgba(0, 0, 0, 0.15);
-        border-color: #667eea;
-    }
-    
-    /* Selectbox styling */
-    .stSelectbox > div > div {
-        background: #ffffff !important;
-        border: 2px solid #cbd5e1 !important;
-        border-radius: 0.75rem !important;
-        font-size: 1rem !important;
-    }
-    
-    /* Labels and text - Larger and DARKER */
-    .stMarkdown p {
-        font-size: 1.1rem;
-        color: #0f172a;
-        line-height: 1.7;
-        font-weight: 500;
-    }
-    
-    .stMarkdown h1, .stMarkdown h2, .stMarkdown h3 {
-        color: #000000;
-        font-weight: 800;
-    }
-    
-    /* All labels darker */
-    label, .stMarkdown label {
-        color: #0f172a !important;
-        font-weight: 700 !important;
-        font-size: 1.3rem !important;
-    }
-    
-    /* Selectbox text */
-    .stSelectbox label, .stMultiSelect label, .stSlider label {
-        color: #000000 !important;
-        font-weight: 700 !important;
-        font-size: 1.25rem !important;
-    }
-    
-    /* Option text in quiz - HUGE and DARK */
-    .stRadio label span {
-        font-size: 1.8rem !important;
-        color: #000000 !important;
-        font-weight: 800 !important;
-    }
-    
-    /* Radio button labels */
-    .stRadio > label {
-        color: #000000 !important;
-        font-weight: 800 !important;
-        font-size: 1.6rem !important;
-    }
-    
-    /* Radio button circle */
-    .stRadio input[type="radio"] {
-        width: 28px !important;
-        height: 28px !important;
-    }
-    
-    /* Checkbox text */
-    .stCheckbox label span {
-        color: #0f172a !important;
-        font-weight: 600 !important;
-        font-size: 1.25rem !important;
-    }
-    
-    /* Input placeholder - darker */
-    input::placeholder, textarea::placeholder {
-        color: #475569 !important;
-        font-weight: 500 !important;
-        font-size: 1.15rem !important;
-    }
-    
-    /* Text inputs - bigger */
-    .stTextInput input, .stTextArea textarea {
-        font-size: 1.3rem !important;
-        padding: 1rem 1.25rem !important;
-        color: #000000 !important;
-    }
-    
-    /* File uploader text */
-    .stFileUploader label {
-        color: #000000 !important;
-        font-weight: 700 !important;
-        font-size: 1.2rem !important;
-    }
-    
-    /* Strong/Bold text */
-    strong, b {
-        color: #000000 !important;
-        font-weight: 800 !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+resources = load_resources()
+
+# Per-session state lives in one lightweight context object
+if 'quiz' not in st.session_state:
+    st.session_state.quiz = QuizSession()
+quiz = st.session_state.quiz
 
-# Initialize session state
-def init_session_state():
-    if 'quiz_engine' not in st.session_state:
-        st.session_state.quiz_engine = QuizEngine()
-    if 'question_generator' not in st.session_state:
-        st.session_state.question_generator = QuestionGenerator()
-    if 'analytics' not in st.session_state:
-        st.session_state.analytics = QuizAnalytics()
-    if 'current_stage' not in st.session_state:
-        st.session_state.current_stage = 'upload'  # upload, concepts, quiz, results, history
-    if 'questions' not in st.session_state:
-        st.session_state.questions = []
-    if 'current_question_idx' not in st.session_state:
-        st.session_state.current_question_idx = 0
-    if 'user_answers' not in st.session_state:
-        st.session_state.user_answers = []
-    if 'current_difficulty' not in st.session_state:
-        st.session_state.current_difficulty = 'medium'
-    if 'quiz_start_time' not in st.session_state:
-        st.session_state.quiz_start_time = None
-    if 'question_start_time' not in st.session_state:
-        st.session_state.question_start_time = None
-    if 'uploaded_content' not in st.session_state:
-        st.session_state.uploaded_content = None
-    if 'key_concepts' not in st.session_state:
-        st.session_state.key_concepts = []
-    if 'timer_duration' not in st.session_state:
-        st.session_state.timer_duration = 30  # seconds per question
-    if 'show_timer' not in st.session_state:
-        st.session_state.show_timer = True
+@st.cache_resource(show_spinner=False)
+def load_styles(mtime: float) -> Stylesheet:
+    """static/style.css, minified and hashed (reloaded when the file changes)."""
+    return load_stylesheet('style.css')
 
-init_session_state()
+def inject_styles() -> Optional[str]:
+    """Install the app stylesheet once per session instead of re-sending it every rerun.
+    
+    Returns the digest sent this run, if any. It only counts as installed
+    once the run completes (see the end of this script): a run cut short
+    by st.rerun() can drop the injector before the browser executes it.
+    """
+    sheet = load_styles(os.path.getmtime(os.path.join(STATIC_DIR, 'style.css')))
+    if quiz.css_digest == sheet.digest:
+        return None
+    if hasattr(st, 'iframe'):
+        st.iframe(style_injector(sheet), height='content')  # empty body: sizes to nothing
+    else:  # Streamlit before st.iframe; components.html is deprecated after it
+        import streamlit.components.v1 as components
+        components.html(style_injector(sheet), height=0)
+    return sheet.digest
+
+styles_sent = inject_styles()
 
 def reset_quiz():
-    st.session_state.current_stage = 'upload'
-    st.session_state.questions = []
-    st.session_state.current_question_idx = 0
-    st.session_state.user_answers = []
-    st.session_state.current_difficulty = 'medium'
-    st.session_state.quiz_start_time = None
-    st.session_state.question_start_time = None
-    st.session_state.uploaded_content = None
-    st.session_state.key_concepts = []
+    quiz.reset()
+    resources.jobs.cancel_session(quiz.session_id)
+
+# Attempts written per "Add demo history" click, as one batch
+DEMO_ATTEMPTS = 5
+
+# How often the concepts page and the quiz poll a running generation job
+STREAM_POLL_SECONDS = 1.0
+
+def sync_streamed_questions() -> bool:
+    """Copy questions and AI concepts that arrived from the background job into the session.
+    
+    Returns True while more questions are still being generated.
+    """
+    stream = quiz.question_stream
+    if stream is None:
+        return False
+    quiz.questions = stream.snapshot()
+    if stream.concepts and quiz.concepts_source != 'ai':
+        quiz.key_concepts = stream.concepts
+        quiz.concepts_source = 'ai'
+    if stream.settled:
+        quiz.generation_error = stream.error  # kept for the error message once the stream is gone
+        quiz.question_stream = None
+    return not stream.done
+
+def expected_question_count() -> int:
+    """Total questions in this quiz, including ones still being generated."""
+    stream = quiz.question_stream
+    if stream is not None:
+        return max(stream.expected, len(quiz.questions))
+    return len(quiz.questions)
+
+@st.fragment(run_every=STREAM_POLL_SECONDS)
+def wait_for_next_question(question_idx: int):
+    """Shown when the player is ahead of the generator; reruns the app once the question arrives."""
+    sync_streamed_questions()
+    if len(quiz.questions) > question_idx or quiz.question_stream is None:
+        quiz.question_start_time = time.time()
+        st.rerun()
+    st.info("🤖 AI is still crafting the next question...")
+
+def render_answer_feedback():
+    """Show how the previous answer went, until the next question is answered."""
+    if quiz.last_feedback is None:
+        return
+    answered_idx, is_correct, correct_answer, timed_out = quiz.last_feedback
+    if answered_idx != quiz.current_question_idx - 1:
+        return
+    if timed_out and not is_correct:
+        st.error(f"⏰ Time's up! The correct answer was: **{correct_answer}**.")
+    elif is_correct:
+        st.success("✅ Correct!")
+    else:
+        st.error(f"❌ Not quite! The correct answer was: **{correct_answer}**. Keep going, you're learning!")
 
-def render_timer():
-    """Render countdown timer for current question."""
-    if not st.session_state.show_timer or st.session_state.question_start_time is None:
+@st.fragment(run_every=1)
+def render_timer(question_idx: int, question: dict):
+    """Countdown for the current question; ticks on its own and submits on timeout."""
+    if quiz.current_stage != 'quiz' or quiz.current_question_idx != question_idx:
+        return  # already answered; the full rerun will replace this
+    if quiz.question_start_time is None:
         return
     
-    elapsed = time.time() - st.session_state.question_start_time
-    remaining = max(0, st.session_state.timer_duration - elapsed)
+    elapsed = time.time() - quiz.question_start_time
+    remaining = max(0, quiz.timer_duration - elapsed)
+    
+    if remaining <= 0:
+        # Submit whatever is selected or typed so far (possibly nothing)
+        submit_answer(st.session_state.get(f"q_{question_idx}") or "", question, timed_out=True)
+        return
     
     minutes = int(remaining // 60)
     seconds = int(remaining % 60)
@@ -789,6 +184,31 @@ def render_upload_stage():
             label_visibility="collapsed"
         )
         
+        # PDF extraction options (only relevant for PDF uploads)
+        pdf_engine = 'pdfplumber'
+        pdf_page_range = None
+        pdf_early_stop = False
+        if uploaded_file and uploaded_file.name.lower().endswith('.pdf'):
+            with st.expander("📄 PDF options"):
+                fast_pdf = st.checkbox(
+                    "Fast extraction (PyPDF2)",
+                    value=False,
+                    help="Faster on large PDFs but ignores layout; tables and columns may read less cleanly"
+                )
+                pdf_engine = 'pypdf2' if fast_pdf else 'pdfplumber'
+                page_col1, page_col2 = st.columns(2)
+                with page_col1:
+                    first_page = st.number_input("From page", min_value=1, value=1, step=1)
+                with page_col2:
+                    last_page = st.number_input("To page (0 = last)", min_value=0, value=0, step=1)
+                if first_page > 1 or last_page:
+                    pdf_page_range = (int(first_page), int(last_page) if last_page else 10**6)
+                pdf_early_stop = st.checkbox(
+                    "Stop reading early",
+                    value=False,
+                    help="Much faster on very long PDFs, but questions then only come from the first part of the document"
+                )
+        
         # Divider with "or"
         st.markdown("""
         <div style="display: flex; align-items: center; margin: 2.5rem 0;">
@@ -815,23 +235,6 @@ def render_upload_stage():
             
             # Style the input to connect with box above
             st.markdown("""
-            <style>
-            .url-box-input input {
-                border: 3px solid #667eea !important;
-                border-top: none !important;
-                border-radius: 0 0 1.25rem 1.25rem !important;
-                margin-top: -3px !important;
-                padding: 1rem 1.25rem !important;
-                font-size: 1.1rem !important;
-                background: #f8fafc !important;
-                color: #0f172a !important;
-                height: 50px !important;
-            }
-            .url-box-input input:focus {
-                border-color: #4f46e5 !important;
-                box-shadow: 0 4px 15px rgba(102, 126, 234, 0.2) !important;
-            }
-            </style>
             <div class="url-box-input">
             """, unsafe_allow_html=True)
             
@@ -858,25 +261,6 @@ def render_upload_stage():
             
             # Style the textarea to connect with box above
             st.markdown("""
-            <style>
-            .content-box-input textarea {
-                border: 3px solid #10b981 !important;
-                border-top: none !important;
-                border-radius: 0 0 1.25rem 1.25rem !important;
-                margin-top: -3px !important;
-                padding: 1rem 1.25rem !important;
-                font-size: 1.1rem !important;
-                background: #f8fafc !important;
-                color: #0f172a !important;
-                min-height: 50px !important;
-                height: 50px !important;
-                resize: none !important;
-            }
-            .content-box-input textarea:focus {
-                border-color: #059669 !important;
-                box-shadow: 0 4px 15px rgba(16, 185, 129, 0.2) !important;
-            }
-            </style>
             <div class="content-box-input">
             """, unsafe_allow_html=True)
             
@@ -921,8 +305,8 @@ def render_upload_stage():
             st.markdown("**🔔 Enable Timer**")
             show_timer = st.checkbox("Show countdown timer", value=True)
         
-        st.session_state.timer_duration = timer_duration
-        st.session_state.show_timer = show_timer
+        quiz.timer_duration = timer_duration
+        quiz.show_timer = show_timer
         
         st.markdown("<div style='height: 2rem;'></div>", unsafe_allow_html=True)
         
@@ -932,7 +316,10 @@ def render_upload_stage():
             
             if uploaded_file:
                 with st.spinner("📄 Reading your file... This may take a moment for large documents."):
-                    content = extract_text_from_file(uploaded_file)
+                    content = extract_text_from_file(
+                        uploaded_file, engine=pdf_engine, page_range=pdf_page_range,
+                        max_chars=resources.generator.source_char_limit(num_questions) if pdf_early_stop else None
+                    )
                     if content and content.startswith("Error"):
                         st.error(f"📁 {content}")
                         content = None
@@ -946,133 +333,177 @@ def render_upload_stage():
                 content = pasted_text.strip()
             
             if content:
-                st.session_state.uploaded_content = content
+                quiz.questions_requested = num_questions
                 
-                # Extract key concepts first
-                with st.spinner("🔍 AI is analyzing your content and extracting key concepts..."):
-                    concepts = st.session_state.question_generator.extract_key_concepts(content)
-                    st.session_state.key_concepts = concepts
-                
-                with st.spinner("🤖 AI is crafting personalized quiz questions just for you... This usually takes 10-20 seconds."):
-                    questions = st.session_state.question_generator.generate_questions(
-                        content=content,
-                        num_questions=num_questions,
-                        question_types=question_types
-                    )
+                # Queue generation in the background: one streamed LLM call
+                # returns the key concepts first and then the questions
+                quiz.question_stream = resources.generator.start_question_stream(
+                    content=content,
+                    num_questions=num_questions,
+                    question_types=question_types,
+                    with_concepts=True,
+                    session_id=quiz.session_id
+                )
                 
-                if questions:
-                    st.session_state.questions = questions
-                    st.session_state.current_stage = 'concepts'
-                    st.balloons()  # Celebrate success!
-                    st.rerun()
-                elif st.session_state.current_stage == 'history':
-                    render_history_stage()
-                else:
-                    st.error("😕 Oops! We couldn't generate questions from this content. Try adding more text or using different material.")
+                # Show fast keyword concepts right away; AI concepts replace them when ready
+                quiz.key_concepts = resources.generator.quick_concepts(content)
+                quiz.concepts_source = 'keywords'
+                quiz.questions = []
+                quiz.current_stage = 'concepts'
+                st.balloons()  # Celebrate success!
+                st.rerun()
             else:
                 st.warning("👆 Please upload a file, enter a URL, or paste some text to get started!")
 
 def render_concepts_stage():
     """Display extracted key concepts before starting quiz."""
+    sync_streamed_questions()
+    
     st.markdown('<h1 class="main-header">🔑 Key Concepts Identified</h1>', unsafe_allow_html=True)
     st.markdown('<p class="sub-header">AI has identified these main concepts from your material</p>', unsafe_allow_html=True)
     
     col1, col2, col3 = st.columns([1, 2, 1])
 
     with col2:
-        # Optionally, show Results button if on history page and last results exist
-        if st.session_state.current_stage == 'history' and hasattr(st.session_state, 'user_answers') and st.session_state.user_answers:
-            if st.button("⬅️ Back to Results", use_container_width=True):
-                st.session_state.current_stage = 'results'
-                st.rerun()
-        # Display key concepts
-        if st.session_state.key_concepts:
-            st.markdown("""
-            <div class="concepts-card">
-                <h4 style="margin: 0 0 1rem 0; color: #0369a1;">📚 Main Topics & Concepts</h4>
-            """, unsafe_allow_html=True)
+        if quiz.question_stream is not None:
+            live_concepts_panel()
+        else:
+            render_concepts_panel()
 
-            concepts_html = ""
-            for concept in st.session_state.key_concepts:
-                concepts_html += f'<span class="concept-tag">{concept}</span>'
+@st.fragment(run_every=STREAM_POLL_SECONDS)
+def live_concepts_panel():
+    """Concepts panel that polls the background job while it is still generating."""
+    render_concepts_panel()
+    if quiz.question_stream is None:
+        st.rerun()  # settled: one full rerun swaps in the static panel
 
-            st.markdown(f"""
-                <div style="line-height: 2.5;">
-                    {concepts_html}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.info("No specific concepts were extracted. The quiz will cover general content.")
-        
-        # Quiz summary
-        st.markdown("<div style='height: 1.5rem;'></div>", unsafe_allow_html=True)
-        
+def render_concepts_panel():
+    """Key concepts, generation progress, quiz summary and the start button."""
+    generating = sync_streamed_questions()
+    stream = quiz.question_stream
+    
+    # Optionally, show Results button if on history page and last results exist
+    if quiz.current_stage == 'history' and quiz.user_answers:
+        if st.button("⬅️ Back to Results", use_container_width=True):
+            quiz.current_stage = 'results'
+            st.rerun()
+    # Display key concepts
+    if quiz.key_concepts:
+        st.markdown("""
+        <div class="concepts-card">
+            <h4 style="margin: 0 0 1rem 0; color: #0369a1;">📚 Main Topics & Concepts</h4>
+        """, unsafe_allow_html=True)
+    
+        concepts_html = ""
+        for concept in quiz.key_concepts:
+            concepts_html += f'<span class="concept-tag">{concept}</span>'
+    
         st.markdown(f"""
-        <div class="glass-card">
-            <h4 style="margin: 0 0 1rem 0; color: #1e293b;">📋 Quiz Summary</h4>
-            <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 1rem;">
-                <div>
-                    <span style="color: #64748b;">Questions:</span>
-                    <strong style="color: #667eea;"> {len(st.session_state.questions)}</strong>
-                </div>
-                <div>
-                    <span style="color: #64748b;">Timer:</span>
-                    <strong style="color: #667eea;"> {st.session_state.timer_duration}s per question</strong>
-                </div>
-                <div>
-                    <span style="color: #64748b;">Starting Difficulty:</span>
-                    <strong style="color: #f59e0b;"> Medium</strong>
-                </div>
-                <div>
-                    <span style="color: #64748b;">Adaptive:</span>
-                    <strong style="color: #10b981;"> Enabled</strong>
-                </div>
+            <div style="line-height: 2.5;">
+                {concepts_html}
             </div>
         </div>
         """, unsafe_allow_html=True)
-        
-        st.markdown("<div style='height: 1.5rem;'></div>", unsafe_allow_html=True)
-        
-        col_a, col_b = st.columns(2)
-        with col_a:
-            if st.button("⬅️ Go Back", use_container_width=True):
-                reset_quiz()
-                st.rerun()
-        with col_b:
-            if st.button("🚀 Start Quiz", use_container_width=True, type="primary"):
-                st.session_state.current_stage = 'quiz'
-                st.session_state.quiz_start_time = time.time()
-                st.session_state.question_start_time = time.time()
-                st.rerun()
+    else:
+        st.info("No specific concepts were extracted. The quiz will cover general content.")
+    
+    if quiz.concepts_source == 'keywords' and stream is not None and not stream.settled:
+        st.caption("⏳ Showing quick keyword concepts — AI concepts will replace them shortly.")
+    
+    # Background generation status
+    ready = len(quiz.questions)
+    if generating:
+        st.info(f"🤖 AI is crafting your questions in the background... {ready} of {expected_question_count()} ready.")
+    elif ready == 0:
+        error = stream.error if stream is not None else quiz.generation_error
+        st.error("😕 Oops! We couldn't generate questions from this content. Try adding more text or using different material."
+                 + (f" ({error})" if error else ""))
+    elif ready < (quiz.questions_requested or 0):
+        st.warning(f"⚠️ Only {ready} of the {quiz.questions_requested} requested questions could be generated "
+                   "without repeats — the quiz will use those.")
+    
+    # Quiz summary
+    st.markdown("<div style='height: 1.5rem;'></div>", unsafe_allow_html=True)
+    
+    st.markdown(f"""
+    <div class="glass-card">
+        <h4 style="margin: 0 0 1rem 0; color: #1e293b;">📋 Quiz Summary</h4>
+        <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 1rem;">
+            <div>
+                <span style="color: #64748b;">Questions:</span>
+                <strong style="color: #667eea;"> {expected_question_count()}</strong>
+            </div>
+            <div>
+                <span style="color: #64748b;">Timer:</span>
+                <strong style="color: #667eea;"> {quiz.timer_duration}s per question</strong>
+            </div>
+            <div>
+                <span style="color: #64748b;">Starting Difficulty:</span>
+                <strong style="color: #f59e0b;"> Medium</strong>
+            </div>
+            <div>
+                <span style="color: #64748b;">Adaptive:</span>
+                <strong style="color: #10b981;"> Enabled</strong>
+            </div>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.markdown("<div style='height: 1.5rem;'></div>", unsafe_allow_html=True)
+    
+    col_a, col_b = st.columns(2)
+    with col_a:
+        if st.button("⬅️ Go Back", use_container_width=True):
+            reset_quiz()
+            st.rerun()
+    with col_b:
+        if st.button("🚀 Start Quiz", use_container_width=True, type="primary", disabled=(ready == 0)):
+            quiz.current_stage = 'quiz'
+            quiz.quiz_start_time = time.time()
+            quiz.question_start_time = time.time()
+            st.rerun()
 
 def render_quiz_stage():
-    questions = st.session_state.questions
-    current_idx = st.session_state.current_question_idx
+    generating = sync_streamed_questions()
+    questions = quiz.questions
+    current_idx = quiz.current_question_idx
     
     if current_idx >= len(questions):
-        st.session_state.current_stage = 'results'
-        st.rerun()
+        if generating:
+            # The player caught up with the generator; poll for the next question
+            wait_for_next_question(current_idx)
+        else:
+            quiz.current_stage = 'results'
+            st.rerun()
         return
     
     current_question = questions[current_idx]
-    
-    # Render countdown timer
-    render_timer()
-    
+    total_questions = expected_question_count()
+    
+    # Feedback for the previous answer, then the countdown timer. The timer
+    # and question card are fragments, so ticking the clock or picking an
+    # option reruns only that part of the page
+    render_answer_feedback()
+    if quiz.show_timer:
+        render_timer(current_idx, current_question)
+    render_quiz_stats(current_idx, total_questions, current_question)
+    render_question_card(current_idx, current_question)
+
+def render_quiz_stats(current_idx: int, total_questions: int, current_question: dict):
+    """Progress bar and stat cards for the current question."""
     # Progress section with animation
-    progress = (current_idx + 1) / len(questions)
+    progress = (current_idx + 1) / total_questions
     
     st.markdown(f"""
     <div style="text-align: center; margin-bottom: 1rem;">
-        <span style="color: #000000; font-weight: 800; font-size: 1.5rem;">Question {current_idx + 1} of {len(questions)}</span>
+        <span style="color: #000000; font-weight: 800; font-size: 1.5rem;">Question {current_idx + 1} of {total_questions}</span>
     </div>
     """, unsafe_allow_html=True)
     
     st.progress(progress)
     
     # Stats row with better styling
-    correct_count = sum(1 for a in st.session_state.user_answers if a['is_correct'])
+    correct_count = sum(1 for a in quiz.user_answers if a['is_correct'])
     
     st.markdown("<div style='height: 1rem;'></div>", unsafe_allow_html=True)
     
@@ -1081,7 +512,7 @@ def render_quiz_stage():
         st.markdown(f"""
         <div class="glass-card" style="padding: 1.75rem; text-align: center;">
             <div style="font-size: 1.1rem; color: #000000; text-transform: uppercase; font-weight: 800;">Progress</div>
-            <div style="font-size: 2.5rem; font-weight: 800; color: #667eea;">{current_idx + 1}/{len(questions)}</div>
+            <div style="font-size: 2.5rem; font-weight: 800; color: #667eea;">{current_idx + 1}/{total_questions}</div>
         </div>
         """, unsafe_allow_html=True)
     with col2:
@@ -1097,11 +528,11 @@ def render_quiz_stage():
             'medium': ('🟡', '#b45309', '#fef3c7'), 
             'hard': ('🔴', '#b91c1c', '#fee2e2')
         }
-        icon, color, bg = difficulty_styles.get(st.session_state.current_difficulty, ('🟡', '#b45309', '#fef3c7'))
+        icon, color, bg = difficulty_styles.get(quiz.current_difficulty, ('🟡', '#b45309', '#fef3c7'))
         st.markdown(f"""
         <div class="glass-card" style="padding: 1.75rem; text-align: center;">
             <div style="font-size: 1.1rem; color: #000000; text-transform: uppercase; font-weight: 800;">Difficulty</div>
-            <div style="font-size: 1.75rem; font-weight: 800; color: {color};">{icon} {st.session_state.current_difficulty.title()}</div>
+            <div style="font-size: 1.75rem; font-weight: 800; color: {color};">{icon} {quiz.current_difficulty.title()}</div>
         </div>
         """, unsafe_allow_html=True)
     with col4:
@@ -1114,7 +545,10 @@ def render_quiz_stage():
         """, unsafe_allow_html=True)
     
     st.markdown("<div style='height: 1.5rem;'></div>", unsafe_allow_html=True)
-    
+
+@st.fragment
+def render_question_card(current_idx: int, current_question: dict):
+    """Question text and answer input; submitting reruns the whole app."""
     # Question card with enhanced styling
     difficulty_badge = {
         'easy': '<span class="difficulty-badge difficulty-easy">🟢 Easy</span>',
@@ -1138,15 +572,15 @@ def render_quiz_stage():
     if question_type == 'mcq':
         options = [current_question['answer']] + current_question.get('distractors', [])
         import random
-        if 'shuffled_options' not in st.session_state or st.session_state.get('last_question_idx') != current_idx:
+        if quiz.shuffled_options is None or quiz.last_question_idx != current_idx:
             random.shuffle(options)
-            st.session_state.shuffled_options = options
-            st.session_state.last_question_idx = current_idx
+            quiz.shuffled_options = options
+            quiz.last_question_idx = current_idx
         
         st.markdown("<p style='font-size: 1.5rem; font-weight: 700; color: #000000; margin-bottom: 0.5rem;'>Select your answer:</p>", unsafe_allow_html=True)
         selected = st.radio(
             "Select your answer:",
-            st.session_state.shuffled_options,
+            quiz.shuffled_options,
             index=None,
             key=f"q_{current_idx}",
             label_visibility="collapsed"
@@ -1193,48 +627,45 @@ def render_quiz_stage():
             else:
                 st.warning("Please enter an answer first.")
 
-def submit_answer(user_answer, question):
-    response_time = time.time() - st.session_state.question_start_time
+def submit_answer(user_answer, question, timed_out=False):
+    response_time = quiz.timer_duration if timed_out else time.time() - quiz.question_start_time
     
-    is_correct = st.session_state.quiz_engine.check_answer(
+    is_correct = resources.engine.check_answer(
         user_answer=user_answer,
         correct_answer=question['answer'],
         question_type=question.get('type', 'mcq')
     )
     
     # Record answer
-    st.session_state.user_answers.append({
-        'question': question['question'],
-        'user_answer': user_answer,
-        'correct_answer': question['answer'],
-        'is_correct': is_correct,
-        'difficulty': question.get('difficulty', 'medium'),
-        'topic': question.get('topic', 'General'),
-        'response_time': response_time
-    })
+    quiz.user_answers.append(AnswerRecord(
+        question=question['question'],
+        user_answer=user_answer,
+        correct_answer=question['answer'],
+        is_correct=is_correct,
+        difficulty=question.get('difficulty', 'medium'),
+        topic=question.get('topic', 'General'),
+        response_time=response_time
+    ))
     
     # Update difficulty based on performance
-    st.session_state.current_difficulty = st.session_state.quiz_engine.get_next_difficulty(
-        current_difficulty=st.session_state.current_difficulty,
+    quiz.current_difficulty = resources.engine.get_next_difficulty(
+        current_difficulty=quiz.current_difficulty,
         is_correct=is_correct,
-        recent_answers=st.session_state.user_answers[-5:]
+        recent_answers=quiz.user_answers[-5:]
     )
     
-    # Show feedback
-    if is_correct:
-        st.success("✅ Correct!")
-    else:
-        st.error(f"❌ Not quite! The correct answer was: **{question['answer']}**. Keep going, you're learning!")
-    
-    time.sleep(1)
+    # Feedback is rendered on the next run instead of sleeping here
+    quiz.last_feedback = (quiz.current_question_idx, is_correct, question['answer'], timed_out)
     
     # Move to next question
-    st.session_state.current_question_idx += 1
-    st.session_state.question_start_time = time.time()
+    quiz.current_question_idx += 1
+    quiz.question_start_time = time.time()
     st.rerun()
 
 def render_results_stage():
-    results = st.session_state.analytics.calculate_results(st.session_state.user_answers)
+    render_answer_feedback()  # how the final question went
+    quiz.last_feedback = None  # shown once; later reruns (e.g. Save to History) don't repeat it
+    results = resources.analytics.calculate_results(quiz.user_answers)
     accuracy = results['accuracy']
     
     # Celebration based on performance
@@ -1324,7 +755,7 @@ def render_results_stage():
             <h3 style="margin: 0; color: #000000; font-weight: 800; font-size: 1.6rem;">Accuracy Breakdown</h3>
         </div>
         """, unsafe_allow_html=True)
-        st.session_state.analytics.plot_accuracy_pie(results)
+        resources.analytics.plot_accuracy_pie(results)
     
     with col2:
         st.markdown("""
@@ -1333,7 +764,7 @@ def render_results_stage():
             <h3 style="margin: 0; color: #000000; font-weight: 800; font-size: 1.6rem;">Topic Performance</h3>
         </div>
         """, unsafe_allow_html=True)
-        st.session_state.analytics.plot_topic_performance(st.session_state.user_answers)
+        resources.analytics.plot_topic_performance(results)
     
     st.markdown("<div style='height: 1.5rem;'></div>", unsafe_allow_html=True)
     
@@ -1344,7 +775,7 @@ def render_results_stage():
         <h3 style="margin: 0; color: #000000; font-weight: 800; font-size: 1.6rem;">Difficulty Progression</h3>
     </div>
     """, unsafe_allow_html=True)
-    st.session_state.analytics.plot_difficulty_progression(st.session_state.user_answers)
+    resources.analytics.plot_difficulty_progression(results)
     
     st.markdown("<div style='height: 1.5rem;'></div>", unsafe_allow_html=True)
     
@@ -1355,7 +786,7 @@ def render_results_stage():
         <h3 style="margin: 0; color: #1e293b;">Personalized Recommendations</h3>
     </div>
     """, unsafe_allow_html=True)
-    recommendations = st.session_state.analytics.get_recommendations(st.session_state.user_answers)
+    recommendations = resources.analytics.get_recommendations(results)
     
     for rec in recommendations:
         if rec['type'] == 'strength':
@@ -1375,7 +806,7 @@ def render_results_stage():
     
     # Detailed answers with enhanced expander
     with st.expander("📝 View Detailed Answers", expanded=False):
-        for i, answer in enumerate(st.session_state.user_answers):
+        for i, answer in enumerate(quiz.user_answers):
             is_correct = answer['is_correct']
             bg_color = "#d1fae5" if is_correct else "#fee2e2"
             border_color = "#10b981" if is_correct else "#ef4444"
@@ -1399,7 +830,7 @@ def render_results_stage():
         if st.button("📥 Export Results", use_container_width=True):
             export_data = {
                 'results': results,
-                'answers': st.session_state.user_answers,
+                'answers': [dict(a) for a in quiz.user_answers],
                 'timestamp': datetime.now().isoformat()
             }
             st.download_button(
@@ -1410,9 +841,11 @@ def render_results_stage():
             )
     with col3:
         if st.button("📊 Save to History", use_container_width=True):
-            st.session_state.analytics.save_to_history(results, st.session_state.user_answers)
+            resources.analytics.save_to_history(results, quiz.user_answers)
             st.success("Results saved!")
 
+HISTORY_PAGE_SIZE = 20  # quiz records rendered per "Load more"
+
 def render_history_stage():
     """Display quiz history."""
     st.markdown('''
@@ -1422,9 +855,18 @@ def render_history_stage():
     </div>
     ''', unsafe_allow_html=True)
     
-    history = st.session_state.analytics.get_history()
+    analytics = resources.analytics
+    summary = analytics.get_history_summary()
+    
+    # Reload from the first page whenever attempts were added or cleared
+    if quiz.history_total != summary['total_quizzes']:
+        page = analytics.get_history_page(limit=HISTORY_PAGE_SIZE)
+        quiz.history_records = page['records']
+        quiz.history_cursor = page['next_cursor']
+        quiz.history_total = summary['total_quizzes']
+    history = quiz.history_records
     
-    if not history:
+    if not summary['total_quizzes']:
         st.markdown("""
         <div style="text-align: center; padding: 3rem; color: #64748b;">
             <span style="font-size: 4rem;">📭</span>
@@ -1434,9 +876,9 @@ def render_history_stage():
         """, unsafe_allow_html=True)
     else:
         # Summary stats
-        total_quizzes = len(history)
-        avg_accuracy = sum(h.get('accuracy', 0) for h in history) / total_quizzes if total_quizzes > 0 else 0
-        total_questions = sum(h.get('num_questions', 0) for h in history)
+        total_quizzes = summary['total_quizzes']
+        avg_accuracy = summary['avg_accuracy']
+        total_questions = summary['total_questions']
         
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -1464,14 +906,14 @@ def render_history_stage():
         st.markdown("<div style='height: 2rem;'></div>", unsafe_allow_html=True)
         
         # Plot accuracy over time
-        if len(history) > 1:
+        if total_quizzes > 1:
             st.markdown("""
             <div style="display: flex; align-items: center; gap: 0.5rem; margin-bottom: 1rem;">
                 <span style="font-size: 1.5rem;">📈</span>
                 <h3 style="margin: 0; color: #1e293b;">Accuracy Trend</h3>
             </div>
             """, unsafe_allow_html=True)
-            st.session_state.analytics.plot_history_trend(history)
+            analytics.plot_history_trend(analytics.get_accuracy_series())
         
         st.markdown("<div style='height: 1.5rem;'></div>", unsafe_allow_html=True)
         
@@ -1483,9 +925,11 @@ def render_history_stage():
         </div>
         """, unsafe_allow_html=True)
         
-        for i, record in enumerate(reversed(history)):
+        for i, record in enumerate(history):
             timestamp = record.get('timestamp', 'Unknown')
-            if isinstance(timestamp, str):
+            if isinstance(timestamp, datetime):
+                timestamp = timestamp.strftime("%B %d, %Y at %I:%M %p")
+            elif isinstance(timestamp, str):
                 try:
                     dt = datetime.fromisoformat(timestamp)
                     timestamp = dt.strftime("%B %d, %Y at %I:%M %p")
@@ -1513,7 +957,7 @@ def render_history_stage():
             <div class="history-card" style="border-left: 4px solid {accent_color};">
                 <div style="display: flex; justify-content: space-between; align-items: center;">
                     <div>
-                        <strong style="color: #1e293b;">Quiz #{len(history) - i}</strong>
+                        <strong style="color: #1e293b;">Quiz #{total_quizzes - i}</strong>
                         <span style="color: #64748b; margin-left: 0.5rem; font-size: 0.85rem;">{timestamp}</span>
                     </div>
                     <span style="background: {accent_color}20; color: {accent_color}; padding: 0.25rem 0.75rem; border-radius: 1rem; font-size: 0.85rem; font-weight: 600;">{badge}</span>
@@ -1524,6 +968,15 @@ def render_history_stage():
                 </div>
             </div>
             """, unsafe_allow_html=True)
+        
+        # Only the loaded pages are rendered; fetch the next one on demand
+        if quiz.history_cursor:
+            st.caption(f"Showing {len(history)} of {total_quizzes} quizzes")
+            if st.button("⬇️ Load more", use_container_width=True):
+                page = analytics.get_history_page(limit=HISTORY_PAGE_SIZE, cursor=quiz.history_cursor)
+                quiz.history_records = history + page['records']
+                quiz.history_cursor = page['next_cursor']
+                st.rerun()
     
     st.markdown("<div style='height: 1.5rem;'></div>", unsafe_allow_html=True)
     
@@ -1536,8 +989,8 @@ def render_history_stage():
         st.markdown('</div>', unsafe_allow_html=True)
     with col2:
         st.markdown('<div class="clear-history-btn">', unsafe_allow_html=True)
-        if history and st.button("🗑️ Clear History", use_container_width=True):
-            st.session_state.analytics.clear_history()
+        if summary['total_quizzes'] and st.button("🗑️ Clear History", use_container_width=True):
+            analytics.clear_history()
             st.rerun()
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -1553,17 +1006,17 @@ with st.sidebar:
     st.markdown("---")
 
     # Back to Home (only when not on upload)
-    if st.session_state.get('current_stage', 'upload') != 'upload':
+    if quiz.current_stage != 'upload':
         if st.button("Back to Home", use_container_width=True):
             reset_quiz()
             st.rerun()
 
     # View History button (emoji label)
     if st.button("📜 View History", use_container_width=True):
-        st.session_state.current_stage = 'history'
+        quiz.current_stage = 'history'
         st.rerun()
 
-    # Helper: add a demo history entry so you can see the history page populated
+    # Helper: add a few demo history entries so you can see the history page populated
     if st.button("Add demo history", use_container_width=True):
         demo_answers = [
             {'is_correct': True, 'response_time': 8.2, 'topic': 'Topic A', 'difficulty': 'easy'},
@@ -1572,9 +1025,14 @@ with st.sidebar:
             {'is_correct': True, 'response_time': 7.4, 'topic': 'Topic C', 'difficulty': 'medium'},
             {'is_correct': False, 'response_time': 15.0, 'topic': 'Topic B', 'difficulty': 'hard'}
         ]
-        results = st.session_state.analytics.calculate_results(demo_answers)
-        st.session_state.analytics.save_to_history(results, demo_answers)
-        st.success("Demo history entry added.")
+        attempts = []
+        for shift in range(DEMO_ATTEMPTS):
+            # Rotate which answers are right so the attempts differ
+            answers = [dict(a, is_correct=demo_answers[(i + shift) % len(demo_answers)]['is_correct'])
+                       for i, a in enumerate(demo_answers)]
+            attempts.append((resources.analytics.calculate_results(answers), answers))
+        resources.analytics.save_many_to_history(attempts)
+        st.success(f"{DEMO_ATTEMPTS} demo history entries added.")
         st.rerun()
 
     st.markdown("""
@@ -1592,28 +1050,30 @@ with st.sidebar:
 
     # Show current stage for debugging (visible in sidebar)
     try:
-        st.markdown(f"**Current stage:** {st.session_state.get('current_stage', 'unset')}")
+        st.markdown(f"**Current stage:** {quiz.current_stage}")
     except Exception:
         st.markdown("**Current stage:** unknown")
 
 # Main content dispatcher
-if 'current_stage' not in st.session_state:
-    st.session_state.current_stage = 'upload'
-
+set_log_context(session_id=quiz.session_id, stage=quiz.current_stage)
 try:
-    if st.session_state.current_stage == 'upload':
+    if quiz.current_stage == 'upload':
         render_upload_stage()
-    elif st.session_state.current_stage == 'concepts':
+    elif quiz.current_stage == 'concepts':
         render_concepts_stage()
-    elif st.session_state.current_stage == 'quiz':
+    elif quiz.current_stage == 'quiz':
         render_quiz_stage()
-    elif st.session_state.current_stage == 'results':
+    elif quiz.current_stage == 'results':
         render_results_stage()
-    elif st.session_state.current_stage == 'history':
+    elif quiz.current_stage == 'history':
         render_history_stage()
     else:
-        st.info(f"Unknown stage: {st.session_state.current_stage}")
+        st.info(f"Unknown stage: {quiz.current_stage}")
 except Exception as e:
     import traceback
     st.error("Error while rendering page — see traceback below.")
     st.text(traceback.format_exc())
+
+# The run finished, so the stylesheet injector reached the browser
+if styles_sent:
+    quiz.css_digest = styles_sent
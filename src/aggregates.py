@@ -0,0 +1,254 @@
+"""
+Aggregates - Running per-user and per-topic quiz statistics
+"""
+
+import os
+import copy
+import json
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Import logger
+try:
+    from src.logger import get_database_logger
+    logger = get_database_logger()
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+from src.history_store import HistoryStore, _FileLock
+
+
+def attempt_deltas(entry: Dict) -> Dict:
+    """
+    Increments one quiz attempt contributes to the running aggregates.
+
+    Returns a dict with the user-level increments plus 'topics', a map of
+    topic -> {'correct', 'total'} increments.
+    """
+    topics = {}
+    for answer in entry.get('answers', []):
+        stats = topics.setdefault(answer.get('topic', 'General'), {'correct': 0, 'total': 0})
+        stats['total'] += 1
+        if answer.get('is_correct'):
+            stats['correct'] += 1
+    accuracy = entry.get('accuracy', 0) or 0
+    return {
+        'total_quizzes': 1,
+        'total_questions': entry.get('num_questions', 0) or 0,
+        'accuracy_sum': accuracy,
+        'best_accuracy': accuracy,
+        'total_time': entry.get('total_time', 0) or 0,
+        'topics': topics
+    }
+
+
+def merge_deltas(entries: Iterable[Dict]) -> Dict[str, Dict]:
+    """Combine the deltas of many attempts into one set per user."""
+    merged = {}
+    for entry in entries:
+        deltas = attempt_deltas(entry)
+        user_id = entry.get('user_id', 'default')
+        if user_id not in merged:
+            merged[user_id] = deltas
+            continue
+        total = merged[user_id]
+        for field in ('total_quizzes', 'total_questions', 'accuracy_sum', 'total_time'):
+            total[field] += deltas[field]
+        total['best_accuracy'] = max(total['best_accuracy'], deltas['best_accuracy'])
+        for topic, inc in deltas['topics'].items():
+            stats = total['topics'].setdefault(topic, {'correct': 0, 'total': 0})
+            stats['correct'] += inc['correct']
+            stats['total'] += inc['total']
+    return merged
+
+
+def format_user_stats(raw: Optional[Dict]) -> Dict:
+    """Turn running sums into the get_user_stats result shape."""
+    raw = raw or {}
+    quizzes = raw.get('total_quizzes', 0)
+    return {
+        'total_quizzes': quizzes,
+        'total_questions': raw.get('total_questions', 0),
+        'avg_accuracy': round(raw.get('accuracy_sum', 0) / quizzes, 1) if quizzes else 0,
+        'best_accuracy': raw.get('best_accuracy', 0) if quizzes else 0,
+        'total_time': round(raw.get('total_time', 0), 1)
+    }
+
+
+def format_topic_stats(correct: int, total: int) -> Dict:
+    """One topic's entry in the get_topic_performance result."""
+    return {
+        'correct': correct,
+        'total': total,
+        'accuracy': round((correct / total * 100) if total > 0 else 0, 1)
+    }
+
+
+class StatsAggregates:
+    """
+    Running quiz statistics for the JSON backend, kept in a small sidecar file.
+
+    Each save does a locked read-modify-write of the sidecar, which is
+    O(users x topics) rather than O(history), and stays correct when
+    several app processes share the same files. QuizDatabase applies each
+    update while holding the history log's lock, so the sidecar and the log
+    change together. Reads reuse the in-memory copy until the file changes
+    on disk. A sidecar that is missing or can't be parsed is recomputed
+    from `history` (when given) and saved, rather than read as empty.
+    """
+
+    def __init__(self, filepath: str = 'quiz_stats.json', history: Optional[HistoryStore] = None):
+        self.filepath = filepath
+        self.history = history
+        self._lock = threading.Lock()
+        self._data = None
+        self._mtime = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.filepath)
+
+    def apply(self, entry: Dict):
+        """Fold one new attempt into the aggregates."""
+        self.apply_many([entry])
+
+    def apply_many(self, entries: List[Dict]):
+        """
+        Fold a batch of attempts into the aggregates with a single write.
+
+        With `history`, call this once the attempts have been appended to it.
+        """
+        merged = merge_deltas(entries)
+        if not merged:
+            return
+        with _FileLock(self._lock, self.filepath + '.lock'):
+            data, rebuilt = self._load()
+            data = copy.deepcopy(data)
+            if not rebuilt:  # a rebuild already counts entries appended to history
+                for user_id, deltas in merged.items():
+                    self._add(data, user_id, deltas)
+            self._write(data)
+
+    def reset(self, user_id: Optional[str] = None):
+        """Drop the aggregates of one user, or everyone when user_id is None."""
+        with _FileLock(self._lock, self.filepath + '.lock'):
+            data = copy.deepcopy(self._read())
+            if user_id is None:
+                data = {'users': {}, 'topics': {}}
+            else:
+                data['users'].pop(user_id, None)
+                data['topics'].pop(user_id, None)
+            self._write(data)
+
+    def discard(self):
+        """Delete the sidecar, so the next read recomputes it from history."""
+        with _FileLock(self._lock, self.filepath + '.lock'):
+            try:
+                os.remove(self.filepath)
+            except OSError:
+                pass
+            self._data = None
+            self._mtime = None
+
+    def rebuild(self, entries: Iterable[Dict]) -> int:
+        """
+        Recompute every aggregate from raw history.
+
+        Returns:
+            Number of attempts folded in
+        """
+        data, count = self._build(entries)
+        with _FileLock(self._lock, self.filepath + '.lock'):
+            self._write(data)
+        logger.info(f"Rebuilt aggregates from {count} attempts")
+        return count
+
+    def user_stats(self, user_id: str = 'default') -> Dict:
+        return format_user_stats(self._snapshot()['users'].get(user_id))
+
+    def topic_performance(self, user_id: str = 'default') -> Dict[str, Dict]:
+        topics = self._snapshot()['topics'].get(user_id, {})
+        return {topic: format_topic_stats(s['correct'], s['total']) for topic, s in topics.items()}
+
+    # ==================== Helper Methods ====================
+
+    def _build(self, entries: Iterable[Dict]) -> Tuple[Dict, int]:
+        """Aggregates computed from scratch, and the number of attempts in them."""
+        data = {'users': {}, 'topics': {}}
+        count = 0
+        for entry in entries:
+            self._add(data, entry.get('user_id', 'default'), attempt_deltas(entry))
+            count += 1
+        return data, count
+
+    def _add(self, data: Dict, user_id: str, deltas: Dict):
+        user = data['users'].setdefault(user_id, {
+            'total_quizzes': 0, 'total_questions': 0, 'accuracy_sum': 0,
+            'best_accuracy': 0, 'total_time': 0
+        })
+        for field in ('total_quizzes', 'total_questions', 'accuracy_sum', 'total_time'):
+            user[field] += deltas[field]
+        user['best_accuracy'] = max(user['best_accuracy'], deltas['best_accuracy'])
+
+        topics = data['topics'].setdefault(user_id, {})
+        for topic, inc in deltas['topics'].items():
+            stats = topics.setdefault(topic, {'correct': 0, 'total': 0})
+            stats['correct'] += inc['correct']
+            stats['total'] += inc['total']
+
+    def _snapshot(self) -> Dict:
+        with self._lock:
+            data = self._read_sidecar()
+        if data is not None:
+            return data
+        if self.history is None:
+            return {'users': {}, 'topics': {}}
+        # Recompute and save, so later reads don't rescan the history. The
+        # history lock is taken first, as it is for writers.
+        with self.history.locked():
+            self.rebuild(self.history.iter_records())
+        with self._lock:
+            return self._data
+
+    def _read(self) -> Dict:
+        """Current aggregates. Caller holds the lock."""
+        return self._load()[0]
+
+    def _load(self) -> Tuple[Dict, bool]:
+        """
+        Current aggregates and whether they had to be recomputed from
+        history. Caller holds the lock (and, with history, the history lock).
+        """
+        data = self._read_sidecar()
+        if data is not None:
+            return data, False
+        if self.history is None:
+            return {'users': {}, 'topics': {}}, False
+        return self._build(self.history.iter_records())[0], True
+
+    def _read_sidecar(self) -> Optional[Dict]:
+        """The sidecar's contents, reloaded only if it changed; None if missing or unreadable."""
+        try:
+            mtime = os.stat(self.filepath).st_mtime_ns
+        except OSError:
+            return None
+        if self._data is None or mtime != self._mtime:
+            try:
+                with open(self.filepath, 'r') as f:
+                    data = json.load(f)
+                if not isinstance(data, dict) or 'users' not in data or 'topics' not in data:
+                    raise ValueError("unexpected layout")
+                self._data = data
+                self._mtime = mtime
+            except (OSError, ValueError) as e:  # JSONDecodeError is a ValueError
+                logger.warning(f"Could not read {self.filepath}, recomputing from history: {e}")
+                return None
+        return self._data
+
+    def _write(self, data: Dict):
+        tmp_path = self.filepath + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.filepath)
+        self._data = data
+        self._mtime = os.stat(self.filepath).st_mtime_ns
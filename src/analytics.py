@@ -2,10 +2,10 @@
 Analytics - Performance tracking and visualization
 """
 
-import json
-import os
-from datetime import datetime
-from typing import List, Dict
+import hashlib
+import threading
+from typing import List, Dict, Optional, Tuple, Union
+import numpy as np
 import streamlit as st
 
 # Import logger
@@ -16,73 +16,42 @@ except ImportError:
     import logging
     logger = logging.getLogger(__name__)
 
-try:
-    import plotly.express as px
-    import plotly.graph_objects as go
-    PLOTLY_AVAILABLE = True
-except ImportError:
-    PLOTLY_AVAILABLE = False
+# plotly is imported when the first chart is built
+from src.lazy import lazy_import, module_available
+go = lazy_import('plotly.graph_objects')
+PLOTLY_AVAILABLE = module_available('plotly')
+
+from src.database import QuizDatabase, get_database
+from src.results_engine import QuizResults, lttb_indices
+
+# Upper bound for get_history(); the history page uses get_history_page instead
+HISTORY_LIMIT = 10000
+
+# Built figures kept across reruns, and the most points drawn on the history trend
+FIGURE_CACHE_SIZE = 64
+TREND_MAX_POINTS = 300
 
 
 class QuizAnalytics:
-    def __init__(self):
-        self.history_file = 'quiz_history.json'
-        logger.info("QuizAnalytics initialized")
+    def __init__(self, database: Optional[QuizDatabase] = None, user_id: str = "default"):
+        # History lives in the same store (and schema) as QuizDatabase, so
+        # the results and history pages read one indexed backend
+        self.db = database or get_database()
+        self.user_id = user_id
+        logger.info(f"QuizAnalytics initialized ({self.db.get_storage_type()})")
     
-    def calculate_results(self, answers: List[Dict]) -> Dict:
-        """Calculate quiz results from answers."""
+    def calculate_results(self, answers: List[Dict]) -> QuizResults:
+        """Calculate quiz results from answers in a single columnar pass."""
         logger.info(f"Calculating results for {len(answers)} answers")
         if not answers:
             logger.warning("No answers to calculate")
-            return {
-                'total': 0,
-                'correct': 0,
-                'incorrect': 0,
-                'accuracy': 0,
-                'avg_response_time': 0,
-                'topic_performance': {},
-                'difficulty_performance': {}
-            }
-        
-        total = len(answers)
-        correct = sum(1 for a in answers if a['is_correct'])
-        incorrect = total - correct
-        accuracy = round((correct / total) * 100) if total > 0 else 0
-        
-        logger.info(f"Quiz results: {correct}/{total} ({accuracy}% accuracy)")
-        # Calculate average response time
-        response_times = [a.get('response_time', 0) for a in answers]
-        avg_response_time = sum(response_times) / len(response_times) if response_times else 0
-        
-        # Topic performance
-        topic_performance = {}
-        for answer in answers:
-            topic = answer.get('topic', 'General')
-            if topic not in topic_performance:
-                topic_performance[topic] = {'correct': 0, 'total': 0}
-            topic_performance[topic]['total'] += 1
-            if answer['is_correct']:
-                topic_performance[topic]['correct'] += 1
-        
-        # Difficulty performance
-        difficulty_performance = {}
-        for answer in answers:
-            diff = answer.get('difficulty', 'medium')
-            if diff not in difficulty_performance:
-                difficulty_performance[diff] = {'correct': 0, 'total': 0}
-            difficulty_performance[diff]['total'] += 1
-            if answer['is_correct']:
-                difficulty_performance[diff]['correct'] += 1
-        
-        return {
-            'total': total,
-            'correct': correct,
-            'incorrect': incorrect,
-            'accuracy': accuracy,
-            'avg_response_time': avg_response_time,
-            'topic_performance': topic_performance,
-            'difficulty_performance': difficulty_performance
-        }
+        results = QuizResults(answers)
+        logger.info(f"Quiz results: {results['correct']}/{results['total']} ({results['accuracy']}% accuracy)")
+        return results
+    
+    def _as_results(self, data: Union[QuizResults, List[Dict]]) -> QuizResults:
+        """Accept either a computed result or raw answers."""
+        return data if isinstance(data, QuizResults) else QuizResults(data)
     
     def plot_accuracy_pie(self, results: Dict):
         """Plot accuracy pie chart."""
@@ -90,119 +59,34 @@ class QuizAnalytics:
             st.write(f"Correct: {results['correct']}, Incorrect: {results['incorrect']}")
             return
         
-        fig = go.Figure(data=[go.Pie(
-            labels=['Correct', 'Incorrect'],
-            values=[results['correct'], results['incorrect']],
-            hole=0.4,
-            marker_colors=['#10b981', '#ef4444']
-        )])
-        
-        fig.update_layout(
-            showlegend=True,
-            height=300,
-            margin=dict(l=20, r=20, t=20, b=20)
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(_accuracy_pie_figure(results['correct'], results['incorrect']), use_container_width=True)
     
-    def plot_topic_performance(self, answers: List[Dict]):
+    def plot_topic_performance(self, answers: Union[QuizResults, List[Dict]]):
         """Plot topic performance bar chart."""
         if not PLOTLY_AVAILABLE:
             st.write("Topic performance visualization requires plotly")
             return
         
-        topic_stats = {}
-        for answer in answers:
-            topic = answer.get('topic', 'General')[:20]
-            if topic not in topic_stats:
-                topic_stats[topic] = {'correct': 0, 'total': 0}
-            topic_stats[topic]['total'] += 1
-            if answer['is_correct']:
-                topic_stats[topic]['correct'] += 1
-        
-        topics = list(topic_stats.keys())
-        accuracies = [
-            (stats['correct'] / stats['total'] * 100) if stats['total'] > 0 else 0
-            for stats in topic_stats.values()
-        ]
-        
-        fig = go.Figure(data=[
-            go.Bar(
-                x=topics,
-                y=accuracies,
-                marker_color='#667eea'
-            )
-        ])
-        
-        fig.update_layout(
-            xaxis_title="Topic",
-            yaxis_title="Accuracy (%)",
-            height=300,
-            margin=dict(l=20, r=20, t=20, b=20)
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        results = self._as_results(answers)
+        st.plotly_chart(_topic_figure(results.digest, results), use_container_width=True)
     
-    def plot_difficulty_progression(self, answers: List[Dict]):
+    def plot_difficulty_progression(self, answers: Union[QuizResults, List[Dict]]):
         """Plot difficulty progression over time."""
         if not PLOTLY_AVAILABLE:
             st.write("Difficulty progression visualization requires plotly")
             return
         
-        difficulty_map = {'easy': 1, 'medium': 2, 'hard': 3}
-        
-        question_nums = list(range(1, len(answers) + 1))
-        difficulties = [
-            difficulty_map.get(a.get('difficulty', 'medium'), 2) 
-            for a in answers
-        ]
-        correct_markers = [
-            'green' if a['is_correct'] else 'red' 
-            for a in answers
-        ]
-        
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatter(
-            x=question_nums,
-            y=difficulties,
-            mode='lines+markers',
-            line=dict(color='#667eea', width=2),
-            marker=dict(size=10, color=correct_markers),
-            name='Difficulty'
-        ))
-        
-        fig.update_layout(
-            xaxis_title="Question Number",
-            yaxis_title="Difficulty Level",
-            yaxis=dict(
-                tickmode='array',
-                tickvals=[1, 2, 3],
-                ticktext=['Easy', 'Medium', 'Hard']
-            ),
-            height=300,
-            margin=dict(l=20, r=20, t=20, b=20)
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        results = self._as_results(answers)
+        st.plotly_chart(_difficulty_figure(results.digest, results), use_container_width=True)
     
-    def get_recommendations(self, answers: List[Dict]) -> List[Dict]:
+    def get_recommendations(self, answers: Union[QuizResults, List[Dict]]) -> List[Dict]:
         """Generate personalized recommendations."""
         recommendations = []
+        results = self._as_results(answers)
         
         # Analyze topic performance
-        topic_stats = {}
-        for answer in answers:
-            topic = answer.get('topic', 'General')
-            if topic not in topic_stats:
-                topic_stats[topic] = {'correct': 0, 'total': 0}
-            topic_stats[topic]['total'] += 1
-            if answer['is_correct']:
-                topic_stats[topic]['correct'] += 1
-        
-        for topic, stats in topic_stats.items():
-            accuracy = (stats['correct'] / stats['total'] * 100) if stats['total'] > 0 else 0
-            
+        topics, accuracies = results.topic_accuracy()
+        for topic, accuracy in zip(topics, accuracies):
             if accuracy >= 80:
                 recommendations.append({
                     'type': 'strength',
@@ -217,7 +101,7 @@ class QuizAnalytics:
                 })
         
         # Overall recommendations
-        total_accuracy = sum(1 for a in answers if a['is_correct']) / len(answers) * 100 if answers else 0
+        total_accuracy = results['correct'] / results['total'] * 100 if results['total'] else 0
         
         if total_accuracy >= 90:
             recommendations.append({
@@ -235,89 +119,166 @@ class QuizAnalytics:
         return recommendations
     
     def save_to_history(self, results: Dict, answers: List[Dict]):
-        """Save quiz results to history file."""
-        history = []
-        
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r') as f:
-                    history = json.load(f)
-            except:
-                history = []
-        
-        entry = {
-            'timestamp': datetime.now().isoformat(),
-            'results': results,
-            'num_questions': len(answers),
-            'accuracy': results['accuracy']
-        }
-        
-        history.append(entry)
-        
-        with open(self.history_file, 'w') as f:
-            json.dump(history, f, indent=2)
+        """Save a finished quiz, with its answers, to the shared quiz history."""
+        self.db.save_quiz_attempt(dict(results), answers, user_id=self.user_id)
+    
+    def save_many_to_history(self, attempts: List[Tuple[Dict, List[Dict]]]):
+        """Save several (results, answers) attempts through the write-behind buffer in one batch."""
+        for results, answers in attempts:
+            self.db.queue_quiz_attempt(dict(results), answers, user_id=self.user_id)
+        self.db.flush()
     
     def get_history(self) -> List[Dict]:
-        """Get quiz history."""
-        if not os.path.exists(self.history_file):
-            return []
-        
-        try:
-            with open(self.history_file, 'r') as f:
-                return json.load(f)
-        except:
-            return []
+        """Get quiz history, newest first."""
+        return self.db.get_quiz_history(self.user_id, limit=HISTORY_LIMIT)
+    
+    def get_history_page(self, limit: int = 20, cursor: Optional[str] = None) -> Dict:
+        """
+        Get one page of quiz history, newest first.
+        
+        Returns:
+            {'records': [...], 'next_cursor': str or None}; pass next_cursor
+            back in for the following page
+        """
+        return self.db.get_history_page(self.user_id, limit, cursor)
+    
+    def get_history_summary(self) -> Dict:
+        """Totals shown above the history list."""
+        return self.db.get_history_summary(self.user_id)
+    
+    def get_accuracy_series(self) -> List[float]:
+        """Accuracy of every attempt, oldest first, for the trend chart."""
+        return self.db.get_accuracy_series(self.user_id)
     
     def clear_history(self):
         """Clear all quiz history."""
-        if os.path.exists(self.history_file):
-            os.remove(self.history_file)
+        self.db.clear_quiz_history(self.user_id)
     
-    def plot_history_trend(self, history: List[Dict]):
-        """Plot accuracy trend over quiz attempts."""
+    def plot_history_trend(self, history: List[Union[Dict, float]]):
+        """Plot accuracy trend over quiz attempts (records or an accuracy series)."""
         if not PLOTLY_AVAILABLE or not history:
             st.write("Trend visualization requires plotly and history data")
             return
         
-        # Extract data
-        quiz_nums = list(range(1, len(history) + 1))
-        accuracies = [h.get('accuracy', 0) for h in history]
-        
-        fig = go.Figure()
-        
+        accuracies = np.array(
+            [h.get('accuracy', 0) if isinstance(h, dict) else h for h in history], dtype=float
+        )
+        digest = hashlib.sha1(accuracies.tobytes()).hexdigest()
+        st.plotly_chart(_history_figure(digest, accuracies), use_container_width=True)
+
+
+# Singleton instance for the default user
+_analytics_instance = None
+_analytics_lock = threading.Lock()
+
+def get_analytics() -> QuizAnalytics:
+    """Get or create the shared analytics instance."""
+    global _analytics_instance
+    with _analytics_lock:
+        if _analytics_instance is None:
+            _analytics_instance = QuizAnalytics()
+        return _analytics_instance
+
+
+# ==================== Figure Builders ====================
+# Cached by a digest of the underlying data, so reruns reuse the built
+# figure instead of rebuilding it. Arguments starting with an underscore
+# are not hashed by the cache; the digest stands in for them. The cache
+# holds go.Figure objects rather than dicts, which st.plotly_chart would
+# re-validate into a Figure on every call. Cached figures are shared
+# across sessions, so nothing may modify them after they are built.
+
+def _layout(fig, **kwargs):
+    fig.update_layout(height=300, margin=dict(l=20, r=20, t=20, b=20), **kwargs)
+    return fig
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_SIZE, show_spinner=False)
+def _accuracy_pie_figure(correct: int, incorrect: int) -> 'go.Figure':
+    fig = go.Figure(data=[go.Pie(
+        labels=['Correct', 'Incorrect'],
+        values=[correct, incorrect],
+        hole=0.4,
+        marker_colors=['#10b981', '#ef4444']
+    )])
+    return _layout(fig, showlegend=True)
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_SIZE, show_spinner=False)
+def _topic_figure(digest: str, _results: QuizResults) -> 'go.Figure':
+    topics, accuracies = _results.topic_accuracy(max_label=20)
+    fig = go.Figure(data=[
+        go.Bar(
+            x=topics,
+            y=accuracies.tolist(),
+            marker_color='#667eea'
+        )
+    ])
+    return _layout(fig, xaxis_title="Topic", yaxis_title="Accuracy (%)")
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_SIZE, show_spinner=False)
+def _difficulty_figure(digest: str, _results: QuizResults) -> 'go.Figure':
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=list(range(1, _results['total'] + 1)),
+        y=_results.difficulty_series().tolist(),
+        mode='lines+markers',
+        line=dict(color='#667eea', width=2),
+        marker=dict(size=10, color=np.where(_results.is_correct, 'green', 'red').tolist()),
+        name='Difficulty'
+    ))
+    return _layout(
+        fig,
+        xaxis_title="Question Number",
+        yaxis_title="Difficulty Level",
+        yaxis=dict(
+            tickmode='array',
+            tickvals=[1, 2, 3],
+            ticktext=['Easy', 'Medium', 'Hard']
+        )
+    )
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_SIZE, show_spinner=False)
+def _history_figure(digest: str, _accuracies: np.ndarray) -> 'go.Figure':
+    n = len(_accuracies)
+    quiz_nums = np.arange(1, n + 1)
+    
+    # Long histories are downsampled for drawing; the trend uses every point
+    keep = lttb_indices(_accuracies, TREND_MAX_POINTS)
+    many = len(keep) < n
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=quiz_nums[keep].tolist(),
+        y=_accuracies[keep].tolist(),
+        mode='lines' if many else 'lines+markers',
+        line=dict(color='#667eea', width=3),
+        marker=dict(size=10, color='#764ba2'),
+        fill='tozeroy',
+        fillcolor='rgba(102, 126, 234, 0.1)',
+        name='Accuracy'
+    ))
+    
+    # Add trend line if enough data (a straight line only needs its endpoints)
+    if n >= 3:
+        z = np.polyfit(quiz_nums, _accuracies, 1)
+        trend_color = '#10b981' if z[0] > 0 else '#ef4444'
+        ends = np.array([1, n])
         fig.add_trace(go.Scatter(
-            x=quiz_nums,
-            y=accuracies,
-            mode='lines+markers',
-            line=dict(color='#667eea', width=3),
-            marker=dict(size=10, color='#764ba2'),
-            fill='tozeroy',
-            fillcolor='rgba(102, 126, 234, 0.1)',
-            name='Accuracy'
+            x=ends.tolist(),
+            y=np.polyval(z, ends).tolist(),
+            mode='lines',
+            line=dict(color=trend_color, width=2, dash='dash'),
+            name='Trend'
         ))
-        
-        # Add trend line if enough data
-        if len(history) >= 3:
-            import numpy as np
-            z = np.polyfit(quiz_nums, accuracies, 1)
-            p = np.poly1d(z)
-            trend_color = '#10b981' if z[0] > 0 else '#ef4444'
-            fig.add_trace(go.Scatter(
-                x=quiz_nums,
-                y=[p(x) for x in quiz_nums],
-                mode='lines',
-                line=dict(color=trend_color, width=2, dash='dash'),
-                name='Trend'
-            ))
-        
-        fig.update_layout(
-            xaxis_title="Quiz Number",
-            yaxis_title="Accuracy (%)",
-            yaxis=dict(range=[0, 105]),
-            height=300,
-            margin=dict(l=20, r=20, t=20, b=20),
-            showlegend=True,
-            legend=dict(orientation="h", yanchor="bottom", y=1.02)
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+    
+    return _layout(
+        fig,
+        xaxis_title="Quiz Number",
+        yaxis_title="Accuracy (%)",
+        yaxis=dict(range=[0, 105]),
+        showlegend=True,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02)
+    )
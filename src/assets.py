@@ -0,0 +1,66 @@
+"""
+Assets - Minified, content-hashed static assets for the Streamlit UI
+"""
+
+import os
+import re
+import json
+import hashlib
+from typing import NamedTuple
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+_COMMENTS = re.compile(r'/\*.*?\*/', re.S)
+_WHITESPACE = re.compile(r'\s+')
+_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+_DECLARATIONS = re.compile(r'\{([^{}]*)\}')
+_COLON = re.compile(r'\s*:\s*')
+
+
+class Stylesheet(NamedTuple):
+    css: str      # minified text
+    digest: str   # short content hash, used as the cache key
+
+
+def minify_css(css: str) -> str:
+    """Strip comments and insignificant whitespace from a stylesheet."""
+    css = _COMMENTS.sub('', css)
+    css = _WHITESPACE.sub(' ', css)
+    css = _PUNCTUATION.sub(r'\1', css)
+    # Colons only lose their spaces inside declaration blocks; in a selector
+    # the space in `.a :hover` is a descendant combinator
+    css = _DECLARATIONS.sub(lambda m: '{' + _COLON.sub(':', m.group(1)) + '}', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def load_stylesheet(name: str = 'style.css') -> Stylesheet:
+    """Read a stylesheet from static/ and return it minified with its hash."""
+    with open(os.path.join(STATIC_DIR, name), 'r', encoding='utf-8') as f:
+        css = minify_css(f.read())
+    return Stylesheet(css, hashlib.sha256(css.encode('utf-8')).hexdigest()[:12])
+
+
+def style_injector(sheet: Stylesheet, element_id: str = 'smartquiz-css') -> str:
+    """
+    HTML for a zero-height component that installs the stylesheet in the
+    parent page's <head>.
+
+    The <style> tag outlives the component, so it only has to be sent once
+    per browser session; a changed digest replaces the old tag in place.
+    """
+    css = json.dumps(sheet.css).replace('</', '<\\/')
+    return f"""<script>
+(function() {{
+    const doc = window.parent.document;
+    let style = doc.getElementById('{element_id}');
+    if (style && style.dataset.digest === '{sheet.digest}') return;
+    if (!style) {{
+        style = doc.createElement('style');
+        style.id = '{element_id}';
+        doc.head.appendChild(style);
+    }}
+    style.dataset.digest = '{sheet.digest}';
+    style.textContent = {css};
+}})();
+</script>"""
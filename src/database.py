@@ -1,11 +1,12 @@
 """
-Database Module - MongoDB Atlas and JSON storage for quiz data
+Database Module - MongoDB Atlas, SQLite and JSON storage for quiz data
 """
 
 import os
 import json
+import threading
 from typing import List, Dict, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Import logger
 try:
@@ -15,78 +16,164 @@ except ImportError:
     import logging
     logger = logging.getLogger(__name__)
 
-# Try to import pymongo
-try:
-    from pymongo import MongoClient
-    from pymongo.errors import ConnectionFailure
-    MONGODB_AVAILABLE = True
-except ImportError:
-    MONGODB_AVAILABLE = False
+# pymongo is only imported once a MongoDB connection is actually made
+from src.lazy import lazy_import, module_available
+pymongo = lazy_import('pymongo')
+bson = lazy_import('bson')
+MONGODB_AVAILABLE = module_available('pymongo')
+
+from src.history_store import HistoryStore, get_history_store
+from src.sqlite_store import SQLiteStore
+from src.aggregates import StatsAggregates, merge_deltas, format_user_stats, format_topic_stats
+from src.write_buffer import WriteBehindBuffer
+
+
+
+def user_stats_pipeline(match: Optional[Dict] = None) -> List[Dict]:
+    """Server-side per-user totals over quiz_history, in the user_stats schema."""
+    return ([{'$match': match}] if match else []) + [
+        {'$project': {'user_id': 1, 'num_questions': 1, 'accuracy': 1, 'total_time': 1}},
+        {'$group': {
+            '_id': {'$ifNull': ['$user_id', 'default']},
+            'total_quizzes': {'$sum': 1},
+            'total_questions': {'$sum': '$num_questions'},
+            'accuracy_sum': {'$sum': '$accuracy'},
+            'best_accuracy': {'$max': '$accuracy'},
+            'total_time': {'$sum': '$total_time'}
+        }}
+    ]
+
+
+def topic_stats_pipeline(match: Optional[Dict] = None) -> List[Dict]:
+    """Server-side per-(user, topic) answer counts over quiz_history, in the topic_stats schema."""
+    return ([{'$match': match}] if match else []) + [
+        {'$project': {'user_id': 1, 'answers.topic': 1, 'answers.is_correct': 1}},
+        {'$unwind': '$answers'},
+        {'$group': {
+            '_id': {
+                'user_id': {'$ifNull': ['$user_id', 'default']},
+                'topic': {'$ifNull': ['$answers.topic', 'General']}
+            },
+            'correct': {'$sum': {'$cond': ['$answers.is_correct', 1, 0]}},
+            'total': {'$sum': 1}
+        }},
+        {'$project': {'_id': 0, 'user_id': '$_id.user_id', 'topic': '$_id.topic', 'correct': 1, 'total': 1}}
+    ]
 
 
 class QuizDatabase:
     """
-    Database handler that supports both MongoDB Atlas and local JSON storage.
-    Falls back to JSON if MongoDB is not available or configured.
+    Database handler that supports MongoDB Atlas, embedded SQLite and local
+    JSON storage. Falls back to the local backend selected by STORAGE_BACKEND
+    (json or sqlite) if MongoDB is not available or configured.
     """
     
-    def __init__(self):
+    def __init__(self, client=None):
+        """
+        Args:
+            client: Optional pre-built MongoClient (e.g. a mongomock client in
+                tests); when omitted, one is created from MONGODB_URI
+        """
         self.mongodb_uri = os.getenv('MONGODB_URI')
         self.db_name = os.getenv('MONGODB_DB_NAME', 'smartquizzer')
         self.use_mongodb = False
         self.client = None
         self.db = None
         
+        # Local backend: 'json' (default) or 'sqlite'
+        self.local_backend = os.getenv('STORAGE_BACKEND', 'json').lower()
+        self.sqlite_path = os.getenv('SQLITE_DB_PATH', 'smartquiz.db')
+        self.use_sqlite = False
+        self.sqlite = None
+        
         # JSON fallback paths
         self.questions_file = 'generated_questions.json'
-        self.history_file = 'quiz_history.json'
+        self._questions_lock = threading.Lock()  # read-modify-write of questions_file
+        self.history_file = 'quiz_history.jsonl'
+        self.legacy_history_file = 'quiz_history.json'
         self.users_file = 'users.json'
+        self.stats_file = 'quiz_stats.json'
+        self.history_store = None
+        self.aggregates = None
+        self.write_buffer = None
         
         logger.info("Initializing QuizDatabase...")
         
         # Try to connect to MongoDB
-        if self.mongodb_uri and MONGODB_AVAILABLE:
+        if client is not None or (self.mongodb_uri and MONGODB_AVAILABLE):
             try:
-                self.client = MongoClient(self.mongodb_uri, serverSelectionTimeoutMS=5000)
+                self.client = client or pymongo.MongoClient(self.mongodb_uri, serverSelectionTimeoutMS=5000)
                 # Test connection
                 self.client.admin.command('ping')
                 self.db = self.client[self.db_name]
                 self.use_mongodb = True
                 logger.info("✅ Connected to MongoDB Atlas successfully!")
+                self._ensure_indexes()
             except Exception as e:
                 logger.warning(f"MongoDB connection failed: {e}. Using JSON storage.")
                 self.use_mongodb = False
         else:
             logger.info("Using local JSON storage (MongoDB not configured)")
+        
+        if not self.use_mongodb:
+            if self.local_backend == 'sqlite':
+                try:
+                    self.sqlite = SQLiteStore(self.sqlite_path)
+                    self.use_sqlite = True
+                    self._import_json_history()
+                except Exception as e:
+                    logger.warning(f"SQLite initialization failed: {e}. Using JSON storage.")
+            if not self.use_sqlite:
+                self.history_store = get_history_store(self.history_file)
+                self.aggregates = StatsAggregates(self.stats_file, history=self.history_store)
+                if not self.aggregates.exists() and os.path.exists(self.history_file):
+                    with self.history_store.locked():
+                        self.aggregates.rebuild(self.history_store.iter_records())
     
     def get_storage_type(self) -> str:
         """Return current storage type."""
-        return "MongoDB Atlas" if self.use_mongodb else "Local JSON"
+        if self.use_mongodb:
+            return "MongoDB Atlas"
+        return "Local SQLite" if self.use_sqlite else "Local JSON"
     
     # ==================== Questions ====================
     
     def save_questions(self, questions: List[Dict], content_hash: str = None) -> bool:
         """Save generated questions to database."""
+        return self.save_questions_bulk([{'questions': questions, 'content_hash': content_hash}])
+    
+    def save_questions_bulk(self, question_sets: List[Dict]) -> bool:
+        """
+        Save many question sets with one write per batch.
+        
+        Args:
+            question_sets: Dicts with 'questions' and optional 'content_hash'
+        """
+        if not question_sets:
+            return True
         try:
-            if self.use_mongodb:
-                collection = self.db['questions']
-                doc = {
-                    'questions': questions,
-                    'content_hash': content_hash,
-                    'created_at': datetime.now(),
-                    'num_questions': len(questions)
+            docs = [
+                {
+                    'questions': qs['questions'],
+                    'content_hash': qs.get('content_hash'),
+                    'created_at': datetime.now() if self.use_mongodb else datetime.now().isoformat(),
+                    'num_questions': len(qs['questions'])
                 }
-                collection.insert_one(doc)
+                for qs in question_sets
+            ]
+            if self.use_mongodb:
+                self.db['questions'].insert_many(docs, ordered=False)
+            elif self.use_sqlite:
+                self.sqlite.save_questions_bulk(question_sets)
             else:
-                # JSON storage
-                data = self._load_json(self.questions_file)
-                data.append({
-                    'questions': questions,
-                    'content_hash': content_hash,
-                    'created_at': datetime.now().isoformat(),
-                    'num_questions': len(questions)
-                })
-                self._save_json(self.questions_file, data)
+                # JSON storage: the newest set per hash replaces older ones,
+                # so the file grows with distinct content, not with saves
+                hashes = {doc['content_hash'] for doc in docs if doc['content_hash']}
+                with self._questions_lock:
+                    data = [entry for entry in self._load_json(self.questions_file)
+                            if entry.get('content_hash') not in hashes]
+                    data.extend(docs)
+                    self._save_json(self.questions_file, data)
             return True
         except Exception as e:
             print(f"Error saving questions: {e}")
@@ -94,27 +181,77 @@ class QuizDatabase:
     
     def get_questions_by_hash(self, content_hash: str) -> Optional[List[Dict]]:
         """Retrieve cached questions by content hash."""
+        question_set = self.get_question_set(content_hash)
+        return question_set['questions'] if question_set else None
+    
+    def get_question_set(self, content_hash: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        """
+        Newest question set saved for a content hash.
+        
+        Args:
+            content_hash: Key the set was saved under
+            max_age: Ignore sets saved more than this many seconds ago
+        
+        Returns:
+            {'questions', 'created_at' (datetime)} or None
+        """
+        cutoff = datetime.now() - timedelta(seconds=max_age) if max_age is not None else None
         try:
             if self.use_mongodb:
-                collection = self.db['questions']
-                doc = collection.find_one({'content_hash': content_hash})
-                return doc['questions'] if doc else None
+                query = {'content_hash': content_hash}
+                if cutoff is not None:
+                    query['created_at'] = {'$gte': cutoff}
+                doc = self.db['questions'].find_one(query, sort=[('created_at', pymongo.DESCENDING)])
+                return {'questions': doc['questions'], 'created_at': doc['created_at']} if doc else None
+            elif self.use_sqlite:
+                return self.sqlite.get_question_set(content_hash, cutoff)
             else:
                 data = self._load_json(self.questions_file)
                 for entry in reversed(data):
-                    if entry.get('content_hash') == content_hash:
-                        return entry['questions']
+                    if entry.get('content_hash') != content_hash:
+                        continue
+                    created_at = _parse_time(entry.get('created_at'))
+                    if cutoff is not None and (created_at is None or created_at < cutoff):
+                        return None  # the newest set for this hash has expired
+                    return {'questions': entry['questions'], 'created_at': created_at}
                 return None
         except Exception as e:
             print(f"Error retrieving questions: {e}")
             return None
     
+    def prune_questions(self, max_age: float) -> int:
+        """
+        Delete question sets saved more than max_age seconds ago.
+        
+        Returns:
+            Number of sets removed
+        """
+        cutoff = datetime.now() - timedelta(seconds=max_age)
+        try:
+            if self.use_mongodb:
+                return self.db['questions'].delete_many({'created_at': {'$lt': cutoff}}).deleted_count
+            elif self.use_sqlite:
+                return self.sqlite.prune_questions(cutoff)
+            else:
+                with self._questions_lock:
+                    data = self._load_json(self.questions_file)
+                    kept = [entry for entry in data
+                            if (_parse_time(entry.get('created_at')) or datetime.min) >= cutoff]
+                    if len(kept) < len(data):
+                        self._save_json(self.questions_file, kept)
+                return len(data) - len(kept)
+        except Exception as e:
+            print(f"Error pruning questions: {e}")
+            return 0
+    
     def get_all_questions(self) -> List[Dict]:
         """Get all saved question sets."""
         try:
             if self.use_mongodb:
                 collection = self.db['questions']
                 return list(collection.find({}, {'_id': 0}).sort('created_at', -1))
+            elif self.use_sqlite:
+                return self.sqlite.get_all_questions()
             else:
                 return self._load_json(self.questions_file)
         except Exception as e:
@@ -125,118 +262,355 @@ class QuizDatabase:
     
     def save_quiz_attempt(self, results: Dict, answers: List[Dict], user_id: str = "default") -> bool:
         """Save a quiz attempt to history."""
-        try:
-            entry = {
-                'user_id': user_id,
-                'timestamp': datetime.now().isoformat() if not self.use_mongodb else datetime.now(),
-                'results': results,
-                'answers': answers,
-                'accuracy': results.get('accuracy', 0),
-                'num_questions': len(answers),
-                'total_time': sum(a.get('response_time', 0) for a in answers)
-            }
-            
-            if self.use_mongodb:
-                collection = self.db['quiz_history']
-                collection.insert_one(entry)
-            else:
-                data = self._load_json(self.history_file)
-                data.append(entry)
-                self._save_json(self.history_file, data)
+        return self.save_quiz_attempts_bulk([
+            {'results': results, 'answers': answers, 'user_id': user_id}
+        ])
+    
+    def save_quiz_attempts_bulk(self, attempts: List[Dict]) -> bool:
+        """
+        Save many quiz attempts with one write per batch.
+        
+        Args:
+            attempts: Dicts with 'results', 'answers' and optional 'user_id'
+        """
+        if not attempts:
             return True
+        try:
+            entries = [
+                self._make_entry(a['results'], a['answers'], a.get('user_id', 'default'))
+                for a in attempts
+            ]
+            failed = self._save_entries(entries)
+            if failed:
+                print(f"Error saving quiz attempt: {len(failed)} of {len(entries)} not stored")
+            return not failed
         except Exception as e:
             print(f"Error saving quiz attempt: {e}")
             return False
     
+    def queue_quiz_attempt(self, results: Dict, answers: List[Dict], user_id: str = "default"):
+        """
+        Buffer an attempt for write-behind saving.
+        
+        Attempts are written in bulk once WRITE_BUFFER_SIZE are queued or
+        the oldest has waited WRITE_BUFFER_SECONDS, and on shutdown. The
+        entry (and its timestamp and id) is built now, so a retried flush
+        stores the same attempt rather than a new one.
+        """
+        if self.write_buffer is None:
+            self.write_buffer = WriteBehindBuffer(
+                self._save_entries,
+                max_items=int(os.getenv('WRITE_BUFFER_SIZE', '100')),
+                max_delay=float(os.getenv('WRITE_BUFFER_SECONDS', '2.0'))
+            )
+        self.write_buffer.add(self._make_entry(results, answers, user_id))
+    
+    def flush(self):
+        """Write any buffered attempts now."""
+        if self.write_buffer is not None:
+            self.write_buffer.flush()
+    
+    def _save_entries(self, entries: List[Dict]) -> List[Dict]:
+        """
+        Store history entries and fold them into the running stats.
+        
+        Returns:
+            Entries that were not stored and should be retried
+        """
+        if self.use_mongodb:
+            return self._save_mongo_entries(entries)
+        if self.use_sqlite:
+            self.sqlite.save_quiz_attempts(entries)  # one transaction: all or nothing
+        else:
+            # Under the history lock, so the sidecar never lags the log
+            self.history_store.append_many(entries, lambda: self._apply_json_aggregates(entries))
+        return []
+    
+    def _save_mongo_entries(self, entries: List[Dict]) -> List[Dict]:
+        """
+        insert_many can partly succeed; only the documents that failed are
+        returned for retry. Entries carry their own _id, so a document
+        stored by an earlier attempt comes back as a duplicate key instead
+        of being stored twice.
+        """
+        failed = set()
+        duplicates = False
+        try:
+            self.db['quiz_history'].insert_many(entries, ordered=False)
+        except pymongo.errors.BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                if error.get('code') == 11000:
+                    duplicates = True
+                else:
+                    failed.add(error['index'])
+        stored = [entry for i, entry in enumerate(entries) if i not in failed]
+        
+        try:
+            if duplicates:
+                # Already-stored attempts may or may not be in the totals yet
+                self.rebuild_aggregates()
+            else:
+                for user_id, deltas in merge_deltas(stored).items():
+                    self._apply_mongo_deltas(user_id, deltas)
+        except Exception as e:
+            logger.error(f"Updating MongoDB stats failed, recomputing them from history: {e}")
+            self.rebuild_aggregates()
+        return [entry for i, entry in enumerate(entries) if i in failed]
+    
+    def _apply_json_aggregates(self, entries: List[Dict]):
+        """Fold saved entries into the sidecar; on failure drop it so it is recomputed."""
+        try:
+            self.aggregates.apply_many(entries)
+        except Exception as e:
+            # The attempts are already in the log, so they must not be retried
+            logger.error(f"Updating {self.stats_file} failed, recomputing it on the next read: {e}")
+            self.aggregates.discard()
+    
+    def _make_entry(self, results: Dict, answers: List[Dict], user_id: str) -> Dict:
+        entry = {
+            'user_id': user_id,
+            'timestamp': datetime.now().isoformat() if not self.use_mongodb else datetime.now(),
+            'results': results,
+            'answers': [dict(a) for a in answers],
+            'accuracy': results.get('accuracy', 0),
+            'num_questions': len(answers),
+            'total_time': sum(a.get('response_time', 0) for a in answers)
+        }
+        if self.use_mongodb:
+            entry['_id'] = bson.ObjectId()  # fixed now, so retried inserts are idempotent
+        return entry
+    
     def get_quiz_history(self, user_id: str = "default", limit: int = 50) -> List[Dict]:
-        """Get quiz history for a user."""
+        """Get a user's most recent quiz attempts, newest first."""
         try:
             if self.use_mongodb:
                 collection = self.db['quiz_history']
                 cursor = collection.find(
                     {'user_id': user_id}, 
                     {'_id': 0}
-                ).sort('timestamp', -1).limit(limit)
+                ).sort([('timestamp', -1), ('_id', -1)]).limit(limit)
                 return list(cursor)
+            elif self.use_sqlite:
+                return self.sqlite.get_quiz_history(user_id, limit)
             else:
-                data = self._load_json(self.history_file)
-                user_history = [d for d in data if d.get('user_id', 'default') == user_id]
-                return user_history[-limit:]
+                return self.history_store.tail(
+                    limit, lambda d: d.get('user_id', 'default') == user_id
+                )[::-1]
         except Exception as e:
             print(f"Error getting history: {e}")
             return []
     
+    def get_history_page(self, user_id: str = "default", limit: int = 20,
+                         cursor: Optional[str] = None) -> Dict:
+        """
+        Get one page of a user's quiz history, newest first.
+        
+        Records carry the summary fields only (no answers). Pass the
+        returned 'next_cursor' back in to get the following page; it is
+        None on the last page.
+        
+        Returns:
+            {'records': [...], 'next_cursor': str or None}
+        """
+        try:
+            if self.use_mongodb:
+                # Keyset-paginated on (timestamp, _id), like the SQLite backend
+                query = {'user_id': user_id}
+                if cursor:
+                    timestamp, last_id = cursor.rsplit('|', 1)
+                    timestamp, last_id = datetime.fromisoformat(timestamp), bson.ObjectId(last_id)
+                    query['$or'] = [
+                        {'timestamp': {'$lt': timestamp}},
+                        {'timestamp': timestamp, '_id': {'$lt': last_id}}
+                    ]
+                docs = list(self.db['quiz_history'].find(
+                    query,
+                    {'user_id': 1, 'timestamp': 1, 'accuracy': 1, 'num_questions': 1, 'total_time': 1}
+                ).sort([('timestamp', -1), ('_id', -1)]).limit(limit + 1))
+                page = docs[:limit]
+                next_cursor = (
+                    f"{page[-1]['timestamp'].isoformat()}|{page[-1]['_id']}" if len(docs) > limit else None
+                )
+                for doc in page:
+                    del doc['_id']
+                return {'records': page, 'next_cursor': next_cursor}
+            elif self.use_sqlite:
+                return self.sqlite.get_history_page(user_id, limit, cursor)
+            else:
+                offset = int(cursor) if cursor else 0
+                records, has_more = self.history_store.page(
+                    offset, limit, lambda d: d.get('user_id', 'default') == user_id
+                )
+                return {
+                    'records': [_summary_fields(r) for r in records],
+                    'next_cursor': str(offset + limit) if has_more else None
+                }
+        except Exception as e:
+            print(f"Error getting history page: {e}")
+            return {'records': [], 'next_cursor': None}
+    
+    def get_history_summary(self, user_id: str = "default") -> Dict:
+        """Totals for the top of the history page, read from the running stats."""
+        stats = self.get_user_stats(user_id)
+        return {
+            'total_quizzes': stats['total_quizzes'],
+            'avg_accuracy': stats['avg_accuracy'],
+            'total_questions': stats['total_questions']
+        }
+    
+    def get_accuracy_series(self, user_id: str = "default") -> List[float]:
+        """Accuracy of every attempt, oldest first, for the trend chart."""
+        try:
+            if self.use_mongodb:
+                cursor = self.db['quiz_history'].find(
+                    {'user_id': user_id}, {'_id': 0, 'accuracy': 1}
+                ).sort('timestamp', 1)
+                return [doc.get('accuracy', 0) for doc in cursor]
+            elif self.use_sqlite:
+                return self.sqlite.get_accuracy_series(user_id)
+            else:
+                return [
+                    r.get('accuracy', 0) for r in self.history_store.iter_records(
+                        lambda d: d.get('user_id', 'default') == user_id
+                    )
+                ]
+        except Exception as e:
+            print(f"Error getting accuracy series: {e}")
+            return []
+    
     def clear_quiz_history(self, user_id: str = "default") -> bool:
         """Clear quiz history for a user."""
         try:
             if self.use_mongodb:
                 collection = self.db['quiz_history']
                 collection.delete_many({'user_id': user_id})
+                self.db['user_stats'].delete_one({'_id': user_id})
+                self.db['topic_stats'].delete_many({'user_id': user_id})
+            elif self.use_sqlite:
+                self.sqlite.clear_quiz_history(user_id)
             else:
-                data = self._load_json(self.history_file)
-                data = [d for d in data if d.get('user_id', 'default') != user_id]
-                self._save_json(self.history_file, data)
+                self.history_store.clear(user_id, lambda: self.aggregates.reset(user_id))
             return True
         except Exception as e:
             print(f"Error clearing history: {e}")
             return False
     
     def get_user_stats(self, user_id: str = "default") -> Dict:
-        """Get aggregated stats for a user."""
-        history = self.get_quiz_history(user_id, limit=1000)
-        
-        if not history:
-            return {
-                'total_quizzes': 0,
-                'total_questions': 0,
-                'avg_accuracy': 0,
-                'best_accuracy': 0,
-                'total_time': 0
-            }
-        
-        total_quizzes = len(history)
-        total_questions = sum(h.get('num_questions', 0) for h in history)
-        accuracies = [h.get('accuracy', 0) for h in history]
-        avg_accuracy = sum(accuracies) / len(accuracies) if accuracies else 0
-        best_accuracy = max(accuracies) if accuracies else 0
-        total_time = sum(h.get('total_time', 0) for h in history)
-        
-        return {
-            'total_quizzes': total_quizzes,
-            'total_questions': total_questions,
-            'avg_accuracy': round(avg_accuracy, 1),
-            'best_accuracy': best_accuracy,
-            'total_time': round(total_time, 1)
-        }
+        """Get aggregated stats for a user from the running totals."""
+        try:
+            if self.use_mongodb:
+                doc = self.db['user_stats'].find_one({'_id': user_id})
+                if doc is None:
+                    # Totals not built yet for this user: aggregate on the server
+                    doc = next(self.db['quiz_history'].aggregate(
+                        user_stats_pipeline({'user_id': user_id})
+                    ), None)
+                return format_user_stats(doc)
+            elif self.use_sqlite:
+                return self.sqlite.get_user_stats(user_id)
+            else:
+                return self.aggregates.user_stats(user_id)
+        except Exception as e:
+            print(f"Error getting user stats: {e}")
+            return format_user_stats(None)
     
     # ==================== Topic Performance ====================
     
     def get_topic_performance(self, user_id: str = "default") -> Dict[str, Dict]:
-        """Get performance breakdown by topic."""
-        history = self.get_quiz_history(user_id, limit=1000)
-        
-        topic_stats = {}
-        for attempt in history:
-            for answer in attempt.get('answers', []):
-                topic = answer.get('topic', 'General')
-                if topic not in topic_stats:
-                    topic_stats[topic] = {'correct': 0, 'total': 0}
-                topic_stats[topic]['total'] += 1
-                if answer.get('is_correct'):
-                    topic_stats[topic]['correct'] += 1
+        """Get performance breakdown by topic from the running totals."""
+        try:
+            if self.use_mongodb:
+                docs = list(self.db['topic_stats'].find(
+                    {'user_id': user_id}, {'_id': 0, 'topic': 1, 'correct': 1, 'total': 1}
+                ))
+                if not docs and self.db['user_stats'].find_one({'_id': user_id}, {'_id': 1}) is None:
+                    docs = list(self.db['quiz_history'].aggregate(
+                        topic_stats_pipeline({'user_id': user_id})
+                    ))
+                return {doc['topic']: format_topic_stats(doc['correct'], doc['total']) for doc in docs}
+            elif self.use_sqlite:
+                return self.sqlite.get_topic_performance(user_id)
+            else:
+                return self.aggregates.topic_performance(user_id)
+        except Exception as e:
+            print(f"Error getting topic performance: {e}")
+            return {}
+    
+    def rebuild_aggregates(self) -> int:
+        """
+        Recompute the per-user and per-topic totals from raw history.
         
-        # Calculate accuracy for each topic
-        for topic in topic_stats:
-            stats = topic_stats[topic]
-            stats['accuracy'] = round(
-                (stats['correct'] / stats['total'] * 100) if stats['total'] > 0 else 0,
-                1
-            )
+        Returns:
+            Number of attempts folded in
+        """
+        if self.use_sqlite:
+            return self.sqlite.rebuild_aggregates()
+        if not self.use_mongodb:
+            with self.history_store.locked():
+                return self.aggregates.rebuild(self.history_store.iter_records())
         
-        return topic_stats
+        # Recompute server-side; $out swaps each collection in atomically
+        history = self.db['quiz_history']
+        history.aggregate(user_stats_pipeline() + [{'$out': 'user_stats'}])
+        history.aggregate(topic_stats_pipeline() + [{'$out': 'topic_stats'}])
+        count = history.count_documents({})
+        logger.info(f"Rebuilt MongoDB aggregates from {count} attempts")
+        return count
     
     # ==================== Helper Methods ====================
     
+    def _import_json_history(self):
+        """
+        Copy the JSON history into a new SQLite database, once. The line log
+        is used if present, otherwise the older JSON-array file.
+        """
+        if self.sqlite.imported('json_history'):
+            return
+        try:
+            if os.path.exists(self.history_file):
+                source = self.history_file
+                records = HistoryStore(self.history_file, legacy_file=None).read_all()
+            else:
+                source = self.legacy_history_file
+                records = self._load_json(self.legacy_history_file)
+            entries = [
+                dict(r, user_id=r.get('user_id', 'default'), timestamp=r.get('timestamp', ''))
+                for r in records if isinstance(r, dict)
+            ]
+            count = self.sqlite.import_attempts('json_history', entries)
+            if count:
+                logger.info(f"Imported {count} attempts from {source} into {self.sqlite_path}")
+        except Exception as e:
+            logger.warning(f"Could not import JSON history into SQLite: {e}")
+    
+    def _ensure_indexes(self):
+        """Create the indexes every MongoDB query relies on (no-op if present)."""
+        self.db['quiz_history'].create_index([('user_id', pymongo.ASCENDING), ('timestamp', pymongo.DESCENDING)])
+        self.db['questions'].create_index([('content_hash', pymongo.ASCENDING), ('created_at', pymongo.DESCENDING)])
+        self.db['questions'].create_index([('created_at', pymongo.ASCENDING)])
+        self.db['topic_stats'].create_index([('user_id', pymongo.ASCENDING), ('topic', pymongo.ASCENDING)], unique=True)
+        if (self.db['user_stats'].estimated_document_count() == 0
+                and self.db['quiz_history'].estimated_document_count() > 0):
+            self.rebuild_aggregates()
+    
+    def _apply_mongo_deltas(self, user_id: str, deltas: Dict):
+        """Atomic $inc upserts; topics get their own documents since names may contain '.' or '$'."""
+        self.db['user_stats'].update_one(
+            {'_id': user_id},
+            {
+                '$inc': {field: deltas[field] for field in
+                         ('total_quizzes', 'total_questions', 'accuracy_sum', 'total_time')},
+                '$max': {'best_accuracy': deltas['best_accuracy']}
+            },
+            upsert=True
+        )
+        for topic, inc in deltas['topics'].items():
+            self.db['topic_stats'].update_one(
+                {'user_id': user_id, 'topic': topic},
+                {'$inc': {'correct': inc['correct'], 'total': inc['total']}},
+                upsert=True
+            )
+    
     def _load_json(self, filepath: str) -> List:
         """Load data from JSON file."""
         if not os.path.exists(filepath):
@@ -254,16 +628,50 @@ class QuizDatabase:
     
     def close(self):
         """Close database connection."""
+        if self.write_buffer is not None:
+            self.write_buffer.close()
         if self.client:
             self.client.close()
+        if self.sqlite:
+            self.sqlite.close()
+
+
+def _parse_time(value) -> Optional[datetime]:
+    """A stored timestamp (datetime or ISO string) as a datetime, or None."""
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _summary_fields(record: Dict) -> Dict:
+    """The history fields shown on the history page (no answers)."""
+    return {
+        key: record.get(key)
+        for key in ('user_id', 'timestamp', 'accuracy', 'num_questions', 'total_time')
+    }
 
 
 # Singleton instance
 _db_instance = None
+_db_lock = threading.Lock()
 
 def get_database() -> QuizDatabase:
-    """Get or create database instance."""
+    """Get or create database instance (one client per process, shared by all sessions)."""
     global _db_instance
-    if _db_instance is None:
-        _db_instance = QuizDatabase()
-    return _db_instance
+    with _db_lock:
+        if _db_instance is None:
+            _db_instance = QuizDatabase()
+        return _db_instance
+
+
+if __name__ == '__main__':
+    import sys
+    
+    if sys.argv[1:] == ['rebuild-stats']:
+        count = get_database().rebuild_aggregates()
+        print(f"Rebuilt stats from {count} quiz attempts")
+    else:
+        print("Usage: python -m src.database rebuild-stats")
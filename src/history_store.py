@@ -0,0 +1,259 @@
+"""
+History Store - Append-only JSON Lines log for quiz history
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Import logger
+try:
+    from src.logger import get_database_logger
+    logger = get_database_logger()
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+# fcntl gives us a cross-process lock on POSIX; on Windows we only lock in-process
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+
+# Marker key used for control records (e.g. "clear") inside the log
+OP_KEY = '_op'
+
+
+class HistoryStore:
+    """
+    Append-only, line-delimited history log.
+
+    Every save appends a single JSON line under an exclusive file lock, so a
+    write costs O(1) no matter how large the history is and concurrent
+    Streamlit sessions never overwrite each other. Clearing history appends a
+    tombstone instead of rewriting the file; compaction periodically rewrites
+    the log without cleared records, tombstones or torn lines.
+    """
+
+    def __init__(
+        self,
+        filepath: str = 'quiz_history.jsonl',
+        legacy_file: Optional[str] = 'quiz_history.json',
+        fsync_every: int = 20,
+        fsync_interval: float = 2.0,
+        compact_every: int = 500
+    ):
+        self.filepath = filepath
+        self.lock_file = filepath + '.lock'
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+
+        self._lock = threading.Lock()
+        self._pending_sync = 0
+        self._last_sync = time.time()
+        self._appends_since_compact = 0
+
+        if legacy_file and os.path.exists(legacy_file) and not os.path.exists(filepath):
+            self._migrate_legacy(legacy_file)
+
+    # ==================== Writing ====================
+
+    def append(self, record: Dict, on_written: Optional[Callable[[], None]] = None) -> None:
+        """Append one record to the log."""
+        self.append_many([record], on_written)
+
+    def append_many(self, records: List[Dict], on_written: Optional[Callable[[], None]] = None) -> None:
+        """
+        Append several records with a single locked write.
+
+        on_written runs while the lock is still held, so files derived from
+        the log (the stats sidecar) change in the same critical section.
+        """
+        if not records:
+            return
+        payload = ''.join(json.dumps(r, default=str) + '\n' for r in records)
+
+        with self.locked():
+            with open(self.filepath, 'a', encoding='utf-8') as f:
+                f.write(payload)
+                f.flush()
+                self._pending_sync += len(records)
+                if (self._pending_sync >= self.fsync_every or
+                        time.time() - self._last_sync >= self.fsync_interval):
+                    os.fsync(f.fileno())
+                    self._pending_sync = 0
+                    self._last_sync = time.time()
+            if on_written is not None:
+                on_written()
+            self._appends_since_compact += len(records)
+            needs_compact = self._appends_since_compact >= self.compact_every
+
+        if needs_compact:
+            self.compact()
+
+    def clear(self, user_id: Optional[str] = None, on_written: Optional[Callable[[], None]] = None) -> None:
+        """Clear history for one user, or for everyone when user_id is None."""
+        self.append({OP_KEY: 'clear', 'user_id': user_id}, on_written)
+
+    def sync(self) -> None:
+        """Force any buffered appends to disk."""
+        if not os.path.exists(self.filepath):
+            return
+        with self.locked():
+            with open(self.filepath, 'a', encoding='utf-8') as f:
+                os.fsync(f.fileno())
+            self._pending_sync = 0
+            self._last_sync = time.time()
+
+    def compact(self) -> int:
+        """
+        Rewrite the log keeping only live records.
+
+        Returns:
+            Number of records kept
+        """
+        with self.locked():
+            live = list(self._iter_live())
+            tmp_path = self.filepath + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in live:
+                    f.write(json.dumps(record, default=str) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.filepath)
+            self._appends_since_compact = 0
+            self._pending_sync = 0
+            self._last_sync = time.time()
+        logger.info(f"Compacted {self.filepath}: {len(live)} live records")
+        return len(live)
+
+    # ==================== Reading ====================
+
+    def iter_records(self, predicate: Optional[Callable[[Dict], bool]] = None) -> Iterator[Dict]:
+        """Stream live records in insertion order, optionally filtered."""
+        for record in self._iter_live():
+            if predicate is None or predicate(record):
+                yield record
+
+    def tail(self, limit: int, predicate: Optional[Callable[[Dict], bool]] = None) -> List[Dict]:
+        """Return the last `limit` matching records using bounded memory."""
+        return list(deque(self.iter_records(predicate), maxlen=limit))
+
+    def page(self, offset: int, limit: int,
+             predicate: Optional[Callable[[Dict], bool]] = None) -> Tuple[List[Dict], bool]:
+        """
+        Return one page of matching records, newest first.
+
+        Only offset + limit + 1 records are held in memory while scanning.
+
+        Returns:
+            (records, has_more)
+        """
+        window = list(deque(self.iter_records(predicate), maxlen=offset + limit + 1))
+        window.reverse()
+        return window[offset:offset + limit], len(window) > offset + limit
+
+    def read_all(self, predicate: Optional[Callable[[Dict], bool]] = None) -> List[Dict]:
+        """Return every matching live record."""
+        return list(self.iter_records(predicate))
+
+    # ==================== Helper Methods ====================
+
+    def _iter_lines(self, f) -> Iterator[Dict]:
+        """Yield parsed lines from an open log, skipping torn or malformed writes."""
+        f.seek(0)
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed line in {self.filepath}")
+
+    def _iter_live(self) -> Iterator[Dict]:
+        """Yield records that have not been cleared by a later tombstone."""
+        if not os.path.exists(self.filepath):
+            return
+        # Both passes read the same handle so a concurrent compaction
+        # (which swaps the file) can't shift line positions under us
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            # First pass: find the line position of the last clear per user
+            clear_all_at = -1
+            clear_user_at = {}
+            has_tombstones = False
+            for pos, record in enumerate(self._iter_lines(f)):
+                if record.get(OP_KEY) == 'clear':
+                    has_tombstones = True
+                    if record.get('user_id') is None:
+                        clear_all_at = pos
+                    else:
+                        clear_user_at[record['user_id']] = pos
+
+            for pos, record in enumerate(self._iter_lines(f)):
+                if OP_KEY in record:
+                    continue
+                if has_tombstones:
+                    if pos < clear_all_at:
+                        continue
+                    if pos < clear_user_at.get(record.get('user_id', 'default'), -1):
+                        continue
+                yield record
+
+    def locked(self) -> '_FileLock':
+        """The log's lock, for callers that must keep derived files in step with it."""
+        return _FileLock(self._lock, self.lock_file)
+
+    def _migrate_legacy(self, legacy_file: str):
+        """Convert an old JSON-array history file into the line log once."""
+        try:
+            with open(legacy_file, 'r') as f:
+                data = json.load(f)
+            if isinstance(data, list):
+                self.append_many(data)
+                self.sync()
+                logger.info(f"Migrated {len(data)} records from {legacy_file} to {self.filepath}")
+        except Exception as e:
+            logger.warning(f"Could not migrate legacy history {legacy_file}: {e}")
+
+
+class _FileLock:
+    """Thread lock plus an advisory cross-process lock on a sidecar file."""
+
+    def __init__(self, thread_lock: threading.Lock, lock_path: str):
+        self.thread_lock = thread_lock
+        self.lock_path = lock_path
+        self.fd = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if FCNTL_AVAILABLE:
+            self.fd = open(self.lock_path, 'a')
+            fcntl.flock(self.fd.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.fd is not None:
+            fcntl.flock(self.fd.fileno(), fcntl.LOCK_UN)
+            self.fd.close()
+            self.fd = None
+        self.thread_lock.release()
+        return False
+
+
+# Shared instances, one per log file
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_history_store(filepath: str = 'quiz_history.jsonl') -> HistoryStore:
+    """Get or create the shared store for a log file."""
+    with _stores_lock:
+        if filepath not in _stores:
+            _stores[filepath] = HistoryStore(filepath)
+        return _stores[filepath]
@@ -0,0 +1,104 @@
+"""
+Import Time - Startup import report built on `python -X importtime`
+
+Usage:
+    python -m src.importtime                   # report for src.session (what app.py loads)
+    python -m src.importtime src.analytics     # any other module
+    python -m src.importtime --top 30 --max-ms 500
+
+Times are reported on top of a baseline (streamlit by default, which the
+app cannot avoid and which pulls in plotly itself). Exits with status 1 if
+our code imports a lazily-loaded dependency at startup, or if the import
+time over the baseline exceeds --max-ms, so it can guard against
+regressions in CI.
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+from typing import Dict, List, NamedTuple
+
+# Heavy optional dependencies that must only load on first use
+LAZY_MODULES = ('openai', 'google.generativeai', 'httpx', 'plotly', 'pymongo', 'bson', 'pdfplumber', 'PyPDF2')
+
+DEFAULT_TARGET = 'src.session'
+DEFAULT_BASELINE = 'streamlit'
+
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+class ImportEntry(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def measure(target: str = DEFAULT_TARGET) -> List[ImportEntry]:
+    """Import `target` in a fresh interpreter and parse its -X importtime output."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+        cwd=root, capture_output=True, text=True
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append(ImportEntry(module, int(self_us), int(cumulative_us), len(indent) // 2))
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+    return entries
+
+
+def summarize(entries: List[ImportEntry], baseline: List[ImportEntry] = ()) -> Dict:
+    """
+    Import time beyond the baseline, slowest top-level packages and any
+    lazy modules that were loaded.
+    """
+    skip = {e.module for e in baseline}
+    own = [e for e in entries if e.module not in skip]
+    packages = {}
+    for e in own:
+        top = e.module.split('.')[0]
+        packages[top] = packages.get(top, 0) + e.self_us
+    loaded = {e.module for e in own}
+    return {
+        'total_ms': sum(e.self_us for e in entries) / 1000,
+        'own_ms': sum(e.self_us for e in own) / 1000,
+        'modules': len(own),
+        'packages': sorted(packages.items(), key=lambda item: item[1], reverse=True),
+        'eager_lazy_modules': [name for name in LAZY_MODULES if name in loaded]
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('target', nargs='?', default=DEFAULT_TARGET)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="module whose imports aren't counted ('' for none)")
+    parser.add_argument('--top', type=int, default=15, help='packages to list')
+    parser.add_argument('--max-ms', type=float, default=None, help='fail above this much time over the baseline')
+    args = parser.parse_args(argv)
+
+    baseline = measure(args.baseline) if args.baseline else []
+    summary = summarize(measure(args.target), baseline)
+    print(f"import {args.target}: {summary['total_ms']:.0f} ms total, "
+          f"{summary['own_ms']:.0f} ms across {summary['modules']} modules beyond {args.baseline or 'the interpreter'}")
+    for package, self_us in summary['packages'][:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    failed = False
+    if summary['eager_lazy_modules']:
+        print(f"Loaded at startup but should be lazy: {', '.join(summary['eager_lazy_modules'])}")
+        failed = True
+    if args.max_ms is not None and summary['own_ms'] > args.max_ms:
+        print(f"Import time {summary['own_ms']:.0f} ms exceeds {args.max_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
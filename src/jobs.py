@@ -0,0 +1,219 @@
+"""
+Background Jobs - Process-wide worker pool for long-running generation work
+"""
+
+import os
+import time
+import uuid
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# Import logger
+try:
+    from src.logger import get_jobs_logger, set_log_context
+    logger = get_jobs_logger()
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+    def set_log_context(session_id=None, stage=None):
+        pass
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once it has been cancelled."""
+
+
+class JobTimeout(Exception):
+    """Raised inside a job once it has run past its deadline."""
+
+
+class Job:
+    """
+    Handle for one unit of background work.
+
+    The job function receives the Job and should call check() between
+    steps; that is where cancellation and timeouts take effect, since a
+    thread cannot be interrupted from outside. Blocking calls made inside
+    the job can bound themselves with remaining() (see current_job()).
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    TIMED_OUT = 'timed_out'
+
+    def __init__(self, session_id: str, name: str, timeout: Optional[float] = None):
+        self.id = uuid.uuid4().hex[:8]
+        self.session_id = session_id
+        self.name = name
+        self.timeout = timeout
+        self.status = Job.PENDING
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status not in (Job.PENDING, Job.RUNNING)
+
+    def cancel(self):
+        """Ask the job to stop at its next check()."""
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            # Still queued: _run will never see it, so finish it here
+            self.status = Job.CANCELLED
+            self.finished_at = time.time()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the timeout (None without a timeout)."""
+        if not self.timeout:
+            return None
+        if self.started_at is None:
+            return self.timeout
+        return self.timeout - (time.time() - self.started_at)
+
+    def check(self):
+        """Raise if the job was cancelled or has exceeded its timeout."""
+        if self._cancel.is_set():
+            raise JobCancelled(self.name)
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise JobTimeout(f"{self.name} exceeded {self.timeout:.0f}s")
+
+    def info(self) -> Dict:
+        """Status summary for display."""
+        end = self.finished_at or time.time()
+        return {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'error': str(self.error) if self.error else None,
+            'elapsed': round(end - self.started_at, 1) if self.started_at else 0
+        }
+
+
+# The job running in this thread (or context copied from it), if any
+_current_job = contextvars.ContextVar('current_job', default=None)
+
+def current_job() -> Optional[Job]:
+    """The background job the caller is running inside, or None."""
+    return _current_job.get()
+
+
+class JobExecutor:
+    """
+    Shared thread pool with jobs keyed by (session, name).
+
+    Submitting a job under a name that already has one for the session
+    cancels the previous job, so a user who clicks Generate twice never
+    has two generations racing for the same page.
+    """
+
+    def __init__(self, max_workers: int = 8, retain_seconds: float = 3600):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='smartquiz-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.retain_seconds = retain_seconds
+
+    def submit(
+        self,
+        session_id: str,
+        name: str,
+        fn: Callable[[Job], None],
+        timeout: Optional[float] = None
+    ) -> Job:
+        """Run fn(job) in the background, replacing any job with the same key."""
+        job = Job(session_id, name, timeout)
+        with self._lock:
+            self._prune()
+            previous = self._jobs.get((session_id, name))
+            if previous is not None and not previous.finished:
+                previous.cancel()
+            self._jobs[(session_id, name)] = job
+        job.future = self._pool.submit(self._run, job, fn)
+        logger.info(f"Queued job {name}:{job.id} for session {session_id}")
+        return job
+
+    def get(self, session_id: str, name: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get((session_id, name))
+
+    def status(self, session_id: str) -> List[Dict]:
+        """Status of every job belonging to a session."""
+        with self._lock:
+            jobs = [job for (sid, _), job in self._jobs.items() if sid == session_id]
+        return [job.info() for job in jobs]
+
+    def cancel_session(self, session_id: str):
+        """Cancel all of a session's jobs (e.g. when the user goes back home)."""
+        with self._lock:
+            keys = [key for key in self._jobs if key[0] == session_id]
+            jobs = [self._jobs.pop(key) for key in keys]
+        for job in jobs:
+            if not job.finished:
+                job.cancel()
+                logger.info(f"Cancelled job {job.name}:{job.id}")
+
+    def _run(self, job: Job, fn: Callable[[Job], None]):
+        if job.cancelled:
+            job.status = Job.CANCELLED
+            job.finished_at = time.time()
+            return
+        job.status = Job.RUNNING
+        job.started_at = time.time()
+        set_log_context(session_id=job.session_id, stage=f"job:{job.name}")
+        token = _current_job.set(job)
+        try:
+            fn(job)
+            job.status = Job.DONE
+            logger.info(f"Job {job.name}:{job.id} done",
+                        extra={'latency_ms': round((time.time() - job.started_at) * 1000, 1)})
+        except JobCancelled:
+            job.status = Job.CANCELLED
+        except JobTimeout as e:
+            job.status = Job.TIMED_OUT
+            job.error = e
+            logger.warning(f"Job {job.name}:{job.id} timed out")
+        except Exception as e:
+            job.status = Job.FAILED
+            job.error = e
+            logger.error(f"Job {job.name}:{job.id} failed: {e}")
+        finally:
+            _current_job.reset(token)
+            set_log_context()  # pool threads are reused; don't tag the next job's records
+            job.finished_at = time.time()
+
+    def _prune(self):
+        """Forget finished jobs that nobody has looked at for a while."""
+        cutoff = time.time() - self.retain_seconds
+        stale = [key for key, job in self._jobs.items()
+                 if job.finished and (job.finished_at or 0) < cutoff]
+        for key in stale:
+            del self._jobs[key]
+
+
+# Singleton instance
+_executor_instance = None
+_executor_lock = threading.Lock()
+
+def get_job_executor() -> JobExecutor:
+    """Get or create the process-wide job executor."""
+    global _executor_instance
+    with _executor_lock:
+        if _executor_instance is None:
+            _executor_instance = JobExecutor(
+                max_workers=int(os.getenv('GENERATION_WORKERS', '8'))
+            )
+        return _executor_instance
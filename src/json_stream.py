@@ -0,0 +1,106 @@
+"""
+JSON Stream - Incremental parser for JSON arrays arriving in pieces
+"""
+
+import json
+from typing import Any, List
+
+# Import logger
+try:
+    from src.logger import get_generator_logger
+    logger = get_generator_logger()
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+class JSONArrayStreamParser:
+    """
+    Pull complete elements out of a JSON array as its text streams in.
+
+    Feed it arbitrary slices of an LLM response; each call returns the
+    top-level elements of the first array that became complete during that
+    slice. Text before the opening '[' (e.g. "Here are your questions:") is
+    ignored, and a malformed element is skipped rather than failing the
+    whole stream. By default only objects are returned; pass
+    objects_only=False to also collect string elements (e.g. a concept
+    list). Whatever follows the closing ']' is kept in `remainder` so a
+    second parser can pick up the next array in the same response.
+    """
+
+    def __init__(self, objects_only: bool = True):
+        self.objects_only = objects_only
+        self._buffer = []
+        self._in_array = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.parsed = 0
+        self.remainder = ''
+
+    @property
+    def finished(self) -> bool:
+        """True once the closing ']' of the array has been seen."""
+        return self._finished
+
+    def feed(self, text: str) -> List[Any]:
+        """Consume a slice of the response and return newly completed elements."""
+        completed = []
+        if self._finished or not text:
+            return completed
+
+        for i, ch in enumerate(text):
+            if not self._in_array:
+                if ch == '[':
+                    self._in_array = True
+                continue
+
+            # Top-level strings are buffered too when scalars are wanted
+            capturing = self._depth > 0 or (self._in_string and not self.objects_only)
+            if capturing:
+                self._buffer.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 0 and not self.objects_only:
+                        self._collect(completed)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 0:
+                    self._buffer = [ch]
+            elif ch in '{[':
+                if self._depth == 0:
+                    self._buffer = [ch]
+                self._depth += 1
+            elif ch in '}]':
+                if self._depth == 0:
+                    # Closing bracket of the outer array
+                    self._finished = True
+                    self.remainder = text[i + 1:]
+                    break
+                self._depth -= 1
+                if self._depth == 0:
+                    self._collect(completed)
+
+        return completed
+
+    def _collect(self, completed: List[Any]):
+        raw = ''.join(self._buffer)
+        self._buffer = []
+        try:
+            obj = json.loads(raw)
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping malformed streamed element: {raw[:80]}")
+            return
+        if self.objects_only and not isinstance(obj, dict):
+            return
+        self.parsed += 1
+        completed.append(obj)
@@ -0,0 +1,57 @@
+"""
+Lazy - Deferred imports for heavy optional dependencies
+"""
+
+import importlib
+import importlib.util
+import threading
+from types import ModuleType
+
+
+def module_available(name: str) -> bool:
+    """Whether a module can be imported, checked without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False  # parent package missing
+
+
+class LazyModule(ModuleType):
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    `go = lazy_import('plotly.graph_objects')` costs nothing at startup;
+    `go.Figure(...)` imports plotly the first time it runs. Import errors
+    surface at that point, so pair it with module_available() for the
+    usual *_AVAILABLE flags.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+        self.__dict__['_lazy_lock'] = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with self.__dict__['_lazy_lock']:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_lazy_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Return a module proxy that imports `name` when first used."""
+    return LazyModule(name)
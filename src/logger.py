@@ -4,15 +4,152 @@ Logger Module - Centralized logging for AI Smart Quiz application
 
 import logging
 import os
-from datetime import datetime
+import glob
+import gzip
+import json
+import time
+import queue
+import atexit
+import shutil
+import threading
+import contextvars
+from datetime import datetime, timedelta
+from logging.handlers import BaseRotatingHandler, QueueHandler, QueueListener
 
 # Create logs directory if it doesn't exist
 LOGS_DIR = 'logs'
 if not os.path.exists(LOGS_DIR):
     os.makedirs(LOGS_DIR)
 
-# Log file with date
-LOG_FILE = os.path.join(LOGS_DIR, f'smartquiz_{datetime.now().strftime("%Y%m%d")}.log')
+# Active log file; rotated copies are smartquiz.log.<start>-<end>.gz
+LOG_FILE = os.path.join(LOGS_DIR, 'smartquiz.log')
+
+# Records waiting for the writer thread; beyond this, records are dropped
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+# Rotate at midnight or at this size, keeping this many compressed files
+LOG_MAX_BYTES = int(float(os.getenv('LOG_MAX_MB', '10')) * 1024 * 1024)
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '14'))
+
+# File log format: text (default) or json (one JSON object per line)
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+
+# Per-request fields attached to every record logged in that context
+_session_id = contextvars.ContextVar('log_session_id', default=None)
+_stage = contextvars.ContextVar('log_stage', default=None)
+
+
+def set_log_context(session_id: str = None, stage: str = None):
+    """Tag records logged from the current thread/context with a session and stage."""
+    _session_id.set(session_id)
+    _stage.set(stage)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the log context onto records before they leave the caller's thread."""
+    
+    def filter(self, record):
+        if getattr(record, 'session_id', None) is None:
+            record.session_id = _session_id.get()
+        if getattr(record, 'stage', None) is None:
+            record.stage = _stage.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line, for log shippers.
+    
+    Always has ts, level, logger, message, func and line. session_id and
+    stage come from set_log_context(), latency_ms from
+    extra={'latency_ms': ...}; fields without a value are left out.
+    """
+    
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'func': record.funcName,
+            'line': record.lineno,
+        }
+        for field in ('session_id', 'stage', 'latency_ms'):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class CompressingRotatingFileHandler(BaseRotatingHandler):
+    """
+    File handler that rotates at midnight and whenever the file would grow
+    past `max_bytes`, gzipping each rotated file.
+    
+    Rotated files are named after the period they cover, so a size-based
+    rollover never overwrites an earlier one, and only the newest
+    `backup_count` are kept. Rotation runs on the log writer thread.
+    """
+    
+    def __init__(self, filename: str, max_bytes: int = LOG_MAX_BYTES,
+                 backup_count: int = LOG_BACKUP_COUNT, encoding: str = 'utf-8'):
+        super().__init__(filename, 'a', encoding=encoding, delay=False)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.opened_at = os.path.getmtime(self.baseFilename) if os.path.getsize(self.baseFilename) else time.time()
+        self.rollover_at = self._next_midnight(self.opened_at)
+    
+    @staticmethod
+    def _next_midnight(timestamp: float) -> float:
+        day = datetime.fromtimestamp(timestamp).replace(hour=0, minute=0, second=0, microsecond=0)
+        return (day + timedelta(days=1)).timestamp()
+    
+    def shouldRollover(self, record) -> bool:
+        if self.stream is None:
+            self.stream = self._open()
+        if record.created >= self.rollover_at:
+            return True
+        if self.max_bytes > 0:
+            size = self.stream.tell() + len(self.format(record)) + 1
+            return size > self.max_bytes and self.stream.tell() > 0
+        return False
+    
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        
+        now = time.time()
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename):
+            stamp = (
+                f"{datetime.fromtimestamp(self.opened_at).strftime('%Y%m%d-%H%M%S')}"
+                f"-{datetime.fromtimestamp(now).strftime('%H%M%S')}"
+            )
+            target = f"{self.baseFilename}.{stamp}.gz"
+            n = 1
+            while os.path.exists(target):
+                target = f"{self.baseFilename}.{stamp}.{n}.gz"
+                n += 1
+            try:
+                with open(self.baseFilename, 'rb') as src, gzip.open(target, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(self.baseFilename)
+            except OSError as e:
+                # Keep logging to the current file rather than losing records
+                print(f"Log rotation failed: {e}")
+            self._remove_old_backups()
+        
+        self.opened_at = now
+        self.rollover_at = self._next_midnight(now)
+        self.stream = self._open()
+    
+    def _remove_old_backups(self):
+        backups = sorted(glob.glob(f"{glob.escape(self.baseFilename)}.*.gz"), key=os.path.getmtime)
+        for path in backups[:-self.backup_count] if self.backup_count > 0 else []:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
 
 # Custom formatter with colors for console
 class ColoredFormatter(logging.Formatter):
@@ -29,10 +166,109 @@ class ColoredFormatter(logging.Formatter):
     
     def format(self, record):
         color = self.COLORS.get(record.levelname, self.RESET)
+        # Color a copy; the file handler formats the same record
+        record = logging.makeLogRecord(record.__dict__)
         record.levelname = f"{color}{record.levelname}{self.RESET}"
         return super().format(record)
 
 
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hands records to the writer thread without ever blocking the caller.
+    
+    When the queue is full, DEBUG and INFO records are dropped; a WARNING
+    or worse evicts the oldest queued record to make room for itself. The
+    number of dropped records is logged once the queue has space again.
+    """
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def enqueue(self, record):
+        # Called under the handler lock, so `dropped` needs no extra locking
+        if self.dropped:
+            self._report_dropped()
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if record.levelno >= logging.WARNING:
+            try:
+                self.queue.get_nowait()
+                self.queue.put_nowait(record)
+                self.dropped += 1  # the evicted record
+                return
+            except (queue.Empty, queue.Full):
+                pass
+        self.dropped += 1
+    
+    def _report_dropped(self):
+        notice = logging.makeLogRecord({
+            'name': 'SmartQuiz.Logger',
+            'levelno': logging.WARNING,
+            'levelname': 'WARNING',
+            'msg': f"{self.dropped} log records dropped (log queue full)",
+            'funcName': 'enqueue',
+        })
+        try:
+            self.queue.put_nowait(notice)
+            self.dropped = 0
+        except queue.Full:
+            pass
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room instead of failing when stopping with a full queue
+        self.queue.put(self._sentinel, timeout=5)
+
+
+_queue_handler = None
+_listener = None
+_setup_lock = threading.Lock()
+
+def _get_queue_handler() -> DroppingQueueHandler:
+    """
+    The handler every logger shares. The console and file handlers run on
+    one background writer thread, so logging never waits on disk I/O.
+    """
+    global _queue_handler, _listener
+    with _setup_lock:
+        if _queue_handler is not None:
+            return _queue_handler
+        
+        # Console handler with colors
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        console_format = ColoredFormatter(
+            '%(asctime)s | %(levelname)s | %(name)s | %(message)s',
+            datefmt='%H:%M:%S'
+        )
+        console_handler.setFormatter(console_format)
+        
+        # File handler for persistent logs (rotated and compressed)
+        file_handler = CompressingRotatingFileHandler(LOG_FILE)
+        file_handler.setLevel(logging.DEBUG)
+        if LOG_FORMAT == 'json':
+            file_format = JSONFormatter()
+        else:
+            file_format = logging.Formatter(
+                '%(asctime)s | %(levelname)s | %(name)s | %(funcName)s:%(lineno)d | %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S'
+            )
+        file_handler.setFormatter(file_format)
+        
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _listener = _Listener(log_queue, console_handler, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        _queue_handler = DroppingQueueHandler(log_queue)
+        _queue_handler.addFilter(ContextFilter())
+        return _queue_handler
+
+
 def setup_logger(name: str, level: int = logging.INFO) -> logging.Logger:
     """
     Create and configure a logger instance.
@@ -50,29 +286,10 @@ def setup_logger(name: str, level: int = logging.INFO) -> logging.Logger:
     if logger.handlers:
         return logger
     
+    # Records below the logger level are rejected by a cached level check
+    # before any record is built, so hot-path debug calls cost next to nothing
     logger.setLevel(level)
-    
-    # Console handler with colors
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_format = ColoredFormatter(
-        '%(asctime)s | %(levelname)s | %(name)s | %(message)s',
-        datefmt='%H:%M:%S'
-    )
-    console_handler.setFormatter(console_format)
-    
-    # File handler for persistent logs
-    file_handler = logging.FileHandler(LOG_FILE, encoding='utf-8')
-    file_handler.setLevel(logging.DEBUG)
-    file_format = logging.Formatter(
-        '%(asctime)s | %(levelname)s | %(name)s | %(funcName)s:%(lineno)d | %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    file_handler.setFormatter(file_format)
-    
-    # Add handlers
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    logger.addHandler(_get_queue_handler())
     
     return logger
 
@@ -101,3 +318,7 @@ def get_database_logger():
 def get_utils_logger():
     """Logger for utilities"""
     return setup_logger('SmartQuiz.Utils')
+
+def get_jobs_logger():
+    """Logger for background jobs"""
+    return setup_logger('SmartQuiz.Jobs')
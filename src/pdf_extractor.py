@@ -0,0 +1,157 @@
+"""
+PDF Extractor - Page-parallel, streaming text extraction for PDF uploads
+"""
+
+import os
+import atexit
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from src.lazy import module_available
+from src.pdf_worker import extract_batch
+
+# Import logger
+try:
+    from src.logger import get_utils_logger
+    logger = get_utils_logger()
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+# Extraction engines: pdfplumber is layout-aware, PyPDF2 is text-only but faster
+ENGINES = ('pdfplumber', 'pypdf2')
+
+# Below this many pages a process pool costs more than it saves
+PARALLEL_MIN_PAGES = 8
+
+
+def available_engines() -> List[str]:
+    """Engines whose library is installed, in preference order."""
+    return [
+        engine for engine, module in (('pdfplumber', 'pdfplumber'), ('pypdf2', 'PyPDF2'))
+        if module_available(module)
+    ]
+
+
+def _count_pages(path: str, engine: str) -> int:
+    if engine == 'pypdf2':
+        import PyPDF2
+        return len(PyPDF2.PdfReader(path).pages)
+    import pdfplumber
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+# ==================== Worker Pool ====================
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared process pool; spawn avoids forking a process full of threads."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+class PDFExtractor:
+    """
+    Streams page text out of a PDF, sharding pages across worker processes.
+
+    Pages are yielded in order as soon as their batch is done, only a
+    bounded window of batches is in flight, and extraction stops early
+    once `max_chars` of text have been collected or the requested page
+    range is exhausted.
+    """
+
+    def __init__(self, engine: str = 'pdfplumber', workers: Optional[int] = None, batch_size: int = 4):
+        installed = available_engines()
+        if not installed:
+            raise ImportError("PDF extraction requires pdfplumber or PyPDF2")
+        self.engine = engine if engine in installed else installed[0]
+        self.workers = workers or int(os.getenv('PDF_WORKERS', str(os.cpu_count() or 2)))
+        self.batch_size = batch_size
+
+    def iter_pages(
+        self,
+        pdf_bytes: bytes,
+        page_range: Optional[Tuple[int, int]] = None,
+        max_chars: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Yield the text of each non-empty page.
+
+        Args:
+            pdf_bytes: Raw PDF file contents
+            page_range: Optional 1-based inclusive (first, last) page range
+            max_chars: Stop once this many characters have been yielded
+        """
+        # Workers open the file by path so the bytes are never pickled per task
+        fd, path = tempfile.mkstemp(suffix='.pdf')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(pdf_bytes)
+
+            total = _count_pages(path, self.engine)
+            first, last = 0, total
+            if page_range:
+                first = max(0, page_range[0] - 1)
+                last = min(total, page_range[1])
+            logger.info(f"Extracting pages {first + 1}-{last} of {total} with {self.engine}")
+
+            batches = [(i, min(i + self.batch_size, last)) for i in range(first, last, self.batch_size)]
+            collected = 0
+            for texts in self._run_batches(path, batches):
+                for text in texts:
+                    if not text:
+                        continue
+                    yield text
+                    collected += len(text)
+                    if max_chars and collected >= max_chars:
+                        logger.info(f"Early stop after {collected} characters")
+                        return
+        finally:
+            os.remove(path)
+
+    def extract(
+        self,
+        pdf_bytes: bytes,
+        page_range: Optional[Tuple[int, int]] = None,
+        max_chars: Optional[int] = None
+    ) -> str:
+        """Extract and join page text."""
+        return '\n\n'.join(self.iter_pages(pdf_bytes, page_range, max_chars))
+
+    def _run_batches(self, path: str, batches: List[Tuple[int, int]]) -> Iterator[List[str]]:
+        """Yield batch results in page order, keeping a bounded window in flight."""
+        pages = sum(end - start for start, end in batches)
+        if pages < PARALLEL_MIN_PAGES or self.workers <= 1:
+            for start, end in batches:
+                yield extract_batch(path, self.engine, start, end)
+            return
+
+        pool = _get_pool(self.workers)
+        window = self.workers * 2
+        pending = []
+        next_batch = 0
+        try:
+            while next_batch < len(batches) or pending:
+                while next_batch < len(batches) and len(pending) < window:
+                    start, end = batches[next_batch]
+                    pending.append(pool.submit(extract_batch, path, self.engine, start, end))
+                    next_batch += 1
+                yield pending.pop(0).result()
+        finally:
+            # Early stop or error: drop batches that haven't started
+            for future in pending:
+                future.cancel()
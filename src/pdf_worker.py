@@ -0,0 +1,27 @@
+"""
+PDF Worker - Page extraction that runs inside the PDF worker processes
+
+Spawned workers import this module to unpickle their task, so it must not
+import the rest of the app: src.logger would start a second log writer
+thread and open logs/smartquiz.log in every worker.
+"""
+
+from typing import List
+
+
+def extract_batch(path: str, engine: str, start: int, end: int) -> List[str]:
+    """Extract pages [start, end) from the PDF at path."""
+    texts = []
+    if engine == 'pypdf2':
+        import PyPDF2
+        reader = PyPDF2.PdfReader(path)
+        for i in range(start, end):
+            texts.append(reader.pages[i].extract_text() or '')
+    else:
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            for i in range(start, end):
+                page = pdf.pages[i]
+                texts.append(page.extract_text() or '')
+                page.flush_cache()  # keep worker memory flat on big books
+    return texts
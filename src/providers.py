@@ -0,0 +1,381 @@
+"""
+LLM Providers - Pluggable completion backends with pooling, retries and failover
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import random
+import threading
+from typing import Dict, Iterator, List, Optional
+
+# Import logger
+try:
+    from src.logger import get_generator_logger
+    logger = get_generator_logger()
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+from src.lazy import lazy_import, module_available
+from src.jobs import current_job
+
+# Provider SDKs are imported when a provider is first built; each provider
+# is skipped if its SDK is missing
+openai = lazy_import('openai')
+OPENAI_AVAILABLE = module_available('openai')
+
+genai = lazy_import('google.generativeai')
+GEMINI_AVAILABLE = module_available('google.generativeai')
+
+httpx = lazy_import('httpx')
+HTTPX_AVAILABLE = module_available('httpx')
+
+
+# HTTP statuses worth retrying or failing over on
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class ProviderError(Exception):
+    """A provider call failed; `retryable` says whether another attempt may succeed."""
+
+    def __init__(self, provider: str, message: str, retryable: bool = False, status: Optional[int] = None):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+        self.retryable = retryable
+        self.status = status
+
+
+class LLMProvider:
+    """
+    Base class for a chat-completion backend.
+
+    Subclasses implement _complete and _stream; the base class turns SDK
+    exceptions into ProviderError so ProviderChain can decide whether to
+    retry, fail over, or give up.
+    """
+
+    name = 'base'
+
+    def __init__(self, model: str, timeout: float = 60.0):
+        self.model = model
+        self.timeout = timeout
+
+    def complete(self, prompt: str, system: str = None, temperature: float = 0.7,
+                 timeout: Optional[float] = None) -> str:
+        """Return the full completion text (timeout overrides the provider default)."""
+        try:
+            return self._complete(prompt, system, temperature, timeout or self.timeout)
+        except ProviderError:
+            raise
+        except Exception as e:
+            raise self._wrap(e)
+
+    def stream(self, prompt: str, system: str = None, temperature: float = 0.7,
+               timeout: Optional[float] = None) -> Iterator[str]:
+        """Yield the completion text in pieces as it is produced."""
+        try:
+            yield from self._stream(prompt, system, temperature, timeout or self.timeout)
+        except ProviderError:
+            raise
+        except Exception as e:
+            raise self._wrap(e)
+
+    def _complete(self, prompt: str, system: Optional[str], temperature: float, timeout: float) -> str:
+        raise NotImplementedError
+
+    def _stream(self, prompt: str, system: Optional[str], temperature: float, timeout: float) -> Iterator[str]:
+        yield self._complete(prompt, system, temperature, timeout)
+
+    def _wrap(self, exc: Exception) -> ProviderError:
+        """Classify an SDK exception as retryable or fatal."""
+        status = getattr(exc, 'status_code', None) or getattr(exc, 'code', None)
+        if not isinstance(status, int):
+            status = None
+        name = type(exc).__name__.lower()
+        retryable = (
+            status in RETRYABLE_STATUS
+            or (status is None and any(k in name for k in ('timeout', 'connection', 'unavailable', 'exhausted')))
+        )
+        return ProviderError(self.name, str(exc), retryable=retryable, status=status)
+
+
+# ==================== Shared HTTP clients ====================
+
+_http_clients = {}
+_http_clients_lock = threading.Lock()
+
+def get_http_client(key: str, timeout: float):
+    """One keep-alive connection pool per provider, shared by every session."""
+    if not HTTPX_AVAILABLE:
+        return None
+    with _http_clients_lock:
+        if key not in _http_clients:
+            _http_clients[key] = httpx.Client(
+                timeout=httpx.Timeout(timeout, connect=10.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+            )
+        return _http_clients[key]
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """OpenAI and Groq (which speaks the OpenAI API) over a pooled HTTP client."""
+
+    def __init__(self, name: str, api_key: str, model: str, base_url: str = None, timeout: float = 60.0):
+        super().__init__(model, timeout)
+        self.name = name
+        self.client = openai.OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=timeout,
+            max_retries=0,  # ProviderChain owns retries
+            http_client=get_http_client(name, timeout)
+        )
+
+    def _messages(self, prompt: str, system: Optional[str]) -> List[Dict]:
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _complete(self, prompt, system, temperature, timeout):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(prompt, system),
+            temperature=temperature,
+            timeout=timeout
+        )
+        return response.choices[0].message.content
+
+    def _stream(self, prompt, system, temperature, timeout):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(prompt, system),
+            temperature=temperature,
+            timeout=timeout,
+            stream=True
+        )
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini via google-generativeai (pools its own gRPC channel)."""
+
+    name = 'gemini'
+
+    def __init__(self, api_key: str, model: str = 'gemini-1.5-flash', timeout: float = 60.0):
+        super().__init__(model, timeout)
+        genai.configure(api_key=api_key)
+        self.client = genai.GenerativeModel(model)
+
+    def _prompt(self, prompt: str, system: Optional[str]) -> str:
+        return f"{system}\n\n{prompt}" if system else prompt
+
+    def _complete(self, prompt, system, temperature, timeout):
+        response = self.client.generate_content(
+            self._prompt(prompt, system),
+            generation_config={'temperature': temperature},
+            request_options={'timeout': timeout}
+        )
+        return response.text
+
+    def _stream(self, prompt, system, temperature, timeout):
+        response = self.client.generate_content(
+            self._prompt(prompt, system),
+            generation_config={'temperature': temperature},
+            request_options={'timeout': timeout},
+            stream=True
+        )
+        for chunk in response:
+            yield chunk.text
+
+
+class MockProvider(LLMProvider):
+    """
+    Offline provider for load testing the whole pipeline.
+
+    Answers the concept and question prompts with deterministic JSON built
+    from the prompt's own content, after a configurable delay, and can
+    inject retryable failures to exercise retry and failover.
+    """
+
+    name = 'mock'
+
+    def __init__(self, latency: float = 0.5, failure_rate: float = 0.0, timeout: float = 30.0):
+        super().__init__('mock-1', timeout)
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    def _complete(self, prompt, system, temperature, timeout):
+        if self.latency > timeout:
+            time.sleep(timeout)
+            raise ProviderError(self.name, f"simulated timeout after {timeout:.1f}s", retryable=True)
+        time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ProviderError(self.name, "simulated 503", retryable=True, status=503)
+        return self._respond(prompt)
+
+    def _stream(self, prompt, system, temperature, timeout):
+        text = self._complete(prompt, system, temperature, timeout)
+        for i in range(0, len(text), 40):
+            yield text[i:i + 40]
+
+    def _respond(self, prompt: str) -> str:
+        match = re.search(r'generate (\d+) quiz questions', prompt)
+        body = re.search(r'Content[^:\n]*:\n(.*?)(?:\n\n(?:Return ONLY|Also extract)|$)', prompt, re.DOTALL)
+        words = re.findall(r'[A-Za-z]{5,}', body.group(1) if body else prompt)
+        topics = list(dict.fromkeys(w.title() for w in words))[:10] or ['General']
+        if not match:
+            return json.dumps(topics)
+
+        # Honour "do not repeat" lists by numbering past the questions listed
+        avoid = re.search(r'already asked:\n((?:- .*\n)+)', prompt)
+        first = avoid.group(1).count('\n') if avoid else 0
+        questions = []
+        for i in range(first, first + int(match.group(1))):
+            topic = topics[i % len(topics)]
+            questions.append({
+                'question': f"[mock {i + 1}] Which term does the material discuss alongside {topics[(i + 1) % len(topics)]}?",
+                'answer': topic,
+                'distractors': [f"Not {topic}", f"Unrelated {i}", f"Other {i}"],
+                'difficulty': ['easy', 'medium', 'hard'][i % 3],
+                'topic': topic,
+                'type': 'mcq'
+            })
+        if '"concepts" FIRST' in prompt:
+            return json.dumps({'concepts': topics, 'questions': questions})
+        return json.dumps(questions)
+
+
+class ProviderChain:
+    """
+    Ordered list of providers with retry and automatic failover.
+
+    Each provider gets `max_retries` extra attempts on retryable errors
+    (429, 5xx, timeouts) with exponential backoff and full jitter; if it
+    still fails, the next provider is tried. Non-retryable errors (bad
+    key, bad request) skip straight to the next provider.
+    """
+
+    def __init__(self, providers: List[LLMProvider], max_retries: int = 2,
+                 base_delay: float = 0.5, max_delay: float = 8.0):
+        self.providers = providers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @property
+    def primary(self) -> LLMProvider:
+        return self.providers[0]
+
+    def complete(self, prompt: str, system: str = None, temperature: float = 0.7) -> str:
+        last_error = None
+        for provider in self.providers:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return provider.complete(prompt, system, temperature, self._request_timeout(provider))
+                except ProviderError as e:
+                    self._check_job()  # a request cut short by the job deadline is a timeout
+                    last_error = e
+                    if not e.retryable or attempt == self.max_retries:
+                        logger.warning(f"Provider {provider.name} failed: {e}")
+                        break
+                    self._backoff(provider, attempt, e)
+        raise last_error or ProviderError('chain', 'no providers configured')
+
+    async def acomplete(self, prompt: str, system: str = None, temperature: float = 0.7) -> str:
+        """Awaitable complete() for asyncio callers such as load tests."""
+        return await asyncio.to_thread(self.complete, prompt, system, temperature)
+
+    def stream(self, prompt: str, system: str = None, temperature: float = 0.7) -> Iterator[str]:
+        """Stream from the first healthy provider; failover only before any text is sent."""
+        last_error = None
+        job = current_job()
+        for provider in self.providers:
+            for attempt in range(self.max_retries + 1):
+                started = False
+                try:
+                    for piece in provider.stream(prompt, system, temperature, self._request_timeout(provider)):
+                        started = True
+                        if job is not None:
+                            job.check()  # a slow trickle of text still ends at the deadline
+                        yield piece
+                    return
+                except ProviderError as e:
+                    self._check_job()
+                    if started:
+                        raise
+                    last_error = e
+                    if not e.retryable or attempt == self.max_retries:
+                        logger.warning(f"Provider {provider.name} failed: {e}")
+                        break
+                    self._backoff(provider, attempt, e)
+        raise last_error or ProviderError('chain', 'no providers configured')
+
+    @staticmethod
+    def _check_job():
+        job = current_job()
+        if job is not None:
+            job.check()
+
+    @staticmethod
+    def _request_timeout(provider: LLMProvider) -> float:
+        """
+        Provider timeout, cut down to what is left of the calling job's
+        deadline so a hung request cannot outlive the job.
+        
+        Raises JobCancelled/JobTimeout when the job is already over.
+        """
+        job = current_job()
+        if job is None:
+            return provider.timeout
+        job.check()
+        remaining = job.remaining()
+        return provider.timeout if remaining is None else min(provider.timeout, remaining)
+
+    def _backoff(self, provider: LLMProvider, attempt: int, error: ProviderError):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        logger.info(f"Retrying {provider.name} in {delay:.2f}s after: {error}")
+        time.sleep(delay)
+
+
+def build_providers() -> List[LLMProvider]:
+    """
+    Create every provider that has an API key and an installed SDK.
+
+    Priority: Groq > Gemini > OpenAI. Set LLM_PROVIDER=mock to use only the
+    offline mock provider (MOCK_LLM_LATENCY / MOCK_LLM_FAILURE_RATE tune it).
+    """
+    if os.getenv('LLM_PROVIDER', '').lower() == 'mock':
+        return [MockProvider(
+            latency=float(os.getenv('MOCK_LLM_LATENCY', '0.5')),
+            failure_rate=float(os.getenv('MOCK_LLM_FAILURE_RATE', '0'))
+        )]
+
+    providers = []
+    groq_api_key = os.getenv('GROQ_API_KEY')
+    gemini_api_key = os.getenv('GOOGLE_API_KEY')
+    openai_api_key = os.getenv('OPENAI_API_KEY')
+
+    candidates = [
+        (groq_api_key and OPENAI_AVAILABLE, lambda: OpenAICompatibleProvider(
+            'groq', groq_api_key, 'llama-3.3-70b-versatile',
+            base_url="https://api.groq.com/openai/v1", timeout=30.0
+        )),
+        (gemini_api_key and GEMINI_AVAILABLE, lambda: GeminiProvider(gemini_api_key)),
+        (openai_api_key and OPENAI_AVAILABLE, lambda: OpenAICompatibleProvider(
+            'openai', openai_api_key, 'gpt-3.5-turbo', timeout=60.0
+        )),
+    ]
+    for enabled, factory in candidates:
+        if not enabled:
+            continue
+        try:
+            providers.append(factory())
+        except Exception as e:
+            logger.warning(f"Could not initialize provider: {e}")
+    return providers
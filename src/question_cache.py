@@ -0,0 +1,122 @@
+"""
+Question Cache - Content-hash cache in front of LLM question generation
+"""
+
+import re
+import copy
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+# Import logger
+try:
+    from src.logger import get_generator_logger
+    logger = get_generator_logger()
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+def content_fingerprint(content: str) -> str:
+    """SHA-256 of the content with case and whitespace normalized."""
+    normalized = re.sub(r'\s+', ' ', content or '').strip().lower()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def make_cache_key(fingerprint: str, kind: str, *parts: Any) -> str:
+    """Combine a content fingerprint with the generation settings."""
+    raw = '|'.join([fingerprint, kind] + [str(p) for p in parts])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class QuestionCache:
+    """
+    Two-tier cache for generated questions and extracted concepts.
+
+    The first tier is an in-process LRU; the second is the QuizDatabase
+    question store (get_question_set / save_questions), so a set generated
+    once survives restarts and is shared by every session. The TTL counts
+    from when a set was first saved and applies to both tiers; expired sets
+    are pruned from the database at most once per `prune_interval`.
+    Entries are copied on the way in and out so callers can't mutate the
+    cached set.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 24 * 3600, backend=None,
+                 prune_interval: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.prune_interval = prune_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def get(self, key: str, persistent: bool = False) -> Optional[Any]:
+        """Look up a key, falling back to the database tier when persistent."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if time.time() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    return copy.deepcopy(value)
+                del self._entries[key]
+
+        if persistent and self.backend is not None:
+            found = self.backend.get_question_set(key, max_age=self.ttl_seconds)
+            if found and found['questions']:
+                # Keep the set's original age, so it expires from memory on time too
+                self._store(key, found['questions'], stored_at=found['created_at'].timestamp())
+                return copy.deepcopy(found['questions'])
+        return None
+
+    def set(self, key: str, value: Any, persistent: bool = False):
+        """Store a value, also writing it to the database tier when persistent."""
+        self._store(key, value)
+        if persistent and self.backend is not None:
+            self.backend.save_questions(value, content_hash=key)
+            self._prune_backend()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key: str, value: Any, stored_at: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (stored_at or time.time(), copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _prune_backend(self):
+        """Delete expired sets from the database tier, at most once per prune_interval."""
+        with self._lock:
+            now = time.time()
+            if now - self._last_prune < self.prune_interval:
+                return
+            self._last_prune = now
+        removed = self.backend.prune_questions(self.ttl_seconds)
+        if removed:
+            logger.info(f"Pruned {removed} expired question sets")
+
+
+# Singleton instance
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+def get_question_cache() -> QuestionCache:
+    """Get or create the process-wide question cache."""
+    global _cache_instance
+    with _cache_lock:
+        if _cache_instance is None:
+            backend = None
+            try:
+                from src.database import get_database
+                backend = get_database()
+            except Exception as e:
+                logger.warning(f"Question cache running without database tier: {e}")
+            _cache_instance = QuestionCache(backend=backend)
+        return _cache_instance
@@ -2,12 +2,15 @@
 Question Generator - Uses AI to generate quiz questions
 """
 
-import os
+import re
 import json
+import uuid
 import random
-from typing import List, Dict, Optional
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
 
-# Import logger
 # Import logger
 try:
     from src.logger import get_generator_logger
@@ -16,55 +19,65 @@ except ImportError:
     import logging
     logger = logging.getLogger(__name__)
 
+from src.providers import ProviderChain, build_providers
+from src.question_cache import get_question_cache, content_fingerprint, make_cache_key
+from src.utils import chunk_text
+from src.json_stream import JSONArrayStreamParser
+from src.jobs import Job, JobCancelled, JobTimeout, get_job_executor
 
-# Try to import OpenAI, fall back to sample questions if not available
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
 
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
+# Values accepted from the LLM; anything else is normalized or rejected
+QUESTION_TYPES = {'mcq', 'true_false', 'fill_blank', 'short_answer'}
+DIFFICULTIES = {'easy', 'medium', 'hard'}
+
+# A combined response whose first array is keyed "concepts"; otherwise questions come first
+CONCEPTS_FIRST = re.compile(r'"concepts"\s*:\s*$')
 
 
 class QuestionGenerator:
+    # Map-reduce settings for documents longer than one prompt window
+    CHUNK_SIZE = 4000
+    MIN_QUESTIONS_PER_CHUNK = 2
+    MAX_CONCURRENT_CHUNKS = 4
+    # Extra rounds that ask again for questions lost to cross-chunk duplicates
+    TOP_UP_ROUNDS = 2
+    # Opt-in early-stop budget for extraction, in chunks per chunk sampled
+    SOURCE_CHUNKS_PER_SAMPLE = 5
+    
+    # Background generation jobs give up after this many seconds
+    GENERATION_TIMEOUT = 180
+    
     def __init__(self):
         logger.info("Initializing QuestionGenerator...")
-        self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        self.gemini_api_key = os.getenv('GOOGLE_API_KEY')
-        self.groq_api_key = os.getenv('GROQ_API_KEY')
-        
-        self.use_groq = False
-        self.use_gemini = None
-        
-        # Priority: Groq > Gemini > OpenAI
-        if self.groq_api_key and OPENAI_AVAILABLE:
-            logger.info("Using Groq API for question generation")
-            self.client = OpenAI(
-                api_key=self.groq_api_key,
-                base_url="https://api.groq.com/openai/v1"
-            )
-            self.use_groq = True
-        elif self.gemini_api_key and GEMINI_AVAILABLE:
-            genai.configure(api_key=self.gemini_api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-            self.use_gemini = True
-        elif self.openai_api_key and OPENAI_AVAILABLE:
-            self.client = OpenAI(api_key=self.openai_api_key)
-            self.use_gemini = False
+        
+        # Providers in priority order (Groq > Gemini > OpenAI); the chain
+        # retries and fails over between them
+        providers = build_providers()
+        self.llm = ProviderChain(providers) if providers else None
+        
+        if self.llm:
+            self.provider = self.llm.primary.name
+            self.model_name = self.llm.primary.model
+            logger.info(f"Using providers: {', '.join(p.name for p in providers)}")
         else:
-            self.use_gemini = None  # Use sample questions
+            self.provider = 'sample'  # Use sample questions
+            self.model_name = None
+        
+        # Only AI output is cached; sample questions are cheap and randomized
+        self.cache = get_question_cache() if self.llm else None
     
     def extract_key_concepts(self, content: str) -> List[str]:
         """Extract key concepts from the content using AI."""
-        if not (self.use_groq or self.use_gemini is not None):
+        if not self.llm:
             # Fallback: extract keywords manually
             return self._extract_keywords_simple(content)
         
+        cache_key = self.concepts_cache_key(content)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info("Key concepts served from cache")
+            return cached
+        
         prompt = f"""Analyze the following content and extract the 5-10 most important key concepts, topics, or terms.
 Return ONLY a JSON array of strings. Example: ["Machine Learning", "Neural Networks", "Data Processing"]
 
@@ -74,41 +87,40 @@ Content:
 Return ONLY the JSON array:"""
 
         try:
-            if self.use_groq:
-                response = self.client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[
-                        {"role": "system", "content": "You extract key concepts. Return only valid JSON array."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.3
-                )
-                response_text = response.choices[0].message.content
-            elif self.use_gemini:
-                response = self.model.generate_content(prompt)
-                response_text = response.text
-            else:
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You extract key concepts. Return only valid JSON array."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.3
-                )
-                response_text = response.choices[0].message.content
+            response_text = self.llm.complete(
+                prompt,
+                system="You extract key concepts. Return only valid JSON array.",
+                temperature=0.3
+            )
             
             # Parse JSON
             json_start = response_text.find('[')
             json_end = response_text.rfind(']') + 1
             if json_start != -1 and json_end > json_start:
-                concepts = json.loads(response_text[json_start:json_end])
-                return concepts[:10]
+                concepts = json.loads(response_text[json_start:json_end])[:10]
+                self.cache.set(cache_key, concepts)
+                return concepts
         except Exception as e:
             print(f"Concept extraction failed: {e}")
         
         return self._extract_keywords_simple(content)
     
+    def source_char_limit(self, num_questions: int) -> int:
+        """
+        Character budget for the optional early stop when extracting a PDF.
+        
+        Chunked generation prompts at most num_questions // MIN_QUESTIONS_PER_CHUNK
+        chunks, sampled across the whole document. Stopping extraction at this
+        budget still leaves several chunks of text per sampled chunk, but
+        anything after the cut-off can no longer be sampled.
+        """
+        sampled = max(1, num_questions // self.MIN_QUESTIONS_PER_CHUNK)
+        return self.CHUNK_SIZE * sampled * self.SOURCE_CHUNKS_PER_SAMPLE
+    
+    def quick_concepts(self, content: str) -> List[str]:
+        """Instant keyword-based concepts to show while the AI is still working."""
+        return self._extract_keywords_simple(content)
+    
     def _extract_keywords_simple(self, content: str) -> List[str]:
         """Simple keyword extraction without AI."""
         import re
@@ -133,23 +145,292 @@ Return ONLY the JSON array:"""
             question_types = ['MCQ', 'True/False']
         
         # Try AI generation first
-        if self.use_groq or self.use_gemini is not None:
+        if self.llm:
+            cache_key = self.questions_cache_key(content, num_questions, question_types)
+            cached = self.cache.get(cache_key, persistent=True)
+            if cached is not None:
+                logger.info(f"Serving {len(cached)} questions from cache")
+                return cached
             try:
-                return self._generate_with_ai(content, num_questions, question_types)
+                if len(content) > self.CHUNK_SIZE:
+                    questions = self._generate_chunked(content, num_questions, question_types)
+                else:
+                    questions = self._generate_with_ai(content, num_questions, question_types)
+                self.cache.set(cache_key, questions, persistent=True)
+                return questions
             except Exception as e:
                 print(f"AI generation failed: {e}")
         
         # Fallback to sample questions
         return self._generate_sample_questions(content, num_questions, question_types)
     
-    def _generate_with_ai(
-        self, 
-        content: str, 
+    def stream_questions(
+        self,
+        content: str,
+        num_questions: int = 10,
+        question_types: List[str] = None,
+        on_concepts: Optional[Callable[[Optional[List[str]]], None]] = None
+    ) -> Iterator[Dict]:
+        """
+        Yield quiz questions one at a time as the LLM produces them.
+        
+        Short content streams a single completion through an incremental
+        JSON parser; long content yields each chunk's questions as soon as
+        that chunk finishes. Falls back to sample questions like
+        generate_questions.
+        
+        When on_concepts is given, short content uses the combined prompt
+        and the key concepts are passed to it as soon as they have streamed
+        in. It is called with None when concepts could not be produced this
+        way, so the caller can fall back to extract_key_concepts.
+        """
+        if question_types is None:
+            question_types = ['MCQ', 'True/False']
+        
+        produced = 0
+        if self.llm:
+            cache_key = self.questions_cache_key(content, num_questions, question_types)
+            concepts_key = self.concepts_cache_key(content)
+            cached = self.cache.get(cache_key, persistent=True)
+            if cached is not None:
+                logger.info(f"Streaming {len(cached)} questions from cache")
+                if on_concepts:
+                    on_concepts(self.cache.get(concepts_key))
+                yield from cached
+                return
+            
+            questions = []
+            seen = set()
+            try:
+                if len(content) > self.CHUNK_SIZE:
+                    if on_concepts:
+                        on_concepts(None)
+                    source = self._stream_chunked(content, num_questions, question_types)
+                elif on_concepts:
+                    cached_concepts = self.cache.get(concepts_key)
+                    if cached_concepts is not None:
+                        on_concepts(cached_concepts)
+                        source = self._stream_with_ai(content, num_questions, question_types)
+                    else:
+                        source = self._stream_combined(
+                            content, num_questions, question_types, concepts_key, on_concepts
+                        )
+                else:
+                    source = self._stream_with_ai(content, num_questions, question_types)
+                for q in source:
+                    key = self._question_key(q)
+                    if not key or key in seen:
+                        continue
+                    seen.add(key)
+                    questions.append(q)
+                    produced += 1
+                    yield q
+                    if produced >= num_questions:
+                        break
+                if questions:
+                    self.cache.set(cache_key, questions, persistent=True)
+            except (JobCancelled, JobTimeout):
+                raise  # the job is over; don't start the sample fallback
+            except Exception as e:
+                logger.warning(f"Streaming generation failed after {produced} questions: {e}")
+        
+        if produced == 0:
+            yield from self._generate_sample_questions(content, num_questions, question_types)
+    
+    def start_question_stream(
+        self,
+        content: str,
+        num_questions: int = 10,
+        question_types: List[str] = None,
+        with_concepts: bool = False,
+        session_id: str = None
+    ) -> 'QuestionStream':
+        """
+        Queue stream_questions on the shared job executor.
+        
+        With with_concepts, AI concepts are delivered to the stream too:
+        from the combined response when possible, otherwise from a second
+        background extract_key_concepts job. Starting a new stream for the
+        same session cancels the previous one.
+        """
+        session_id = session_id or uuid.uuid4().hex
+        executor = get_job_executor()
+        stream = QuestionStream(expected=num_questions)
+        
+        def deliver_concepts(concepts: Optional[List[str]]):
+            if concepts is not None:
+                stream.set_concepts(concepts)
+                return
+            stream.concepts_pending = True
+            stream.concepts_job = executor.submit(
+                session_id, 'concepts', extract_concepts, timeout=self.GENERATION_TIMEOUT
+            )
+            stream.concepts_job.future.add_done_callback(stream.concepts_job_finished)
+        
+        def extract_concepts(job: Job):
+            concepts = None
+            try:
+                concepts = self.extract_key_concepts(content)
+            finally:
+                # Always mark concepts ready so the stream can settle
+                stream.set_concepts(concepts)
+        
+        iterator = self.stream_questions(
+            content, num_questions, question_types,
+            on_concepts=deliver_concepts if with_concepts and self.llm else None
+        )
+        stream.job = executor.submit(
+            session_id, 'questions',
+            lambda job: stream.run(iterator, job),
+            timeout=self.GENERATION_TIMEOUT
+        )
+        stream.job.future.add_done_callback(stream.job_finished)
+        return stream
+    
+    def concepts_cache_key(self, content: str) -> str:
+        """Cache key for extracted concepts: content and provider/model."""
+        return make_cache_key(
+            content_fingerprint(content), 'concepts', self.provider, self.model_name
+        )
+    
+    def questions_cache_key(self, content: str, num_questions: int, question_types: List[str]) -> str:
+        """Cache key for a question set: content, settings and provider/model."""
+        return make_cache_key(
+            content_fingerprint(content), 'questions', num_questions,
+            ','.join(sorted(question_types)), self.provider, self.model_name
+        )
+    
+    def _generate_chunked(
+        self,
+        content: str,
         num_questions: int,
         question_types: List[str]
     ) -> List[Dict]:
-        """Generate questions using AI."""
+        """Generate questions from the whole document by prompting chunks in parallel."""
+        questions = list(self._chunked_rounds(content, num_questions, question_types, ordered=True))
+        if not questions:
+            raise ValueError("No chunk produced valid questions")
+        return questions
+    
+    def _stream_chunked(
+        self,
+        content: str,
+        num_questions: int,
+        question_types: List[str]
+    ) -> Iterator[Dict]:
+        """Yield each chunk's questions as soon as that chunk completes."""
+        return self._chunked_rounds(content, num_questions, question_types)
+    
+    def _chunked_rounds(
+        self,
+        content: str,
+        num_questions: int,
+        question_types: List[str],
+        ordered: bool = False
+    ) -> Iterator[Dict]:
+        """
+        Yield up to num_questions unique, valid questions from the chunks.
+        
+        Duplicates across chunks (and failed chunks) leave a shortfall, which
+        is asked for again, with some slack and the kept questions listed as
+        ones to avoid, for up to TOP_UP_ROUNDS more rounds. With ordered, each
+        round is merged in document order instead of completion order.
+        """
+        chunks = chunk_text(content, self.CHUNK_SIZE)
+        seen = set()
+        kept = []
         
+        for round_no in range(1 + self.TOP_UP_ROUNDS):
+            shortfall = num_questions - len(kept)
+            if shortfall <= 0:
+                return
+            if round_no == 0:
+                allocation = self._allocate_questions(chunks, num_questions)
+                logger.info(f"Chunked generation: {len(allocation)} chunks for {num_questions} questions")
+            else:
+                allocation = self._allocate_questions(chunks, shortfall + (shortfall + 1) // 2)
+                logger.info(f"Chunked generation: asking again for {shortfall} questions lost to duplicates")
+            
+            results = self._run_chunks(allocation, question_types, exclude=[q['question'] for q in kept])
+            if ordered:
+                results = sorted(results, key=lambda item: item[0])
+            
+            added = 0
+            for _, chunk_questions in results:
+                for q in chunk_questions:
+                    key = self._question_key(q)
+                    if not key or key in seen:
+                        continue
+                    seen.add(key)
+                    kept.append(q)
+                    added += 1
+                    yield q
+                    if len(kept) >= num_questions:
+                        return
+            if added == 0:
+                break  # nothing new this round; another would only repeat it
+        
+        logger.warning(f"Chunked generation produced {len(kept)} of {num_questions} questions")
+    
+    def _run_chunks(
+        self,
+        allocation: List[Tuple[str, int]],
+        question_types: List[str],
+        exclude: List[str] = None
+    ) -> Iterator[Tuple[int, List[Dict]]]:
+        """Prompt chunks concurrently, yielding (index, questions) in completion order."""
+        workers = min(self.MAX_CONCURRENT_CHUNKS, len(allocation))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Each chunk runs in a copy of this context, so LLM calls still
+            # see the calling job's deadline
+            futures = {
+                executor.submit(
+                    contextvars.copy_context().run, self._generate_with_ai, chunk, count, question_types, exclude
+                ): i
+                for i, (chunk, count) in enumerate(allocation)
+            }
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except (JobCancelled, JobTimeout):
+                    for pending in futures:
+                        pending.cancel()
+                    raise
+                except Exception as e:
+                    logger.warning(f"Chunk {futures[future]} generation failed: {e}")
+    
+    @staticmethod
+    def _question_key(question: Dict) -> str:
+        """Normalized question text used to drop duplicates."""
+        return re.sub(r'\W+', ' ', str(question.get('question', ''))).strip().lower()
+    
+    def _allocate_questions(self, chunks: List[str], num_questions: int) -> List[Tuple[str, int]]:
+        """
+        Pick chunks spread across the document and split num_questions
+        between them in proportion to their length (largest remainder).
+        """
+        max_chunks = max(1, num_questions // self.MIN_QUESTIONS_PER_CHUNK)
+        if len(chunks) > max_chunks:
+            step = len(chunks) / max_chunks
+            chunks = [chunks[int(i * step)] for i in range(max_chunks)]
+        
+        total_len = sum(len(c) for c in chunks) or 1
+        shares = [num_questions * len(c) / total_len for c in chunks]
+        counts = [int(share) for share in shares]
+        by_remainder = sorted(range(len(chunks)), key=lambda i: shares[i] - counts[i], reverse=True)
+        for i in by_remainder[:num_questions - sum(counts)]:
+            counts[i] += 1
+        
+        return [(chunk, count) for chunk, count in zip(chunks, counts) if count > 0]
+    
+    def _build_questions_prompt(
+        self,
+        content: str,
+        num_questions: int,
+        question_types: List[str],
+        exclude: List[str] = None
+    ) -> str:
+        """Build the question-generation prompt for one piece of content."""
         type_instructions = {
             'MCQ': 'multiple choice questions with 4 options',
             'True/False': 'true/false questions',
@@ -158,6 +439,10 @@ Return ONLY the JSON array:"""
         }
         
         types_str = ', '.join([type_instructions.get(t, t) for t in question_types])
+        avoid = ''
+        if exclude:
+            listed = '\n'.join(f"- {q[:200]}" for q in exclude[-50:])
+            avoid = f"\nDo not repeat any of these questions, which were already asked:\n{listed}\n"
         
         prompt = f"""Analyze the following content and generate {num_questions} quiz questions.
 Generate a mix of: {types_str}
@@ -169,7 +454,7 @@ For each question, provide:
 - difficulty: easy, medium, or hard
 - topic: The main topic/concept being tested
 - type: mcq, true_false, fill_blank, or short_answer
-
+{avoid}
 Content to analyze:
 {content[:4000]}
 
@@ -184,32 +469,182 @@ Return ONLY a valid JSON array of questions. Example format:
     "type": "mcq"
   }}
 ]"""
+        
+        return prompt
+    
+    def _build_combined_prompt(
+        self,
+        content: str,
+        num_questions: int,
+        question_types: List[str]
+    ) -> str:
+        """Prompt for concepts and questions in one JSON object, concepts first."""
+        questions_prompt = self._build_questions_prompt(content, num_questions, question_types)
+        instructions = questions_prompt.split('Return ONLY a valid JSON array')[0].rstrip()
+        
+        return f"""{instructions}
 
-        if self.use_groq:
-            # Use Groq API (fast inference)
-            response = self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": "You are a quiz generator. Return only valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
-            )
-            response_text = response.choices[0].message.content
-        elif self.use_gemini:
-            response = self.model.generate_content(prompt)
-            response_text = response.text
-        else:
-            # Use OpenAI
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a quiz generator. Return only valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
+Also extract the 5-10 most important key concepts, topics, or terms from the content.
+
+Return ONLY a valid JSON object with "concepts" FIRST, then "questions". Example format:
+{{
+  "concepts": ["Machine Learning", "Neural Networks"],
+  "questions": [
+    {{
+      "question": "What is the main concept discussed?",
+      "answer": "Correct answer here",
+      "distractors": ["Wrong option 1", "Wrong option 2", "Wrong option 3"],
+      "difficulty": "medium",
+      "topic": "Main Topic",
+      "type": "mcq"
+    }}
+  ]
+}}"""
+    
+    @staticmethod
+    def _normalize_question(question) -> Optional[Dict]:
+        """Check one question against the expected schema, filling safe defaults."""
+        if not isinstance(question, dict):
+            return None
+        text = str(question.get('question') or '').strip()
+        answer = question.get('answer')
+        if not text or answer is None or str(answer).strip() == '':
+            return None
+        
+        qtype = str(question.get('type') or 'mcq').strip().lower().replace('/', '_').replace(' ', '_')
+        if qtype not in QUESTION_TYPES:
+            qtype = 'mcq'
+        distractors = question.get('distractors') or []
+        if not isinstance(distractors, list):
+            distractors = []
+        distractors = [str(d) for d in distractors if str(d).strip()]
+        if qtype == 'mcq' and not distractors:
+            return None
+        difficulty = str(question.get('difficulty') or 'medium').strip().lower()
+        
+        return {
+            'question': text,
+            'answer': str(answer).strip(),
+            'distractors': distractors if qtype == 'mcq' else [],
+            'difficulty': difficulty if difficulty in DIFFICULTIES else 'medium',
+            'topic': str(question.get('topic') or 'General').strip(),
+            'type': qtype
+        }
+    
+    def _stream_combined(
+        self,
+        content: str,
+        num_questions: int,
+        question_types: List[str],
+        concepts_key: str,
+        on_concepts: Callable[[Optional[List[str]]], None]
+    ) -> Iterator[Dict]:
+        """
+        Stream the combined response: yield questions and hand over concepts
+        as each array completes, in whichever order the model sends them.
+        """
+        prompt = self._build_combined_prompt(content, num_questions, question_types)
+        parsers = {
+            'concepts': JSONArrayStreamParser(objects_only=False),
+            'questions': JSONArrayStreamParser()
+        }
+        order = None  # keys still to parse, in the order their arrays arrive
+        head = ''
+        concepts = []
+        delivered = False
+        
+        try:
+            for piece in self.llm.stream(
+                prompt,
+                system="You are a quiz generator. Return only valid JSON.",
                 temperature=0.7
-            )
-            response_text = response.choices[0].message.content
+            ):
+                if order is None:
+                    # Wait for the first array; the key in front of it decides the order
+                    head += piece
+                    start = head.find('[')
+                    if start == -1:
+                        continue
+                    order = (['concepts', 'questions'] if CONCEPTS_FIRST.search(head[:start])
+                             else ['questions', 'concepts'])
+                    piece = head[start:]
+                
+                while piece and order:
+                    key = order[0]
+                    parser = parsers[key]
+                    found = parser.feed(piece)
+                    if key == 'questions':
+                        for question in found:
+                            question = self._normalize_question(question)
+                            if question:
+                                yield question
+                    else:
+                        concepts += found
+                    if not parser.finished:
+                        break
+                    piece = parser.remainder
+                    order.pop(0)
+                    if key == 'concepts':
+                        concepts = [str(c).strip() for c in concepts if isinstance(c, str) and c.strip()][:10]
+                        if concepts:
+                            self.cache.set(concepts_key, concepts)
+                        on_concepts(concepts or None)
+                        delivered = True
+                if order == []:
+                    break
+        except (GeneratorExit, JobCancelled, JobTimeout):
+            # Closed early or the job is over: the user has moved on, so
+            # don't queue a fallback concepts job for them
+            delivered = True
+            raise
+        finally:
+            if not delivered:
+                on_concepts(None)
+        
+        if parsers['questions'].parsed == 0:
+            raise ValueError("Combined stream did not contain a valid question array")
+    
+    def _stream_with_ai(
+        self,
+        content: str,
+        num_questions: int,
+        question_types: List[str]
+    ) -> Iterator[Dict]:
+        """Stream a completion and yield each question object once it is complete."""
+        prompt = self._build_questions_prompt(content, num_questions, question_types)
+        parser = JSONArrayStreamParser()
+        pieces = self.llm.stream(
+            prompt,
+            system="You are a quiz generator. Return only valid JSON.",
+            temperature=0.7
+        )
+        
+        for piece in pieces:
+            for question in parser.feed(piece):
+                question = self._normalize_question(question)
+                if question:
+                    yield question
+            if parser.finished:
+                break
+        
+        if parser.parsed == 0:
+            raise ValueError("Streamed response did not contain a valid question array")
+    
+    def _generate_with_ai(
+        self, 
+        content: str, 
+        num_questions: int,
+        question_types: List[str],
+        exclude: List[str] = None
+    ) -> List[Dict]:
+        """Generate questions using AI; only schema-valid, normalized questions are returned."""
+        prompt = self._build_questions_prompt(content, num_questions, question_types, exclude)
+
+        response_text = self.llm.complete(
+            prompt,
+            system="You are a quiz generator. Return only valid JSON.",
+            temperature=0.7
+        )
         
         # Parse JSON from response
         try:
@@ -219,11 +654,15 @@ Return ONLY a valid JSON array of questions. Example format:
             if json_start != -1 and json_end > json_start:
                 json_str = response_text[json_start:json_end]
                 questions = json.loads(json_str)
-                return questions
+                if isinstance(questions, list):
+                    questions = [q for q in map(self._normalize_question, questions) if q]
+                    if questions:
+                        return questions
         except json.JSONDecodeError:
             pass
         
-        return self._generate_sample_questions(content, num_questions, question_types)
+        # Let generate_questions fall back so malformed output is never cached
+        raise ValueError("AI response did not contain a valid question array")
     
     def _generate_sample_questions(
         self, 
@@ -338,3 +777,92 @@ Return ONLY a valid JSON array of questions. Example format:
             sample_questions.append(template)
         
         return sample_questions
+
+
+class QuestionStream:
+    """
+    Collects questions from a background generation job.
+    
+    The Streamlit script can show the first question while the rest are
+    still being generated: a polling fragment reads snapshot(), concepts
+    and settled on each run until the stream is settled.
+    """
+    
+    def __init__(self, expected: int):
+        self.expected = expected
+        self.questions = []
+        self.concepts = None
+        self.concepts_ready = False
+        self.concepts_pending = False
+        self.done = False
+        self.error = None
+        self.job = None
+        self.concepts_job = None
+        self._lock = threading.Lock()
+    
+    @property
+    def settled(self) -> bool:
+        """True once questions and any background concept extraction are finished."""
+        return self.done and (self.concepts_ready or not self.concepts_pending)
+    
+    def set_concepts(self, concepts: Optional[List[str]]):
+        """Callback for stream_questions(on_concepts=...)."""
+        with self._lock:
+            self.concepts = concepts
+            self.concepts_ready = True
+    
+    def run(self, iterator: Iterator[Dict], job: Optional[Job] = None):
+        """Consume the iterator, checking the job for cancellation and timeout."""
+        try:
+            for question in iterator:
+                if job is not None:
+                    job.check()
+                with self._lock:
+                    self.questions.append(question)
+        except (JobCancelled, JobTimeout) as e:
+            self.error = e
+            iterator.close()
+            raise
+        except Exception as e:
+            logger.error(f"Question stream failed: {e}")
+            self.error = e
+        finally:
+            with self._lock:
+                self.done = True
+    
+    def job_finished(self, future):
+        """Done-callback for the questions job: settle even if it never ran."""
+        if future.cancelled():
+            with self._lock:
+                if self.error is None:
+                    self.error = JobCancelled('questions')
+                self.done = True
+    
+    def concepts_job_finished(self, future):
+        """Done-callback for the concepts job: a job cancelled while queued has no concepts."""
+        if future.cancelled():
+            self.set_concepts(self.concepts)
+    
+    def cancel(self):
+        """Stop generating; questions received so far are kept."""
+        for job in (self.job, self.concepts_job):
+            if job is not None:
+                job.cancel()
+    
+    def snapshot(self) -> List[Dict]:
+        """Questions received so far."""
+        with self._lock:
+            return list(self.questions)
+
+
+# Singleton instance: one generator (and one set of provider clients) per process
+_generator_instance = None
+_generator_lock = threading.Lock()
+
+def get_question_generator() -> QuestionGenerator:
+    """Get or create the process-wide question generator."""
+    global _generator_instance
+    with _generator_lock:
+        if _generator_instance is None:
+            _generator_instance = QuestionGenerator()
+        return _generator_instance
@@ -2,6 +2,9 @@
 Quiz Engine - Handles adaptive difficulty and answer checking
 """
 
+import threading
+from collections.abc import Mapping
+
 # Import logger
 try:
     from src.logger import get_engine_logger
@@ -11,6 +14,45 @@ except ImportError:
     logger = logging.getLogger(__name__)
 
 
+class AnswerRecord(Mapping):
+    """
+    One answered question, as a compact read-only mapping.
+
+    Uses __slots__ instead of a per-answer dict, and shares the question,
+    answer and topic strings with the question it came from rather than
+    copying them. Reads like the answer dicts it replaces
+    (record['is_correct'], record.get('topic')); dict(record) gives a
+    plain dict for JSON or the database.
+    """
+
+    __slots__ = ('question', 'user_answer', 'correct_answer', 'is_correct',
+                 'difficulty', 'topic', 'response_time')
+
+    def __init__(self, question: str, user_answer: str, correct_answer: str, is_correct: bool,
+                 difficulty: str = 'medium', topic: str = 'General', response_time: float = 0.0):
+        self.question = question
+        self.user_answer = user_answer
+        self.correct_answer = correct_answer
+        self.is_correct = is_correct
+        self.difficulty = difficulty
+        self.topic = topic
+        self.response_time = response_time
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __repr__(self):
+        return f"AnswerRecord({dict(self)!r})"
+
+
 class QuizEngine:
     def __init__(self):
         self.difficulty_levels = ['easy', 'medium', 'hard']
@@ -29,10 +71,10 @@ class QuizEngine:
             # More lenient matching for short answers and fill in the blank
             # Check for exact match, substring match, or high similarity
             if user_clean == correct_clean:
-                logger.debug(f"Exact match for {question_type}")
+                logger.debug("Exact match for %s", question_type)
                 return True
             if user_clean in correct_clean or correct_clean in user_clean:
-                logger.debug(f"Substring match for {question_type}")
+                logger.debug("Substring match for %s", question_type)
                 return True
             # Check word overlap for longer answers
             user_words = set(user_clean.split())
@@ -40,17 +82,17 @@ class QuizEngine:
             if len(correct_words) > 0:
                 overlap = len(user_words & correct_words) / len(correct_words)
                 if overlap >= 0.7:  # 70% word overlap
-                    logger.debug(f"Word overlap match ({overlap:.0%}) for {question_type}")
+                    logger.debug("Word overlap match (%.0f%%) for %s", overlap * 100, question_type)
                     return True
             return False
         else:
             is_correct = user_clean == correct_clean
-            logger.debug(f"MCQ/TF answer check: {is_correct}")
+            logger.debug("MCQ/TF answer check: %s", is_correct)
             return is_correct
     
     def get_next_difficulty(self, current_difficulty: str, is_correct: bool, recent_answers: list) -> str:
         """Determine the next difficulty level based on performance."""
-        logger.debug(f"Calculating next difficulty. Current: {current_difficulty}, Correct: {is_correct}")
+        logger.debug("Calculating next difficulty. Current: %s, Correct: %s", current_difficulty, is_correct)
         if len(recent_answers) < 3:
             # Not enough data, adjust based on last answer only
             if is_correct and current_difficulty != 'hard':
@@ -82,3 +124,16 @@ class QuizEngine:
             return matching
         # Fallback to any available questions
         return questions
+
+
+# Singleton instance (the engine is stateless, so every session shares it)
+_engine_instance = None
+_engine_lock = threading.Lock()
+
+def get_quiz_engine() -> QuizEngine:
+    """Get or create the process-wide quiz engine."""
+    global _engine_instance
+    with _engine_lock:
+        if _engine_instance is None:
+            _engine_instance = QuizEngine()
+        return _engine_instance
@@ -0,0 +1,133 @@
+"""
+Results Engine - Single-pass columnar scoring of quiz answers
+"""
+
+import hashlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+# Difficulty levels used on the progression chart
+DIFFICULTY_LEVELS = {'easy': 1, 'medium': 2, 'hard': 3}
+
+
+class QuizResults(dict):
+    """
+    Quiz results plus the per-answer columns they were computed from.
+
+    The answers are read once into NumPy arrays (correctness, response
+    time, topic code, difficulty code) and every group-by is a bincount
+    over those codes. As a dict it carries the same summary keys
+    calculate_results always returned, so it can be saved to history
+    unchanged; the charts and recommendations reuse the columns instead
+    of walking the answers again.
+    """
+
+    def __init__(self, answers: List[Dict]):
+        is_correct = []
+        response_time = []
+        topic_codes = []
+        difficulty_codes = []
+        topics = {}
+        difficulties = {}
+
+        for answer in answers:
+            is_correct.append(bool(answer['is_correct']))
+            response_time.append(answer.get('response_time', 0) or 0)
+            topic_codes.append(topics.setdefault(answer.get('topic', 'General'), len(topics)))
+            difficulty_codes.append(difficulties.setdefault(answer.get('difficulty', 'medium'), len(difficulties)))
+
+        self.is_correct = np.array(is_correct, dtype=bool)
+        self.response_time = np.array(response_time, dtype=float)
+        self.topic_codes = np.array(topic_codes, dtype=np.intp)
+        self.difficulty_codes = np.array(difficulty_codes, dtype=np.intp)
+        self.topic_names = list(topics)
+        self.difficulty_names = list(difficulties)
+
+        total = len(answers)
+        correct = int(self.is_correct.sum())
+        super().__init__(
+            total=total,
+            correct=correct,
+            incorrect=total - correct,
+            accuracy=round((correct / total) * 100) if total > 0 else 0,
+            avg_response_time=float(self.response_time.mean()) if total else 0,
+            topic_performance=self._group(self.topic_codes, self.topic_names),
+            difficulty_performance=self._group(self.difficulty_codes, self.difficulty_names)
+        )
+
+    @property
+    def digest(self) -> str:
+        """Fingerprint of the answer columns, used to key cached figures."""
+        h = hashlib.sha1()
+        for column in (self.is_correct, self.response_time, self.topic_codes, self.difficulty_codes):
+            h.update(column.tobytes())
+        h.update('\x00'.join(self.topic_names + ['|'] + self.difficulty_names).encode('utf-8'))
+        return h.hexdigest()
+
+    def _group(self, codes: np.ndarray, names: List[str]) -> Dict[str, Dict[str, int]]:
+        totals = np.bincount(codes, minlength=len(names))
+        corrects = np.bincount(codes, weights=self.is_correct, minlength=len(names))
+        return {
+            name: {'correct': int(corrects[i]), 'total': int(totals[i])}
+            for i, name in enumerate(names)
+        }
+
+    def topic_accuracy(self, max_label: int = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Accuracy (%) per topic, in first-seen order.
+
+        With max_label, topics are grouped by their truncated label, so
+        two long topics sharing a prefix become one bar.
+        """
+        names = self.topic_names
+        codes = self.topic_codes
+        if max_label:
+            labels = {}
+            remap = np.array([labels.setdefault(name[:max_label], len(labels)) for name in names], dtype=np.intp)
+            names = list(labels)
+            codes = remap[codes] if len(codes) else codes
+        totals = np.bincount(codes, minlength=len(names))
+        corrects = np.bincount(codes, weights=self.is_correct, minlength=len(names))
+        accuracy = np.divide(corrects * 100, totals, out=np.zeros(len(names)), where=totals > 0)
+        return names, accuracy
+
+    def difficulty_series(self) -> np.ndarray:
+        """Difficulty level (1-3) of each answer, in answer order."""
+        levels = np.array([DIFFICULTY_LEVELS.get(name, 2) for name in self.difficulty_names], dtype=np.intp)
+        return levels[self.difficulty_codes] if len(self.difficulty_codes) else levels[:0]
+
+
+def lttb_indices(values: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling of an evenly spaced series.
+
+    Returns the indices of at most `threshold` points that keep the
+    visual shape of the line (peaks and dips survive, flat runs thin out).
+    The first and last points are always kept.
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    y = np.asarray(values, dtype=float)
+    x = np.arange(n, dtype=float)
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(int) + 1
+    edges[-1] = n - 1
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point for the final bucket)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # Point in this bucket forming the largest triangle with a and the average
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(areas.argmax())
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
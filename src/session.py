@@ -0,0 +1,92 @@
+"""
+Session - Shared app resources and lightweight per-session quiz context
+"""
+
+import uuid
+import threading
+from typing import List, Optional
+
+from src.database import QuizDatabase, get_database
+from src.quiz_engine import QuizEngine, get_quiz_engine
+from src.question_generator import QuestionGenerator, get_question_generator
+from src.analytics import QuizAnalytics, get_analytics
+from src.jobs import JobExecutor, get_job_executor
+
+
+class AppResources:
+    """
+    The heavy, thread-safe objects every session shares.
+
+    One instance per process: the database connection (or pool), the
+    question generator with its pooled provider clients, the quiz engine,
+    analytics and the background job pool.
+    """
+
+    __slots__ = ('database', 'engine', 'generator', 'analytics', 'jobs')
+
+    def __init__(self):
+        self.database: QuizDatabase = get_database()
+        self.engine: QuizEngine = get_quiz_engine()
+        self.generator: QuestionGenerator = get_question_generator()
+        self.analytics: QuizAnalytics = get_analytics()
+        self.jobs: JobExecutor = get_job_executor()
+
+
+# Singleton instance
+_resources_instance = None
+_resources_lock = threading.Lock()
+
+def get_resources() -> AppResources:
+    """Get or create the process-wide shared resources."""
+    global _resources_instance
+    with _resources_lock:
+        if _resources_instance is None:
+            _resources_instance = AppResources()
+        return _resources_instance
+
+
+class QuizSession:
+    """
+    Everything one browser session needs between reruns, and nothing more.
+
+    Holds plain values and references only (question dicts, compact answer
+    records); the uploaded text is not kept once generation has started,
+    and engines and clients live in AppResources.
+    """
+
+    __slots__ = (
+        'session_id', 'current_stage', 'questions', 'current_question_idx',
+        'user_answers', 'current_difficulty', 'quiz_start_time', 'question_start_time',
+        'questions_requested', 'key_concepts', 'concepts_source',
+        'question_stream', 'generation_error',
+        'timer_duration', 'show_timer', 'shuffled_options', 'last_question_idx', 'last_feedback',
+        'history_records', 'history_cursor', 'history_total', 'css_digest'
+    )
+
+    def __init__(self):
+        self.session_id = uuid.uuid4().hex  # keys this session's background jobs
+        self.timer_duration = 30  # seconds per question
+        self.show_timer = True
+        self.history_records: List = []  # history pages loaded so far, newest first
+        self.history_cursor: Optional[str] = None
+        self.history_total: Optional[int] = None  # attempt count the loaded pages reflect
+        self.css_digest: Optional[str] = None  # stylesheet already installed in this browser session
+        self.reset()
+
+    def reset(self):
+        """Back to a fresh upload page (timer settings and history paging are kept)."""
+        self.current_stage = 'upload'  # upload, concepts, quiz, results, history
+        self.questions: List = []
+        self.current_question_idx = 0
+        self.user_answers: List = []
+        self.current_difficulty = 'medium'
+        self.quiz_start_time = None
+        self.question_start_time = None
+        self.questions_requested = None  # what the user asked for; generation may return fewer
+        self.key_concepts: List = []
+        self.concepts_source = None  # 'keywords' until AI concepts arrive, then 'ai'
+        self.question_stream = None  # background generation still in progress
+        self.generation_error = None  # why the finished stream stopped, if it failed
+        self.shuffled_options = None
+        self.last_question_idx = None
+        self.last_feedback = None  # (question index, is_correct, correct answer, timed out) of the last submit
@@ -0,0 +1,400 @@
+"""
+SQLite Store - Embedded, indexed local storage for quiz data
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional
+
+# Import logger
+try:
+    from src.logger import get_database_logger
+    logger = get_database_logger()
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+from src.aggregates import merge_deltas, format_user_stats, format_topic_stats
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS question_sets (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    content_hash  TEXT,
+    created_at    TEXT NOT NULL,
+    num_questions INTEGER NOT NULL,
+    questions     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_question_sets_hash ON question_sets(content_hash, id);
+
+CREATE TABLE IF NOT EXISTS attempts (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id       TEXT NOT NULL,
+    timestamp     TEXT NOT NULL,
+    accuracy      REAL NOT NULL DEFAULT 0,
+    num_questions INTEGER NOT NULL DEFAULT 0,
+    total_time    REAL NOT NULL DEFAULT 0,
+    results       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_user_time ON attempts(user_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS answers (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    attempt_id     INTEGER NOT NULL REFERENCES attempts(id) ON DELETE CASCADE,
+    user_id        TEXT NOT NULL,
+    position       INTEGER NOT NULL,
+    question       TEXT,
+    user_answer    TEXT,
+    correct_answer TEXT,
+    is_correct     INTEGER NOT NULL DEFAULT 0,
+    difficulty     TEXT,
+    topic          TEXT NOT NULL DEFAULT 'General',
+    response_time  REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_answers_attempt ON answers(attempt_id);
+CREATE INDEX IF NOT EXISTS idx_answers_user_topic ON answers(user_id, topic, is_correct);
+
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id         TEXT PRIMARY KEY,
+    total_quizzes   INTEGER NOT NULL DEFAULT 0,
+    total_questions INTEGER NOT NULL DEFAULT 0,
+    accuracy_sum    REAL NOT NULL DEFAULT 0,
+    best_accuracy   REAL NOT NULL DEFAULT 0,
+    total_time      REAL NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS topic_stats (
+    user_id TEXT NOT NULL,
+    topic   TEXT NOT NULL,
+    correct INTEGER NOT NULL DEFAULT 0,
+    total   INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, topic)
+);
+
+CREATE TABLE IF NOT EXISTS imports (
+    source      TEXT PRIMARY KEY,
+    imported_at TEXT NOT NULL,
+    attempts    INTEGER NOT NULL
+);
+"""
+
+ANSWER_FIELDS = [
+    'question', 'user_answer', 'correct_answer', 'is_correct',
+    'difficulty', 'topic', 'response_time'
+]
+
+
+class SQLiteStore:
+    """
+    Quiz storage on stdlib sqlite3 in WAL mode.
+
+    Attempts, answers and question sets live in separate tables so every
+    QuizDatabase query (history, stats, topic breakdown, hash lookup) is an
+    indexed SQL query rather than a scan. Per-user and per-topic totals
+    are kept in user_stats / topic_stats, updated in the same transaction
+    as each attempt, so the stats reads are single-row lookups. Each thread
+    gets its own connection; WAL lets readers proceed while a session is
+    writing.
+    """
+
+    def __init__(self, db_path: str = 'smartquiz.db'):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        conn.commit()
+        if (conn.execute("SELECT 1 FROM attempts LIMIT 1").fetchone()
+                and not conn.execute("SELECT 1 FROM user_stats LIMIT 1").fetchone()):
+            self.rebuild_aggregates()
+        logger.info(f"SQLite store ready at {db_path}")
+
+    # ==================== Questions ====================
+
+    def save_questions(self, questions: List[Dict], content_hash: str = None) -> None:
+        self.save_questions_bulk([{'questions': questions, 'content_hash': content_hash}])
+
+    def save_questions_bulk(self, question_sets: List[Dict]) -> None:
+        """Insert several question sets in one transaction."""
+        now = datetime.now().isoformat()
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT INTO question_sets (content_hash, created_at, num_questions, questions) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (qs.get('content_hash'), now, len(qs['questions']), json.dumps(qs['questions']))
+                    for qs in question_sets
+                ]
+            )
+
+    def get_questions_by_hash(self, content_hash: str) -> Optional[List[Dict]]:
+        question_set = self.get_question_set(content_hash)
+        return question_set['questions'] if question_set else None
+
+    def get_question_set(self, content_hash: str, cutoff: Optional[datetime] = None) -> Optional[Dict]:
+        """Newest set for a hash, ignoring sets saved before cutoff."""
+        sql = "SELECT questions, created_at FROM question_sets WHERE content_hash = ?"
+        params = [content_hash]
+        if cutoff is not None:
+            sql += " AND created_at >= ?"
+            params.append(cutoff.isoformat())
+        row = self._conn().execute(sql + " ORDER BY id DESC LIMIT 1", params).fetchone()
+        if row is None:
+            return None
+        return {'questions': json.loads(row['questions']), 'created_at': datetime.fromisoformat(row['created_at'])}
+
+    def prune_questions(self, cutoff: datetime) -> int:
+        """Delete sets saved before cutoff and every set a newer one for the same hash replaced."""
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "DELETE FROM question_sets WHERE created_at < ? "
+                "OR id NOT IN (SELECT MAX(id) FROM question_sets GROUP BY content_hash)",
+                (cutoff.isoformat(),)
+            )
+        return cur.rowcount
+
+    def get_all_questions(self) -> List[Dict]:
+        rows = self._conn().execute(
+            "SELECT content_hash, created_at, num_questions, questions "
+            "FROM question_sets ORDER BY id DESC"
+        ).fetchall()
+        return [
+            {
+                'questions': json.loads(r['questions']),
+                'content_hash': r['content_hash'],
+                'created_at': r['created_at'],
+                'num_questions': r['num_questions']
+            }
+            for r in rows
+        ]
+
+    # ==================== Quiz History ====================
+
+    def save_quiz_attempt(self, entry: Dict) -> None:
+        self.save_quiz_attempts([entry])
+
+    def save_quiz_attempts(self, entries: List[Dict]) -> None:
+        """Insert several attempts, their answers and stat updates in one transaction."""
+        conn = self._conn()
+        with conn:
+            self._insert_attempts(conn, entries)
+
+    def imported(self, source: str) -> bool:
+        """True if history from `source` was already imported."""
+        return self._conn().execute(
+            "SELECT 1 FROM imports WHERE source = ?", (source,)
+        ).fetchone() is not None
+
+    def import_attempts(self, source: str, entries: List[Dict]) -> int:
+        """
+        Copy attempts from another store in, once per source; the attempts
+        and the import record are written in one transaction.
+
+        Returns:
+            Number of attempts imported (0 if `source` was imported before)
+        """
+        conn = self._conn()
+        with conn:
+            if conn.execute("SELECT 1 FROM imports WHERE source = ?", (source,)).fetchone():
+                return 0
+            self._insert_attempts(conn, entries)
+            conn.execute(
+                "INSERT INTO imports (source, imported_at, attempts) VALUES (?, ?, ?)",
+                (source, datetime.now().isoformat(), len(entries))
+            )
+        return len(entries)
+
+    def get_quiz_history(self, user_id: str = "default", limit: int = 50) -> List[Dict]:
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT id, user_id, timestamp, accuracy, num_questions, total_time, results "
+            "FROM attempts WHERE user_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+            (user_id, limit)
+        ).fetchall()
+        if not rows:
+            return []
+
+        # Fetch all answers for the page in one indexed query
+        ids = [r['id'] for r in rows]
+        placeholders = ','.join('?' * len(ids))
+        answers_by_attempt = {attempt_id: [] for attempt_id in ids}
+        for a in conn.execute(
+            f"SELECT attempt_id, {', '.join(ANSWER_FIELDS)} FROM answers "
+            f"WHERE attempt_id IN ({placeholders}) ORDER BY attempt_id, position",
+            ids
+        ):
+            answer = {field: a[field] for field in ANSWER_FIELDS}
+            answer['is_correct'] = bool(answer['is_correct'])
+            answers_by_attempt[a['attempt_id']].append(answer)
+
+        return [
+            {
+                'user_id': r['user_id'],
+                'timestamp': r['timestamp'],
+                'results': json.loads(r['results']),
+                'answers': answers_by_attempt[r['id']],
+                'accuracy': r['accuracy'],
+                'num_questions': r['num_questions'],
+                'total_time': r['total_time']
+            }
+            for r in rows
+        ]
+
+    def get_history_page(self, user_id: str = "default", limit: int = 20,
+                         cursor: Optional[str] = None) -> Dict:
+        """Newest-first page of attempt summaries, keyset-paginated on (timestamp, id)."""
+        sql = ("SELECT id, user_id, timestamp, accuracy, num_questions, total_time "
+               "FROM attempts WHERE user_id = ?")
+        params = [user_id]
+        if cursor:
+            timestamp, last_id = cursor.rsplit('|', 1)
+            sql += " AND (timestamp < ? OR (timestamp = ? AND id < ?))"
+            params += [timestamp, timestamp, int(last_id)]
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        rows = self._conn().execute(sql, params).fetchall()
+
+        page = rows[:limit]
+        next_cursor = f"{page[-1]['timestamp']}|{page[-1]['id']}" if len(rows) > limit else None
+        return {
+            'records': [
+                {key: r[key] for key in ('user_id', 'timestamp', 'accuracy', 'num_questions', 'total_time')}
+                for r in page
+            ],
+            'next_cursor': next_cursor
+        }
+
+    def get_accuracy_series(self, user_id: str = "default") -> List[float]:
+        """Accuracy of every attempt, oldest first."""
+        rows = self._conn().execute(
+            "SELECT accuracy FROM attempts WHERE user_id = ? ORDER BY timestamp, id", (user_id,)
+        ).fetchall()
+        return [r['accuracy'] for r in rows]
+
+    def clear_quiz_history(self, user_id: str = "default") -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM answers WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM attempts WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM user_stats WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM topic_stats WHERE user_id = ?", (user_id,))
+
+    def get_user_stats(self, user_id: str = "default") -> Dict:
+        row = self._conn().execute(
+            "SELECT * FROM user_stats WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return format_user_stats(dict(row) if row else None)
+
+    def get_topic_performance(self, user_id: str = "default") -> Dict[str, Dict]:
+        rows = self._conn().execute(
+            "SELECT topic, correct, total FROM topic_stats WHERE user_id = ?",
+            (user_id,)
+        ).fetchall()
+        return {r['topic']: format_topic_stats(r['correct'], r['total']) for r in rows}
+
+    def rebuild_aggregates(self) -> int:
+        """Recompute user_stats and topic_stats from the raw attempts and answers."""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM user_stats")
+            conn.execute("DELETE FROM topic_stats")
+            conn.execute(
+                "INSERT INTO user_stats (user_id, total_quizzes, total_questions, "
+                "accuracy_sum, best_accuracy, total_time) "
+                "SELECT user_id, COUNT(*), SUM(num_questions), SUM(accuracy), MAX(accuracy), "
+                "SUM(total_time) FROM attempts GROUP BY user_id"
+            )
+            conn.execute(
+                "INSERT INTO topic_stats (user_id, topic, correct, total) "
+                "SELECT user_id, topic, SUM(is_correct), COUNT(*) FROM answers GROUP BY user_id, topic"
+            )
+            count = conn.execute("SELECT COUNT(*) FROM attempts").fetchone()[0]
+        logger.info(f"Rebuilt SQLite aggregates from {count} attempts")
+        return count
+
+    # ==================== Helper Methods ====================
+
+    def _conn(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _insert_attempts(self, conn: sqlite3.Connection, entries: List[Dict]):
+        """Insert attempts, their answers and stat updates. Caller owns the transaction."""
+        for entry in entries:
+            cur = conn.execute(
+                "INSERT INTO attempts (user_id, timestamp, accuracy, num_questions, total_time, results) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    entry['user_id'],
+                    str(entry['timestamp']),
+                    entry.get('accuracy', 0),
+                    entry.get('num_questions', 0),
+                    entry.get('total_time', 0),
+                    json.dumps(entry.get('results', {}), default=str)
+                )
+            )
+            attempt_id = cur.lastrowid
+            conn.executemany(
+                "INSERT INTO answers (attempt_id, user_id, position, question, user_answer, "
+                "correct_answer, is_correct, difficulty, topic, response_time) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        attempt_id,
+                        entry['user_id'],
+                        position,
+                        a.get('question'),
+                        _as_text(a.get('user_answer')),
+                        _as_text(a.get('correct_answer')),
+                        1 if a.get('is_correct') else 0,
+                        a.get('difficulty', 'medium'),
+                        a.get('topic', 'General'),
+                        a.get('response_time', 0)
+                    )
+                    for position, a in enumerate(entry.get('answers', []))
+                ]
+            )
+        for user_id, deltas in merge_deltas(entries).items():
+            self._apply_deltas(conn, user_id, deltas)
+
+    def _apply_deltas(self, conn: sqlite3.Connection, user_id: str, deltas: Dict):
+        conn.execute(
+            "INSERT INTO user_stats (user_id, total_quizzes, total_questions, accuracy_sum, "
+            "best_accuracy, total_time) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET "
+            "total_quizzes = total_quizzes + excluded.total_quizzes, "
+            "total_questions = total_questions + excluded.total_questions, "
+            "accuracy_sum = accuracy_sum + excluded.accuracy_sum, "
+            "best_accuracy = MAX(best_accuracy, excluded.best_accuracy), "
+            "total_time = total_time + excluded.total_time",
+            (user_id, deltas['total_quizzes'], deltas['total_questions'], deltas['accuracy_sum'],
+             deltas['best_accuracy'], deltas['total_time'])
+        )
+        conn.executemany(
+            "INSERT INTO topic_stats (user_id, topic, correct, total) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(user_id, topic) DO UPDATE SET "
+            "correct = correct + excluded.correct, total = total + excluded.total",
+            [(user_id, topic, inc['correct'], inc['total']) for topic, inc in deltas['topics'].items()]
+        )
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def _as_text(value) -> Optional[str]:
+    """Store answers as text; the quiz only ever compares them as strings."""
+    return None if value is None else str(value)
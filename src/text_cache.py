@@ -0,0 +1,181 @@
+"""
+Text Cache - Disk-backed, compressed LRU cache for extracted document text
+"""
+
+import os
+import time
+import zlib
+import hashlib
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+# Import logger
+try:
+    from src.logger import get_utils_logger
+    logger = get_utils_logger()
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+def make_text_key(kind: str, *parts: Any) -> str:
+    """SHA-256 key from a source kind and its identifying parts."""
+    digest = hashlib.sha256(kind.encode('utf-8'))
+    for part in parts:
+        digest.update(b'|')
+        digest.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class TextCache:
+    """
+    Extracted text stored as zlib-compressed files, one per key.
+
+    Total size on disk is bounded by `max_bytes`; least recently used
+    files are evicted first, with recency tracked through file mtimes so
+    it survives restarts. Writes go through a temp file and os.replace,
+    so a crash never leaves a half-written entry behind.
+    """
+
+    SUFFIX = '.txt.z'
+
+    def __init__(self, cache_dir: str = '.cache/text', max_bytes: int = 200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = {}  # key -> (size, last_used)
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached text for a key, or None."""
+        path = self._path(key)
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+        try:
+            with open(path, 'rb') as f:
+                text = zlib.decompress(f.read()).decode('utf-8')
+        except (OSError, zlib.error, UnicodeDecodeError) as e:
+            logger.warning(f"Dropping unreadable text cache entry {key[:12]}: {e}")
+            self._forget(key)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            if key in self._index:
+                self._index[key] = (self._index[key][0], now)
+            self.hits += 1
+        return text
+
+    def set(self, key: str, text: str):
+        """Compress and store text under a key, evicting old entries if needed."""
+        data = zlib.compress(text.encode('utf-8'), 6)
+        if len(data) > self.max_bytes:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Could not write text cache entry: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            previous = self._index.get(key)
+            if previous:
+                self._total -= previous[0]
+            self._index[key] = (len(data), time.time())
+            self._total += len(data)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            keys = list(self._index)
+        for key in keys:
+            self._forget(key)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and disk usage for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._index),
+                'bytes': self._total,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0
+            }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.SUFFIX)
+
+    def _load_index(self):
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            self._index[name[:-len(self.SUFFIX)]] = (st.st_size, st.st_mtime)
+            self._total += st.st_size
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until under max_bytes. Caller holds the lock."""
+        if self._total <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            del self._index[key]
+            self._total -= size
+            self.evictions += 1
+
+    def _forget(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+        with self._lock:
+            entry = self._index.pop(key, None)
+            if entry:
+                self._total -= entry[0]
+
+
+# Singleton instance
+_text_cache_instance = None
+_text_cache_lock = threading.Lock()
+
+def get_text_cache() -> TextCache:
+    """Get or create the process-wide text cache (TEXT_CACHE_DIR / TEXT_CACHE_MAX_MB)."""
+    global _text_cache_instance
+    with _text_cache_lock:
+        if _text_cache_instance is None:
+            _text_cache_instance = TextCache(
+                cache_dir=os.getenv('TEXT_CACHE_DIR', '.cache/text'),
+                max_bytes=int(float(os.getenv('TEXT_CACHE_MAX_MB', '200')) * 1024 * 1024)
+            )
+        return _text_cache_instance
@@ -2,8 +2,9 @@
 Utility functions for file handling and text extraction
 """
 
-import io
-from typing import Optional
+import time
+import hashlib
+from typing import Optional, Tuple
 
 # Import logger
 try:
@@ -13,8 +14,26 @@ except ImportError:
     import logging
     logger = logging.getLogger(__name__)
 
-def extract_text_from_file(uploaded_file) -> Optional[str]:
-    """Extract text from uploaded file (PDF or TXT)."""
+from src.text_cache import get_text_cache, make_text_key
+
+# Cached pages are reused without any request for this long; after that they
+# are revalidated by ETag/Last-Modified (refetched when a page has neither)
+URL_CACHE_TTL = 3600
+
+
+def extract_text_from_file(
+    uploaded_file,
+    engine: str = 'pdfplumber',
+    page_range: Optional[Tuple[int, int]] = None,
+    max_chars: Optional[int] = None
+) -> Optional[str]:
+    """
+    Extract text from uploaded file (PDF or TXT).
+    
+    For PDFs, `engine` picks pdfplumber (accurate) or 'pypdf2' (fast),
+    `page_range` limits extraction to 1-based inclusive pages, and
+    extraction stops once `max_chars` characters have been collected.
+    """
     
     file_type = uploaded_file.type
     file_name = uploaded_file.name.lower()
@@ -32,39 +51,28 @@ def extract_text_from_file(uploaded_file) -> Optional[str]:
         
         elif file_type == 'application/pdf' or file_name.endswith('.pdf'):
             # Handle PDF files
-            logger.debug("Processing as PDF file")
+            logger.debug(f"Processing as PDF file (engine: {engine})")
             try:
-                import pdfplumber
-                
-                pdf_bytes = io.BytesIO(uploaded_file.read())
-                text_content = []
-                
-                with pdfplumber.open(pdf_bytes) as pdf:
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_content.append(page_text)
-                
-                return '\n\n'.join(text_content)
-            
+                from src.pdf_extractor import PDFExtractor
+                extractor = PDFExtractor(engine=engine)
             except ImportError:
-                # Fallback to PyPDF2 if pdfplumber not available
-                try:
-                    import PyPDF2
-                    
-                    pdf_bytes = io.BytesIO(uploaded_file.read())
-                    pdf_reader = PyPDF2.PdfReader(pdf_bytes)
-                    
-                    text_content = []
-                    for page in pdf_reader.pages:
-                        text = page.extract_text()
-                        if text:
-                            text_content.append(text)
-                    
-                    return '\n\n'.join(text_content)
-                
-                except ImportError:
-                    return "PDF extraction requires pdfplumber or PyPDF2. Please install: pip install pdfplumber"
+                return "PDF extraction requires pdfplumber or PyPDF2. Please install: pip install pdfplumber"
+            
+            pdf_bytes = uploaded_file.read()
+            cache = get_text_cache()
+            key = make_text_key('pdf', hashlib.sha256(pdf_bytes).hexdigest(), extractor.engine, page_range, max_chars)
+            cached = cache.get(key)
+            if cached is not None:
+                logger.info(f"Text cache hit for {file_name} ({len(cached)} characters)")
+                return cached
+            
+            started = time.perf_counter()
+            text = extractor.extract(pdf_bytes, page_range=page_range, max_chars=max_chars)
+            logger.info(f"Successfully extracted {len(text)} characters from PDF",
+                        extra={'latency_ms': round((time.perf_counter() - started) * 1000, 1)})
+            if text:
+                cache.set(key, text)
+            return text
         
         else:
             return f"Unsupported file type: {file_type}"
@@ -114,16 +122,63 @@ def chunk_text(text: str, max_chunk_size: int = 4000) -> list:
     return chunks
 
 
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+def _url_validator(url: str) -> Optional[str]:
+    """The page's ETag or Last-Modified from a HEAD request, or None."""
+    try:
+        import requests
+        head = requests.head(url, headers=HEADERS, timeout=5, allow_redirects=True)
+        return head.headers.get('ETag') or head.headers.get('Last-Modified')
+    except Exception as e:
+        logger.debug(f"HEAD request failed, refetching {url}: {e}")
+        return None
+
+
 def fetch_article_content(url: str) -> Optional[str]:
+    """
+    Fetch and extract text content from a URL, reusing cached text when unchanged.
+    
+    Within URL_CACHE_TTL the cached text is served without touching the
+    network: a small entry keyed by the URL and the current TTL bucket
+    points at the text. Once that expires, one HEAD request checks the
+    page's validator, and the text is only downloaded again if it changed.
+    """
+    cache = get_text_cache()
+    bucket = f"ttl-{int(time.time() // URL_CACHE_TTL)}"
+    fresh_key = make_text_key('url-fresh', url, bucket)
+    text_key = cache.get(fresh_key)
+    if text_key is not None:
+        cached = cache.get(text_key)
+        if cached is not None:
+            logger.info(f"Text cache hit for {url} ({len(cached)} characters)")
+            return cached
+    
+    # Stale or never fetched: revalidate
+    text_key = make_text_key('url', url, _url_validator(url) or bucket)
+    cached = cache.get(text_key)
+    if cached is not None:
+        logger.info(f"Text cache hit for {url} after revalidation ({len(cached)} characters)")
+    else:
+        cached = _fetch_article_content(url)
+        if not cached or cached.startswith("Error"):
+            return cached
+        cache.set(text_key, cached)
+    cache.set(fresh_key, text_key)
+    return cached
+
+
+def _fetch_article_content(url: str) -> Optional[str]:
     """Fetch and extract text content from a URL."""
     logger.info(f"Fetching article content from: {url}")
     try:
         import requests
         from bs4 import BeautifulSoup
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        headers = HEADERS
         
         logger.debug("Sending HTTP request...")
         response = requests.get(url, headers=headers, timeout=10)
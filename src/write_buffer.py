@@ -0,0 +1,135 @@
+"""
+Write Buffer - Write-behind batching for database inserts
+"""
+
+import time
+import atexit
+import threading
+from typing import Any, Callable, List, Optional
+
+# Import logger
+try:
+    from src.logger import get_database_logger
+    logger = get_database_logger()
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Collects items and hands them to a bulk write function in batches.
+
+    A batch is flushed when it reaches `max_items` or when its oldest item
+    has waited `max_delay` seconds, whichever comes first. Flushing runs on
+    a daemon thread for the time threshold and on the caller's thread for
+    the size threshold; anything still buffered is flushed at exit.
+
+    write_fn returns the items it could not write (None or [] when all were
+    written); raising counts the whole batch as failed. Failed items are put
+    back and retried on a later flush, up to `max_retries` times, after
+    which they are dropped and logged. write_fn must therefore be safe to
+    call again with items from a partly written batch.
+    """
+
+    def __init__(
+        self,
+        write_fn: Callable[[List[Any]], Optional[List[Any]]],
+        max_items: int = 100,
+        max_delay: float = 2.0,
+        max_retries: int = 5
+    ):
+        self.write_fn = write_fn
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self._items = []  # (item, failed attempts so far)
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='smartquiz-write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, item: Any):
+        """Queue one item for writing."""
+        self.add_many([item])
+
+    def add_many(self, items: List[Any]):
+        """Queue several items; flushes immediately once the size threshold is hit."""
+        if not items:
+            return
+        with self._lock:
+            if not self._items:
+                self._oldest = time.time()
+            self._items.extend((item, 0) for item in items)
+            full = len(self._items) >= self.max_items
+        if full:
+            self.flush()
+        else:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        Write everything buffered now.
+
+        Returns:
+            Number of items written
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._items, self._oldest = self._items, [], None
+            if not batch:
+                return 0
+            items = [item for item, _ in batch]
+            try:
+                unwritten = self.write_fn(items) or []
+            except Exception as e:
+                logger.error(f"Write-behind flush of {len(batch)} items failed: {e}")
+                unwritten = items
+            if not unwritten:
+                return len(batch)
+
+            failed_ids = {id(item) for item in unwritten}
+            retry, dropped = [], 0
+            for item, tries in batch:
+                if id(item) not in failed_ids:
+                    continue
+                if tries + 1 > self.max_retries:
+                    dropped += 1
+                else:
+                    retry.append((item, tries + 1))
+            if dropped:
+                logger.error(f"Write-behind dropped {dropped} items after {self.max_retries} retries")
+            if retry:
+                with self._lock:
+                    self._items = retry + self._items
+                    self._oldest = time.time()  # retry after another max_delay
+            return len(batch) - len(unwritten)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def close(self):
+        """Stop the timer thread and flush what is left."""
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+
+    def _run(self):
+        while not self._closed:
+            with self._lock:
+                oldest = self._oldest
+            if oldest is None:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            remaining = oldest + self.max_delay - time.time()
+            if remaining > 0:
+                self._wakeup.wait(remaining)
+                self._wakeup.clear()
+                continue
+            self.flush()